@@ -1,8 +1,28 @@
 import typer
 import alembic.config
+from datetime import datetime
+from dotenv import set_key
 from seeders.initial_seeders import initial_seeders
+from pathlib import Path
+from common.security import calibrate_hash_rounds
+from common.user_import import parse_user_rows, import_users
+from common.checkin_benchmark import run_checkin_benchmark
+from common.partitions import ensure_partitions, drop_partitions
+from common.archive import archive_absensi, archive_cutoff
+from repository.daily_summary import rebuild_daily_summary
+from repository.idempotency import purge_expired
+from models import factory_session
+from settings import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PARTITION_MONTHS_AHEAD,
+    ARCHIVE_DIR,
+    ARCHIVE_BATCH_SIZE,
+)
 
 app = typer.Typer()
+partitions_app = typer.Typer(help="absensi monthly partitions maintenance")
+app.add_typer(partitions_app, name="partitions")
 
 
 @app.command()
@@ -19,5 +39,139 @@ def initial_migrate():
     initial_seeders()
 
 
+@app.command()
+def calibrate_hash(
+    target_ms: int = 250,
+    min_rounds: int = 4,
+    max_rounds: int = 16,
+    samples: int = 3,
+    persist: bool = False,
+    env_file: str = ".env",
+):
+    """
+    benchmark bcrypt and recommend BCRYPT_ROUNDS that fit target_ms per hash,
+    --persist write it to env_file. Existing password is rehashed on next login
+    """
+    rounds, results = calibrate_hash_rounds(
+        target_ms=target_ms, min_rounds=min_rounds, max_rounds=max_rounds, samples=samples
+    )
+    for cost, elapsed_ms in results:
+        print(f"rounds={cost:<3} {elapsed_ms:9.2f} ms")
+    print(f"Current BCRYPT_ROUNDS={BCRYPT_ROUNDS}, recommended BCRYPT_ROUNDS={rounds}")
+    if persist:
+        set_key(env_file, "BCRYPT_ROUNDS", str(rounds))
+        print(f"BCRYPT_ROUNDS={rounds} saved to {env_file}, restart the application to apply")
+
+
+@app.command(name="import-users")
+def import_users_file(path: str, workers: int = PASSWORD_HASH_WORKERS):
+    """
+    bulk create user from CSV (header nama_user,email,password,jabatan) or JSON list
+    """
+    file = Path(path)
+    rows = parse_user_rows(file.read_bytes(), file.suffix.lstrip(".").lower())
+    with factory_session() as session:
+        report = import_users(db=session, rows=rows, workers=workers)
+    for error in report["errors"]:
+        print(f"row {error['row']} ({error['email']}): {error['message']}")
+    print(
+        f"{report['created']}/{report['total']} user created, {report['failed']} failed, "
+        f"{report['rows_per_second']} rows/second"
+    )
+
+
+@app.command(name="benchmark-checkin")
+def benchmark_checkin(users: int = 200, concurrency: int = 50):
+    """
+    compare concurrent check-in throughput of the blocking sync session path
+    and the AsyncSession path, creates and removes its own benchmark users
+    """
+    results = run_checkin_benchmark(num_users=users, concurrency=concurrency)
+    for mode, result in results.items():
+        print(
+            f"{mode:<6} {result['requests']} check-in in {result['seconds']} s, "
+            f"{result['per_second']} req/s, p95 {result['p95_ms']} ms"
+        )
+
+
+@partitions_app.command(name="ensure")
+def partitions_ensure(months_ahead: int = PARTITION_MONTHS_AHEAD, start: str = None):
+    """
+    create missing absensi partitions up to months_ahead months after the current
+    month, --start YYYY-MM also create the older ones (rows are moved out of
+    absensi_default). Run it from cron at least once a month
+    """
+    start_month = datetime.strptime(start, "%Y-%m").date() if start else None
+    with factory_session() as session:
+        created = ensure_partitions(db=session, months_ahead=months_ahead, start=start_month)
+    for name in created:
+        print(f"created {name}")
+    print(f"{len(created)} partition created")
+
+
+@partitions_app.command(name="drop")
+def partitions_drop(before: str, purge: bool = False):
+    """
+    detach absensi partitions of the months before --before YYYY-MM, the detached
+    tables are kept unless --purge
+    """
+    before_month = datetime.strptime(before, "%Y-%m").date()
+    with factory_session() as session:
+        try:
+            detached = drop_partitions(db=session, before=before_month, purge=purge)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--before")
+    for name in detached:
+        print(f"{'dropped' if purge else 'detached'} {name}")
+    print(f"{len(detached)} partition {'dropped' if purge else 'detached'}")
+
+
+@app.command()
+def archive(before: str, directory: str = ARCHIVE_DIR, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """
+    move absensi rows dated before --before YYYY-MM-DD into gzip CSV files (one per
+    month) in directory, then drop the partitions of the months entirely before it
+    and delete the other rows in batches. export_excel_admin keep reading them
+    """
+    before_date = datetime.strptime(before, "%Y-%m-%d").date()
+    with factory_session() as session:
+        report = archive_absensi(
+            db=session, before=before_date, directory=directory, batch_size=batch_size
+        )
+    for file in report["files"]:
+        print(f"{file['file']}: {file['rows']} rows")
+    print(f"{report['rows']} rows archived, {report['deleted']} rows deleted")
+
+
+
+@app.command(name="rebuild-summary")
+def rebuild_summary(start: str = None, end: str = None):
+    """
+    recompute absensi_daily_summary from absensi for --start..--end YYYY-MM-DD
+    (inclusive, every day by default), after a manual fix of absensi rows.
+    Days before the archive cutoff are kept, their rows are not in absensi anymore
+    (same for the days of detached partitions, do not rebuild them)
+    """
+    start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+    end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+    cutoff = archive_cutoff()
+    if cutoff is not None and (start_date is None or start_date < cutoff):
+        print(f"days before the archive cutoff {cutoff} are kept")
+        start_date = cutoff
+    with factory_session() as session:
+        rows = rebuild_daily_summary(db=session, start_date=start_date, end_date=end_date)
+    print(f"{rows} summary rows rebuilt")
+
+
+@app.command(name="purge-idempotency")
+def purge_idempotency():
+    """
+    delete the expired rows of idempotency_key (IDEMPOTENCY_STORE=db), run it daily
+    """
+    with factory_session() as session:
+        rows = purge_expired(db=session)
+    print(f"{rows} expired idempotency keys deleted")
+
+
 if __name__ == "__main__":
     app()
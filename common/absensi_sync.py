@@ -0,0 +1,173 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+import pytz
+from common.geo import haversine
+from repository.absensi import FORCED_KETERANGAN
+from settings import (
+    TZ,
+    LAT_OF_CENTER,
+    LONG_OF_CENTER,
+    CHECK_KILOMETER_RADIUS,
+    MIN_MINUTE_ABSEN_IN,
+    MAX_MINUTE_ABSEN_IN,
+    SYNC_CLOCK_SKEW_SECONDS,
+)
+
+MASUK = "masuk"
+KELUAR = "keluar"
+
+# result of one event of /absensi/sync
+SYNC_CREATED = "created"
+SYNC_CLOSED = "closed"
+SYNC_DUPLICATE = "duplicate"
+SYNC_INVALID_TIME = "invalid_time"
+SYNC_OUTSIDE_AREA = "outside_area"
+SYNC_OUTSIDE_SHIFT = "outside_shift"
+SYNC_OPEN_SESSION = "open_session"
+SYNC_NO_OPEN_SESSION = "no_open_session"
+# accepted by the plan but lost against a check-in or check-out of another request
+SYNC_CONFLICT = "conflict"
+
+
+@dataclass
+class SyncRow:
+    """
+    absensi row created or closed by the batch, id is None until a new row is written
+    """
+    id: Optional[int]
+    tanggal_absen: date
+    jam_masuk: time
+    lokasi_masuk: Optional[str]
+    keterangan: Optional[str] = None
+    jam_keluar: Optional[time] = None
+    lokasi_keluar: Optional[str] = None
+
+
+@dataclass
+class SyncResult:
+    event_id: str
+    status: str
+    absensi_id: Optional[int] = None
+    # row written by an accepted event
+    row: Optional[SyncRow] = None
+
+
+@dataclass
+class SyncPlan:
+    results: List[SyncResult] = field(default_factory=list)
+    new_rows: List[SyncRow] = field(default_factory=list)
+    # open rows of the database closed by the batch
+    closed_rows: List[SyncRow] = field(default_factory=list)
+
+    @property
+    def accepted(self) -> List[SyncResult]:
+        return [val for val in self.results if val.row is not None]
+
+
+def local_time(waktu: datetime) -> datetime:
+    """
+    naive datetime in TIMEZONE, like jam_masuk of the online check-in
+    """
+    if waktu.tzinfo is not None:
+        waktu = waktu.astimezone(pytz.timezone(TZ)).replace(tzinfo=None)
+    return waktu.replace(microsecond=0)
+
+
+def in_area(latitude: float, longitude: float) -> bool:
+    return haversine(LONG_OF_CENTER, LAT_OF_CENTER, longitude, latitude) <= CHECK_KILOMETER_RADIUS
+
+
+def in_shift_window(shifts: Iterable, moment: datetime) -> bool:
+    """
+    same window as get_active_shift, a user without shift is not checked
+    """
+    shifts = list(shifts)
+    if not shifts:
+        return True
+    for shift in shifts:
+        shift_start = datetime.combine(moment.date(), shift.jam_mulai)
+        shift_end = datetime.combine(moment.date(), shift.jam_akhir)
+        if shift_start - timedelta(minutes=MIN_MINUTE_ABSEN_IN) <= moment <= shift_end + timedelta(minutes=MAX_MINUTE_ABSEN_IN):
+            return True
+    return False
+
+
+def plan_sync(
+    events: Iterable,
+    open_rows: List[SyncRow],
+    seen: Dict[str, Optional[int]],
+    shifts: Iterable,
+    now: datetime,
+    earliest: date,
+) -> SyncPlan:
+    """
+    replay the events (event_id, jenis, waktu, latitude, longitude, keterangan) in
+    order on the open sessions of the user, without writing anything.
+    seen: event_id -> absensi_id of the events already written by a previous sync.
+    A check-in closes the open sessions of the previous days like
+    forced_absen_gt_today and is accepted, the app can not check-in again for an
+    offline event. Events before earliest, or after now, are rejected
+    """
+    shifts = list(shifts)
+    open_rows = sorted(open_rows, key=lambda val: val.tanggal_absen)
+    closed = {}
+    plan = SyncPlan()
+    sent = set()
+    latest = now + timedelta(seconds=SYNC_CLOCK_SKEW_SECONDS)
+    for event in events:
+        if event.event_id in seen or event.event_id in sent:
+            plan.results.append(
+                SyncResult(event.event_id, SYNC_DUPLICATE, absensi_id=seen.get(event.event_id))
+            )
+            continue
+        sent.add(event.event_id)
+        moment = local_time(event.waktu)
+        lokasi = f"{event.latitude}, {event.longitude}"
+        if moment > latest or moment.date() < earliest:
+            status = SYNC_INVALID_TIME
+        elif not in_area(event.latitude, event.longitude):
+            status = SYNC_OUTSIDE_AREA
+        elif not in_shift_window(shifts, moment):
+            status = SYNC_OUTSIDE_SHIFT
+        elif event.jenis == MASUK:
+            if any(val.tanggal_absen == moment.date() for val in open_rows):
+                status = SYNC_OPEN_SESSION
+            elif any(val.tanggal_absen > moment.date() for val in open_rows):
+                # older than the open session, it can not be placed before it
+                status = SYNC_INVALID_TIME
+            else:
+                for val in open_rows:
+                    val.jam_keluar = moment.time()
+                    val.lokasi_keluar = val.lokasi_masuk
+                    val.keterangan = FORCED_KETERANGAN
+                    if val.id is not None:
+                        closed[val.id] = val
+                row = SyncRow(
+                    id=None,
+                    tanggal_absen=moment.date(),
+                    jam_masuk=moment.time(),
+                    lokasi_masuk=lokasi,
+                    keterangan=event.keterangan,
+                )
+                open_rows = [row]
+                plan.new_rows.append(row)
+                plan.results.append(SyncResult(event.event_id, SYNC_CREATED, row=row))
+                continue
+        else:
+            current = open_rows[-1] if open_rows else None
+            if current is None:
+                status = SYNC_NO_OPEN_SESSION
+            elif current.tanggal_absen != moment.date() or moment.time() < current.jam_masuk:
+                status = SYNC_INVALID_TIME
+            else:
+                current.jam_keluar = moment.time()
+                current.lokasi_keluar = lokasi
+                if current.id is not None:
+                    closed[current.id] = current
+                open_rows.remove(current)
+                plan.results.append(SyncResult(event.event_id, SYNC_CLOSED, row=current))
+                continue
+        plan.results.append(SyncResult(event.event_id, status))
+    plan.closed_rows = list(closed.values())
+    return plan
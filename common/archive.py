@@ -0,0 +1,277 @@
+import csv
+import gzip
+import json
+import os
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Iterator, List, Optional
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.orm import Session
+from models.Absensi import Absensi
+from models.User import User
+from common.partitions import drop_partitions, list_partitions, month_start, partition_name
+from settings import ARCHIVE_DIR, ARCHIVE_BATCH_SIZE
+
+MANIFEST = "manifest.json"
+ARCHIVE_COLUMNS = [
+    "id",
+    "tanggal_absen",
+    "jam_masuk",
+    "jam_keluar",
+    "keterangan",
+    "lokasi_masuk",
+    "lokasi_keluar",
+    "user_id",
+    "shift_id",
+    "kehadiran_id",
+    # snapshot of the user, the user may be deleted once its absensi is archived
+    "user_nama",
+    "user_email",
+]
+
+
+def load_manifest(directory: str = ARCHIVE_DIR) -> dict:
+    """
+    {"cutoff": "YYYY-MM-DD" or None, "files": [{"file", "month", "rows"}]}
+    every row before cutoff is in the archive, not in the absensi table
+    """
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return {"cutoff": None, "files": []}
+    return json.loads(path.read_text())
+
+
+def archive_cutoff(directory: str = ARCHIVE_DIR) -> Optional[date]:
+    cutoff = load_manifest(directory)["cutoff"]
+    return date.fromisoformat(cutoff) if cutoff else None
+
+
+def _save_manifest(directory: str, manifest: dict) -> None:
+    path = Path(directory) / MANIFEST
+    tmp = path.with_suffix(".json.part")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+
+
+class _MonthWriter:
+    """
+    gzip CSV of one month, written to .part and renamed when complete
+    """
+
+    def __init__(self, directory: str, month: date, run: str) -> None:
+        self.month = month
+        self.name = f"absensi_{month:%Y_%m}-{run}.csv.gz"
+        self.path = Path(directory) / self.name
+        self.tmp = self.path.with_name(self.name + ".part")
+        self.raw = open(self.tmp, "wb")
+        self.file = gzip.open(self.raw, "wt", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(ARCHIVE_COLUMNS)
+        self.rows = 0
+
+    def write(self, row) -> None:
+        self.writer.writerow(["" if val is None else val for val in row])
+        self.rows += 1
+
+    def close(self) -> dict:
+        self.file.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        self.raw.close()
+        os.replace(self.tmp, self.path)
+        return {"file": self.name, "month": f"{self.month:%Y-%m}", "rows": self.rows}
+
+
+def archive_absensi(
+    db: Session,
+    before: date,
+    directory: str = ARCHIVE_DIR,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> dict:
+    """
+    stream absensi rows dated before `before` through a server-side cursor into one
+    gzip CSV per month, then delete them in batches of batch_size.
+    Rows are deleted only once their files and the manifest are on disk
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    # rows inserted with an old date while archiving are left for the next run
+    max_id = db.execute(
+        select(func.max(Absensi.id)).filter(Absensi.tanggal_absen < before)
+    ).scalar()
+    if max_id is None:
+        return {"rows": 0, "deleted": 0, "files": []}
+    archived = (Absensi.tanggal_absen < before, Absensi.id <= max_id)
+
+    stmt = (
+        select(
+            Absensi.id,
+            Absensi.tanggal_absen,
+            Absensi.jam_masuk,
+            Absensi.jam_keluar,
+            Absensi.keterangan,
+            Absensi.lokasi_masuk,
+            Absensi.lokasi_keluar,
+            Absensi.user_id,
+            Absensi.shift_id,
+            Absensi.kehadiran_id,
+            User.nama,
+            User.email,
+        )
+        .outerjoin(User, User.id == Absensi.user_id)
+        .filter(*archived)
+        .order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    run = datetime.now().strftime("%Y%m%dT%H%M%S")
+    files = []
+    writer = None
+    try:
+        for row in db.execute(stmt):
+            month = row.tanggal_absen.replace(day=1)
+            if writer is None or writer.month != month:
+                if writer is not None:
+                    files.append(writer.close())
+                writer = _MonthWriter(directory, month, run)
+            writer.write(row)
+        if writer is not None:
+            files.append(writer.close())
+            writer = None
+    finally:
+        if writer is not None:
+            writer.file.close()
+            writer.raw.close()
+            writer.tmp.unlink()
+    db.rollback()
+
+    manifest = load_manifest(directory)
+    cutoff = archive_cutoff(directory)
+    manifest["cutoff"] = max(cutoff, before).isoformat() if cutoff else before.isoformat()
+    manifest["files"].extend(files)
+    _save_manifest(directory, manifest)
+
+    deleted = _drop_archived_partitions(db, before, max_id)
+    while True:
+        ids = select(Absensi.id).filter(*archived).limit(batch_size).scalar_subquery()
+        result = db.execute(
+            delete(Absensi)
+            # the outer predicate let the planner prune the partitions too
+            .where(Absensi.id.in_(ids), Absensi.tanggal_absen < before)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount == 0:
+            break
+        deleted += result.rowcount
+    return {"rows": sum(val["rows"] for val in files), "deleted": deleted, "files": files}
+
+
+def _drop_archived_partitions(db: Session, before: date, max_id: int) -> int:
+    """
+    drop the monthly partitions entirely before `before` instead of deleting their
+    rows, return the number of rows dropped. Nothing is dropped when one of them
+    got a row after the archive was written (id > max_id), the batched delete
+    keeps it for the next run then
+    """
+    cutoff = min(month_start(before), month_start(date.today()))
+    months = [month for month in list_partitions(db) if month < cutoff]
+    rows = 0
+    for month in months:
+        name = partition_name(month)
+        # no insert until the partition is dropped
+        db.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+        newer, count = db.execute(
+            text(f'SELECT count(*) FILTER (WHERE id > :max_id), count(*) FROM "{name}"'),
+            {"max_id": max_id},
+        ).one()
+        if newer:
+            db.rollback()
+            return 0
+        rows += count
+    if months:
+        drop_partitions(db, before=cutoff, purge=True, is_commit=False)
+    db.commit()
+    return rows
+
+
+def _parse_time(value: str) -> Optional[time]:
+    return time.fromisoformat(value) if value else None
+
+
+def _parse_int(value: str) -> Optional[int]:
+    return int(value) if value else None
+
+
+def read_archive(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    directory: str = ARCHIVE_DIR,
+) -> Iterator[dict]:
+    """
+    archived rows between start_date and end_date (inclusive, None is unbounded),
+    only the files of the overlapping months are opened
+    """
+    seen = set()
+    # newest run first, a row archived twice (delete interrupted) is read once
+    for entry in reversed(load_manifest(directory)["files"]):
+        month = datetime.strptime(entry["month"], "%Y-%m").date()
+        if end_date is not None and month > end_date:
+            continue
+        if start_date is not None and month < start_date.replace(day=1):
+            continue
+        with gzip.open(Path(directory) / entry["file"], "rt", newline="") as file:
+            for row in csv.DictReader(file):
+                tanggal_absen = date.fromisoformat(row["tanggal_absen"])
+                if start_date is not None and tanggal_absen < start_date:
+                    continue
+                if end_date is not None and tanggal_absen > end_date:
+                    continue
+                id = int(row["id"])
+                if id in seen:
+                    continue
+                seen.add(id)
+                yield {
+                    "id": id,
+                    "tanggal_absen": tanggal_absen,
+                    "jam_masuk": _parse_time(row["jam_masuk"]),
+                    "jam_keluar": _parse_time(row["jam_keluar"]),
+                    "keterangan": row["keterangan"] or None,
+                    "lokasi_masuk": row["lokasi_masuk"] or None,
+                    "lokasi_keluar": row["lokasi_keluar"] or None,
+                    "user_id": _parse_int(row["user_id"]),
+                    "shift_id": _parse_int(row["shift_id"]),
+                    "kehadiran_id": _parse_int(row["kehadiran_id"]),
+                    "user_nama": row["user_nama"],
+                    "user_email": row["user_email"],
+                }
+
+
+def archived_absensi(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    jam_masuk=None,
+    jam_keluar=None,
+    user_name: Optional[str] = None,
+    directory: str = ARCHIVE_DIR,
+) -> List[Absensi]:
+    """
+    archived rows as detached Absensi (never added to a session) with absen_user
+    built from the snapshot, filtered like export_excel_admin.
+    Empty when the requested range start on or after the archive cutoff
+    """
+    cutoff = archive_cutoff(directory)
+    if cutoff is None or (start_date is not None and start_date >= cutoff):
+        return []
+    result = []
+    for row in read_archive(start_date, end_date, directory):
+        if user_name is not None and user_name.lower() not in row["user_nama"].lower():
+            continue
+        if jam_masuk and row["jam_masuk"] != jam_masuk:
+            continue
+        if jam_keluar and row["jam_keluar"] != jam_keluar:
+            continue
+        nama, email = row.pop("user_nama"), row.pop("user_email")
+        absen = Absensi(**row)
+        if absen.user_id is not None:
+            absen.absen_user = User(id=absen.user_id, nama=nama, email=email)
+        result.append(absen)
+    return result
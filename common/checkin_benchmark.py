@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+from sqlalchemy import delete, select
+from models import Session, Async_Session, async_engine
+from models.Absensi import Absensi
+from models.AbsensiDailySummary import AbsensiDailySummary
+from models.Role import Role
+from models.User import User
+from repository import absensi as absensi_repo
+from repository.aio import absensi as absensi_aio_repo
+from common.security import generate_hash_password
+
+BENCHMARK_EMAIL_DOMAIN = "@benchmark.local"
+BENCHMARK_ROLE = "benchmark"
+
+
+def create_benchmark_users(num_users: int) -> List[int]:
+    password = generate_hash_password("benchmark", rounds=4)
+    with Session() as db:
+        role = Role(jabatan=BENCHMARK_ROLE)
+        db.add(role)
+        db.flush()
+        users = [
+            User(
+                nama=f"benchmark {n}",
+                email=f"bench{n}{BENCHMARK_EMAIL_DOMAIN}",
+                password=password,
+                role_id=role.id,
+            )
+            for n in range(num_users)
+        ]
+        db.add_all(users)
+        db.flush()
+        user_ids = [user.id for user in users]
+        db.commit()
+        return user_ids
+
+
+def _delete_absensi(db, user_ids: List[int]) -> None:
+    db.execute(delete(Absensi).where(Absensi.user_id.in_(user_ids)))
+    # the check-ins were counted in absensi_daily_summary on the rows of the
+    # benchmark role, no other user has that role
+    benchmark_role = select(Role.id).where(Role.jabatan == BENCHMARK_ROLE)
+    db.execute(
+        delete(AbsensiDailySummary).where(AbsensiDailySummary.role_id.in_(benchmark_role))
+    )
+
+
+def delete_benchmark_absensi(user_ids: List[int]) -> None:
+    with Session() as db:
+        _delete_absensi(db, user_ids)
+        db.commit()
+
+
+def delete_benchmark_users(user_ids: List[int]) -> None:
+    with Session() as db:
+        _delete_absensi(db, user_ids)
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.execute(delete(Role).where(Role.jabatan == BENCHMARK_ROLE))
+        db.commit()
+
+
+async def checkin_sync(user_id: int) -> None:
+    """
+    check-in path as it ran before, blocking psycopg2 session inside the event loop
+    """
+    with Session(autoflush=False) as db:
+        user = db.get(User, user_id)
+        absensi_repo.get_date_gt_today(db=db, user=user)
+        absensi_repo.get_absen_without_jam_keluar(db=db, user=user)
+        absensi_repo.create_masuk(db=db, lokasi_masuk="benchmark", userId=user)
+
+
+async def checkin_async(user_id: int) -> None:
+    """
+    check-in path of the route on AsyncSession/asyncpg, one statement after the user
+    """
+    async with Async_Session() as db:
+        user = (await db.execute(select(User).filter(User.id == user_id))).scalar()
+        await absensi_aio_repo.absen_masuk(db=db, user=user, lokasi_masuk="benchmark")
+
+
+async def run_concurrently(
+    checkin: Callable[[int], Awaitable[None]], user_ids: List[int], concurrency: int
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(user_id: int) -> None:
+        async with semaphore:
+            started_at = time.perf_counter()
+            await checkin(user_id)
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(user_id) for user_id in user_ids))
+    seconds = time.perf_counter() - started_at
+    latencies.sort()
+    return {
+        "requests": len(user_ids),
+        "seconds": round(seconds, 3),
+        "per_second": round(len(user_ids) / seconds, 1) if seconds else 0.0,
+        "p95_ms": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 2),
+    }
+
+
+def run_checkin_benchmark(num_users: int = 200, concurrency: int = 50) -> dict:
+    """
+    one check-in per user, first through the old blocking sync path then through the
+    async path, both driven by concurrency coroutines in one event loop.
+    Benchmark users, role, their absensi and daily summary rows are deleted afterwards
+    """
+    user_ids = create_benchmark_users(num_users)
+    try:
+        sync_result = asyncio.run(run_concurrently(checkin_sync, user_ids, concurrency))
+        delete_benchmark_absensi(user_ids)
+
+        async def run_async() -> dict:
+            try:
+                return await run_concurrently(checkin_async, user_ids, concurrency)
+            finally:
+                await async_engine.dispose()
+
+        async_result = asyncio.run(run_async())
+    finally:
+        delete_benchmark_users(user_ids)
+    return {"sync": sync_result, "async": async_result}
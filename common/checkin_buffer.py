@@ -0,0 +1,473 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, time as Time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from sqlalchemy.exc import DBAPIError
+from models import Async_Session
+from repository.aio import absensi as absensi_repo
+from settings import (
+    CHECKIN_BUFFER_MAX_SIZE,
+    CHECKIN_BUFFER_BATCH_SIZE,
+    CHECKIN_BUFFER_FLUSH_MS,
+    CHECKIN_BUFFER_JOURNAL_DIR,
+    CHECKIN_BUFFER_FSYNC,
+)
+
+JOURNAL_PREFIX = "checkin-"
+JOURNAL_SUFFIX = ".jsonl"
+# check-ins the database refused or dropped, kept for an admin to look at
+QUARANTINE_FILE = "quarantine.jsonl"
+MSG_DROPPED = "not written: session of the day still open or event already written"
+
+
+class CheckInBufferFull(Exception):
+    """
+    raised when max_size check-ins are already waiting for the database,
+    caller should answer 503 instead of queueing more
+    """
+
+
+@dataclass(frozen=True)
+class BufferedCheckIn:
+    event_id: str
+    user_id: int
+    tanggal_absen: date
+    jam_masuk: Time
+    lokasi_masuk: str
+    keterangan: Optional[str] = None
+
+    def as_row(self) -> tuple:
+        """
+        row of absen_masuk_batch_statement
+        """
+        return (
+            self.event_id,
+            self.user_id,
+            self.tanggal_absen,
+            self.jam_masuk,
+            self.lokasi_masuk,
+            self.keterangan,
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "event_id": self.event_id,
+            "user_id": self.user_id,
+            "tanggal_absen": self.tanggal_absen.isoformat(),
+            "jam_masuk": self.jam_masuk.isoformat(),
+            "lokasi_masuk": self.lokasi_masuk,
+            "keterangan": self.keterangan,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "BufferedCheckIn":
+        return cls(
+            event_id=data["event_id"],
+            user_id=data["user_id"],
+            tanggal_absen=date.fromisoformat(data["tanggal_absen"]),
+            jam_masuk=Time.fromisoformat(data["jam_masuk"]),
+            lokasi_masuk=data["lokasi_masuk"],
+            keterangan=data.get("keterangan"),
+        )
+
+
+def _pending_of(lines) -> List[BufferedCheckIn]:
+    """
+    check-ins added and not marked written, a line cut by a crash is ignored
+    """
+    pending = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "add" in record:
+            entry = BufferedCheckIn.from_json(record["add"])
+            pending[entry.event_id] = entry
+        for event_id in record.get("done", []):
+            pending.pop(event_id, None)
+    return list(pending.values())
+
+
+class CheckInJournal:
+    def __init__(self, directory: str, fsync: bool = False) -> None:
+        """
+        append-only JSON lines, one file per worker (checkin-{pid}.jsonl) locked
+        with flock while the worker runs. {"add": check-in} is written before the
+        check-in is acknowledged, {"done": [event_id, ...]} after it is written to
+        absensi. fsync: also survive a crash of the machine, not only of the worker.
+        append runs in a worker thread, the other writes on the event loop
+        """
+        self.directory = directory
+        self.fsync = fsync
+        self._file = None
+        self._outstanding = set()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{JOURNAL_PREFIX}{os.getpid()}{JOURNAL_SUFFIX}")
+
+    def open(self) -> List[BufferedCheckIn]:
+        """
+        open the journal of this worker and take over the journals of stopped
+        workers (their lock is free). Return the check-ins still to be written
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, "a+")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        self._file.seek(0)
+        recovered = _pending_of(self._file)
+        taken = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if (
+                not name.startswith(JOURNAL_PREFIX)
+                or not name.endswith(JOURNAL_SUFFIX)
+                or path == self.path
+            ):
+                continue
+            other = open(path, "r")
+            try:
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # worker still running
+                other.close()
+                continue
+            if os.fstat(other.fileno()).st_nlink == 0:
+                # already taken over by another worker
+                other.close()
+                continue
+            recovered.extend(_pending_of(other))
+            taken.append((path, other))
+        # own journal first, the files taken over are removed once it is written
+        self._file.seek(0)
+        self._file.truncate()
+        self._outstanding.clear()
+        for entry in recovered:
+            self._write({"add": entry.to_json()})
+            self._outstanding.add(entry.event_id)
+        self._sync()
+        for path, other in taken:
+            os.remove(path)
+            other.close()
+        return recovered
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, entry: BufferedCheckIn) -> None:
+        with self._lock:
+            self._write({"add": entry.to_json()})
+            self._sync()
+            self._outstanding.add(entry.event_id)
+
+    def mark_done(self, event_ids: List[str]) -> None:
+        with self._lock:
+            self._mark_done(event_ids)
+
+    def _mark_done(self, event_ids: List[str]) -> None:
+        self._outstanding.difference_update(event_ids)
+        if not self._outstanding:
+            # nothing left to replay, keep the file small
+            self._file.seek(0)
+            self._file.truncate()
+        else:
+            self._write({"done": list(event_ids)})
+        self._sync()
+
+    def quarantine(self, entry: BufferedCheckIn, error: str) -> None:
+        """
+        keep a check-in the database refused or dropped out of the replay, it is appended
+        to quarantine.jsonl and marked done
+        """
+        with open(os.path.join(self.directory, QUARANTINE_FILE), "a") as quarantine_file:
+            quarantine_file.write(json.dumps({"add": entry.to_json(), "error": error}) + "\n")
+            quarantine_file.flush()
+            if self.fsync:
+                os.fsync(quarantine_file.fileno())
+        self.mark_done([entry.event_id])
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CheckInBuffer:
+    def __init__(
+        self,
+        flush: Callable[[List[BufferedCheckIn]], Awaitable[Iterable[int]]],
+        max_size: int,
+        batch_size: int,
+        flush_ms: int,
+        journal: Optional[CheckInJournal] = None,
+        max_retry_seconds: float = 30,
+        is_rejected: Callable[[Exception], bool] = lambda exc: False,
+    ) -> None:
+        """
+        flush: write a batch to the database, return the user ids of the check-ins
+        inserted. The others were dropped, they are quarantined with MSG_DROPPED.
+        Raising keeps the batch for a retry
+        is_rejected: True for an error of flush caused by bad rows, the batch is
+        split until the bad check-ins are alone and they are quarantined instead
+        of retried
+        max_size: check-ins waiting or being written, more raise CheckInBufferFull
+        batch_size, flush_ms: a batch is written when it is full or flush_ms after
+        its first check-in
+        journal: None keeps the check-ins in memory only
+        """
+        self._flush = flush
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.journal = journal
+        self.max_retry_seconds = max_retry_seconds
+        self.is_rejected = is_rejected
+        # user id -> check-in, in arrival order. One check-in per user in the buffer
+        self._waiting: Dict[int, BufferedCheckIn] = {}
+        self._in_flight: Dict[int, BufferedCheckIn] = {}
+        # accepted, the journal is still being written
+        self._journaling: Dict[int, BufferedCheckIn] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._accepted = 0
+        self._rejected = 0
+        self._recovered = 0
+        self._written = 0
+        self._dropped = 0
+        self._quarantined = 0
+        self._batches = 0
+        self._failures = 0
+        self._last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_pending(self, user_id: int) -> bool:
+        return (
+            user_id in self._waiting
+            or user_id in self._in_flight
+            or user_id in self._journaling
+        )
+
+    async def submit(
+        self,
+        user_id: int,
+        tanggal_absen: date,
+        jam_masuk: Time,
+        lokasi_masuk: str,
+        keterangan: Optional[str] = None,
+    ) -> Optional[BufferedCheckIn]:
+        """
+        queue a check-in, journaled before return. The journal is written in a
+        worker thread, its write and fsync do not block the event loop. Return
+        None when the user already has a check-in in the buffer
+        """
+        if self.is_pending(user_id):
+            return None
+        if len(self._waiting) + len(self._in_flight) + len(self._journaling) >= self.max_size:
+            self._rejected += 1
+            raise CheckInBufferFull("Check-in buffer is full")
+        entry = BufferedCheckIn(
+            event_id=uuid.uuid4().hex,
+            user_id=user_id,
+            tanggal_absen=tanggal_absen,
+            jam_masuk=jam_masuk,
+            lokasi_masuk=lokasi_masuk,
+            keterangan=keterangan,
+        )
+        if self.journal is not None:
+            self._journaling[user_id] = entry
+            try:
+                await asyncio.to_thread(self.journal.append, entry)
+            finally:
+                del self._journaling[user_id]
+        self._waiting[user_id] = entry
+        self._accepted += 1
+        if self._wakeup is not None and (
+            len(self._waiting) == 1 or len(self._waiting) >= self.batch_size
+        ):
+            self._wakeup.set()
+        return entry
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        if self.journal is not None:
+            duplicates = []
+            for entry in self.journal.open():
+                if self.is_pending(entry.user_id):
+                    # the open session index would drop it anyway
+                    duplicates.append(entry.event_id)
+                    continue
+                self._waiting[entry.user_id] = entry
+                self._recovered += 1
+            if duplicates:
+                self.journal.mark_done(duplicates)
+        self._task = asyncio.create_task(self._run())
+        if self._waiting:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        write what is left, check-ins not written within timeout stay in the
+        journal for the next start
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task = None
+        if self.journal is not None:
+            self.journal.close()
+
+    async def _run(self) -> None:
+        backoff = self.flush_interval
+        while True:
+            if not self._waiting:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._waiting) < self.batch_size and not self._stopping:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if await self._flush_batch():
+                backoff = self.flush_interval
+            else:
+                if self._stopping:
+                    return
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_retry_seconds)
+
+    async def _flush_batch(self) -> bool:
+        user_ids = list(self._waiting)[: self.batch_size]
+        for user_id in user_ids:
+            self._in_flight[user_id] = self._waiting.pop(user_id)
+        batch = list(self._in_flight.values())
+        started_at = time.perf_counter()
+        try:
+            await self._write(batch)
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            self._failures += 1
+            # what is not written yet goes back in front, in the same order
+            self._waiting = {**self._in_flight, **self._waiting}
+            self._in_flight = {}
+            return False
+        self._last_flush_ms = round((time.perf_counter() - started_at) * 1000, 3)
+        self._batches += 1
+        return True
+
+    async def _write(self, batch: List[BufferedCheckIn]) -> None:
+        """
+        flush the batch, a batch refused for bad rows (is_rejected) is split in
+        halves so one bad check-in does not hold back the others
+        """
+        try:
+            written = await self._flush(batch)
+        except Exception as exc:
+            if not self.is_rejected(exc):
+                raise
+            if len(batch) == 1:
+                self._quarantine(batch[0], exc)
+                return
+            middle = len(batch) // 2
+            await self._write(batch[:middle])
+            await self._write(batch[middle:])
+            return
+        written = set(written)
+        self._done([val for val in batch if val.user_id in written])
+        for entry in batch:
+            if entry.user_id not in written:
+                self._dropped += 1
+                self._keep(entry, MSG_DROPPED)
+        self._written += len(written)
+
+    def _quarantine(self, entry: BufferedCheckIn, exc: Exception) -> None:
+        self._quarantined += 1
+        self._keep(entry, repr(exc))
+
+    def _keep(self, entry: BufferedCheckIn, error: str) -> None:
+        self._in_flight.pop(entry.user_id, None)
+        if self.journal is not None:
+            self.journal.quarantine(entry, error)
+
+    def _done(self, batch: List[BufferedCheckIn]) -> None:
+        for entry in batch:
+            self._in_flight.pop(entry.user_id, None)
+        if self.journal is not None:
+            self.journal.mark_done([val.event_id for val in batch])
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "journal": self.journal is not None,
+            "max_size": self.max_size,
+            "batch_size": self.batch_size,
+            "queue_depth": len(self._waiting),
+            "in_flight": len(self._in_flight),
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+            "recovered": self._recovered,
+            "written": self._written,
+            "dropped": self._dropped,
+            "quarantined": self._quarantined,
+            "batches": self._batches,
+            "failures": self._failures,
+            "last_flush_ms": self._last_flush_ms,
+        }
+
+
+def is_rejected_row(exc: Exception) -> bool:
+    """
+    data exception (22xxx, e.g. value too long) or integrity violation (23xxx),
+    the same rows fail again on retry. asyncpg raise both as plain DBAPIError
+    """
+    if not isinstance(exc, DBAPIError):
+        return False
+    sqlstate = getattr(exc.orig, "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23")
+
+
+async def write_check_ins(entries: List[BufferedCheckIn]) -> int:
+    async with Async_Session() as db:
+        rows = await absensi_repo.absen_masuk_batch(
+            db=db, entries=[val.as_row() for val in entries]
+        )
+    return [val.user_id for val in rows if val.outcome == absensi_repo.CHECK_IN_CREATED]
+
+
+checkin_buffer = CheckInBuffer(
+    flush=write_check_ins,
+    max_size=CHECKIN_BUFFER_MAX_SIZE,
+    batch_size=CHECKIN_BUFFER_BATCH_SIZE,
+    flush_ms=CHECKIN_BUFFER_FLUSH_MS,
+    journal=CheckInJournal(CHECKIN_BUFFER_JOURNAL_DIR, fsync=CHECKIN_BUFFER_FSYNC)
+    if CHECKIN_BUFFER_JOURNAL_DIR
+    else None,
+    is_rejected=is_rejected_row,
+)
@@ -0,0 +1,64 @@
+import threading
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from common.cache import TTLCache
+from settings import (
+    DASHBOARD_CACHE_SIZE,
+    DASHBOARD_CACHE_TTL_SECONDS,
+    DASHBOARD_CACHE_HISTORY_TTL_SECONDS,
+    SYNC_MAX_AGE_DAYS,
+)
+
+ADMIN_SCOPE = "admin"
+_MISSING = object()
+
+# (endpoint, scope, start_date, end_date) -> result of the dashboard query, scope is
+# ADMIN_SCOPE or the user id. Invalidated by the absensi writes of this worker, the
+# other workers and the cli see them after the TTL of the entry (dashboard_ttl)
+dashboard_cache = TTLCache(maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL_SECONDS)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def dashboard_ttl(end_date: date, today: Optional[date] = None) -> float:
+    """
+    a range reaching the last SYNC_MAX_AGE_DAYS days still get check-in from
+    /absensi/sync, it expire after the TTL. Older ranges change only through forced
+    check-out, `rebuild-summary` or `archive`, they expire after the history TTL
+    """
+    if end_date < (today or date.today()) - timedelta(days=SYNC_MAX_AGE_DAYS):
+        return DASHBOARD_CACHE_HISTORY_TTL_SECONDS
+    return DASHBOARD_CACHE_TTL_SECONDS
+
+
+async def cached_dashboard(
+    endpoint: str,
+    scope: Hashable,
+    start_date: date,
+    end_date: date,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    key = (endpoint, scope, start_date, end_date)
+    value = dashboard_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    generation = _generation
+    value = await compute()
+    # an invalidation while computing may have missed this result, do not keep it
+    if generation == _generation:
+        dashboard_cache.set(key, value, ttl=dashboard_ttl(end_date))
+    return value
+
+
+def invalidate_dashboard(tanggal_absen: date, user_id: Optional[int] = None) -> int:
+    """
+    drop the admin entries, and the entries of user_id, whose range contains
+    tanggal_absen. Return the number of removed entries
+    """
+    global _generation
+    with _generation_lock:
+        _generation += 1
+    scopes = {ADMIN_SCOPE, user_id}
+    return dashboard_cache.invalidate_where(
+        lambda key, _: key[1] in scopes and key[2] <= tanggal_absen <= key[3]
+    )
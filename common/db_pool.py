@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    def __init__(self, sample_size: int = 1000) -> None:
+        """
+        checkout counters and wait-time samples of one connection pool
+        sample_size: number of last wait-time samples kept for metrics
+        """
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self._wait_samples = deque(maxlen=sample_size)
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._wait_samples.append(wait)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            checkouts = self.checkouts
+            timeouts = self.timeouts
+            connects = self.connects
+        wait_ms = {"avg": 0.0, "p95": 0.0, "max": 0.0}
+        if samples:
+            wait_ms = {
+                "avg": round(sum(samples) / len(samples) * 1000, 3),
+                "p95": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 3),
+                "max": round(samples[-1] * 1000, 3),
+            }
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "connects": connects,
+            "wait_ms": wait_ms,
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that measure how long each checkout waited for a connection,
+    pass it to create_engine with poolclass=InstrumentedQueuePool
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_checkout(time.perf_counter() - started_at)
+        return conn
+
+    def _create_connection(self):
+        self.stats.record_connect()
+        return super()._create_connection()
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # engine.dispose() swap the pool, keep the counters across it
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """
+    InstrumentedQueuePool for create_async_engine
+    """
+
+
+def pool_metrics(pool) -> Optional[dict]:
+    """
+    pool_size + max_overflow is the connection ceiling of this process,
+    multiply by number of workers to compare against postgres max_connections.
+    return None for pools without a queue (NullPool)
+    """
+    if not isinstance(pool, QueuePool):
+        return None
+    data = {
+        "pid": os.getpid(),
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        "max_connections": pool.size() + max(pool._max_overflow, 0),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    stats = getattr(pool, "stats", None)
+    data.update(stats.snapshot() if stats else PoolStats().snapshot())
+    return data
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class HashPoolOverloaded(Exception):
+    """
+    raised when the hash pool already holds max_workers + max_queue jobs,
+    caller should answer 503 instead of waiting
+    """
+
+
+class HashPool:
+    def __init__(self, max_workers: int, max_queue: int, sample_size: int = 1000) -> None:
+        """
+        max_workers: number of threads running bcrypt (bcrypt release the GIL)
+        max_queue: number of jobs allowed to wait for a free worker
+        sample_size: number of last wait-time samples kept for metrics
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_samples = deque(maxlen=sample_size)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HashPoolOverloaded("Password hashing queue is full")
+            self._pending += 1
+        submitted_at = time.perf_counter()
+
+        def job():
+            with self._lock:
+                self._running += 1
+                self._wait_samples.append(time.perf_counter() - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, job)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            pending = self._pending
+            running = self._running
+            completed = self._completed
+            rejected = self._rejected
+        wait_ms = {"avg": 0.0, "p95": 0.0, "max": 0.0}
+        if samples:
+            wait_ms = {
+                "avg": round(sum(samples) / len(samples) * 1000, 3),
+                "p95": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 3),
+                "max": round(samples[-1] * 1000, 3),
+            }
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queue_depth": max(pending - running, 0),
+            "completed": completed,
+            "rejected": rejected,
+            "wait_ms": wait_ms,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
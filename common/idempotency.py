@@ -0,0 +1,181 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.cache import TTLCache
+from common.responses import common_response, BadRequest, Conflict
+from repository.aio import idempotency as idempotency_repo
+from settings import (
+    IDEMPOTENCY_STORE,
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_PENDING_SECONDS,
+)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+STORE_MEMORY = "memory"
+STORE_DB = "db"
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    content: Any
+
+
+# (user_id, key) -> StoredResponse of the first request sent with that key
+idempotency_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL_SECONDS)
+# keys whose first request is still running in this worker
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def request_fingerprint(method: str, path: str, body: Any) -> str:
+    """
+    sha256 of the request, a key sent again with another request is rejected
+    """
+    raw = json.dumps([method, path, body], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def replay(stored: StoredResponse) -> JSONResponse:
+    return JSONResponse(
+        content=stored.content,
+        status_code=stored.status_code,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def _load(db: AsyncSession, user_id: int, key: str, store: str) -> Optional[StoredResponse]:
+    """
+    stored response of the key, status_code PENDING_STATUS when the first request
+    is still running in another worker (not cached)
+    """
+    cache_key = (user_id, key)
+    stored = idempotency_cache.get(cache_key)
+    if stored is not None or store != STORE_DB:
+        return stored
+    row = await idempotency_repo.get_by_key(db, user_id, key)
+    if row is None:
+        return None
+    stored = StoredResponse(row.fingerprint, row.status_code, row.response)
+    if row.status_code != idempotency_repo.PENDING_STATUS:
+        ttl = (row.expires_at - datetime.now()).total_seconds()
+        idempotency_cache.set(cache_key, stored, ttl=max(ttl, 0))
+    return stored
+
+
+def _in_progress() -> Response:
+    return common_response(
+        Conflict(message=f"Request dengan {IDEMPOTENCY_HEADER} yang sama sedang diproses")
+    )
+
+
+def _answer(stored: StoredResponse, fingerprint: str) -> Response:
+    if stored.fingerprint != fingerprint:
+        return common_response(
+            BadRequest(message=f"{IDEMPOTENCY_HEADER} sudah dipakai untuk request lain")
+        )
+    if stored.status_code == idempotency_repo.PENDING_STATUS:
+        return _in_progress()
+    return replay(stored)
+
+
+async def _release(db: AsyncSession, user_id: int, key: str, fingerprint: str) -> None:
+    """
+    drop the pending row of a failed request, kept until IDEMPOTENCY_PENDING_SECONDS
+    if that fails too
+    """
+    try:
+        await db.rollback()
+        await idempotency_repo.release(db, user_id=user_id, key=key, fingerprint=fingerprint)
+    except Exception:
+        import traceback
+        traceback.print_exc()
+
+
+async def idempotent_response(
+    db: AsyncSession,
+    user_id: int,
+    key: Optional[str],
+    fingerprint: str,
+    compute: Callable[[], Awaitable[Response]],
+    store: str = IDEMPOTENCY_STORE,
+) -> Response:
+    """
+    run compute once per (user_id, key): a retry with the same key and request get
+    the stored response back (header Idempotent-Replayed: true) without running
+    compute again. 5xx responses are not stored, the retry run compute again.
+    Without key compute always run. With store "db" the key is first reserved by a
+    pending row, only the request that inserted it run compute
+    """
+    if key is None:
+        return await compute()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return common_response(
+            BadRequest(message=f"{IDEMPOTENCY_HEADER} harus 1 sampai {MAX_KEY_LENGTH} karakter")
+        )
+    stored = await _load(db, user_id, key, store)
+    if stored is not None:
+        return _answer(stored, fingerprint)
+
+    cache_key = (user_id, key)
+    with _in_flight_lock:
+        if cache_key in _in_flight:
+            return _in_progress()
+        _in_flight.add(cache_key)
+    try:
+        # the first request may have finished while _load was running
+        stored = idempotency_cache.get(cache_key)
+        if stored is not None:
+            return _answer(stored, fingerprint)
+        reserved = store == STORE_DB
+        if reserved and not await idempotency_repo.reserve(
+            db,
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            ttl_seconds=IDEMPOTENCY_PENDING_SECONDS,
+        ):
+            # another worker got the key first
+            stored = await _load(db, user_id, key, store)
+            return _answer(stored, fingerprint) if stored is not None else _in_progress()
+        try:
+            response = await compute()
+        except BaseException:
+            if reserved:
+                await _release(db, user_id, key, fingerprint)
+            raise
+        if response.status_code >= 500:
+            if reserved:
+                await _release(db, user_id, key, fingerprint)
+            return response
+        content = json.loads(response.body) if response.body else None
+        idempotency_cache.set(cache_key, StoredResponse(fingerprint, response.status_code, content))
+        if reserved:
+            # compute already committed, a failure here must not hide its response
+            try:
+                await idempotency_repo.complete(
+                    db,
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    status_code=response.status_code,
+                    response=content,
+                    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+                )
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                await db.rollback()
+        return response
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(cache_key)
@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import date
+from enum import Enum
+from math import ceil
+from typing import Optional, Tuple
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class InvalidCursor(ValueError):
+    """
+    raised when a next_cursor token can not be decoded, routes answer 400
+    """
+
+
+def encode_cursor(tanggal_absen: date, id: int) -> str:
+    """
+    opaque keyset token of the last row of a page, ordered by (tanggal_absen, id)
+    """
+    raw = json.dumps([tanggal_absen.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        tanggal_absen, id = json.loads(raw)
+        return date.fromisoformat(tanggal_absen), int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+
+class CountMode(str, Enum):
+    """
+    how the total of a paginated list is computed
+    exact: count(*) OVER() in the page query, one round-trip
+    estimate: planner row estimate (pg_class statistics) from EXPLAIN, for huge tables
+    none: no total, for infinite scroll clients
+    """
+
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, stmt: Select) -> int:
+    """
+    row estimate of the planner for stmt, as fresh as the last ANALYZE of the tables
+    """
+    raw = (await db.execute(Explain(stmt.order_by(None).limit(None).offset(None)))).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    page: int = 1,
+    page_size: int = 10,
+    count: CountMode = CountMode.exact,
+) -> Tuple[list, Optional[int], Optional[int]]:
+    """
+    stmt is the filtered and ordered list query, return (rows, num_data, num_page).
+    num_data and num_page are None when count is none
+    """
+    limit = page_size
+    offset = (page - 1) * limit
+    if count == CountMode.exact:
+        page_stmt = stmt.add_columns(func.count().over().label("total_count"))
+        rows = (await db.execute(page_stmt.limit(limit).offset(offset))).unique().all()
+        get_list = [row[0] for row in rows]
+        if rows:
+            num_data = rows[0].total_count
+        elif offset == 0:
+            num_data = 0
+        else:
+            # page after the last one, the window has no row to report the total on
+            stmt_count = select(func.count()).select_from(stmt.order_by(None).subquery())
+            num_data = (await db.execute(stmt_count)).scalar()
+        return get_list, num_data, ceil(num_data / limit)
+
+    get_list = (await db.execute(stmt.limit(limit).offset(offset))).unique().scalars().all()
+    if count == CountMode.estimate:
+        if len(get_list) < limit and (get_list or offset == 0):
+            # last page reached, the total is known without asking the planner
+            num_data = offset + len(get_list)
+        else:
+            num_data = max(await estimate_count(db, stmt), offset + len(get_list))
+        return get_list, num_data, ceil(num_data / limit)
+    return get_list, None, None
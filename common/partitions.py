@@ -0,0 +1,131 @@
+import re
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from settings import PARTITION_MONTHS_AHEAD
+
+PARTITIONED_TABLE = "absensi"
+DEFAULT_PARTITION = "absensi_default"
+PARTITION_NAME = re.compile(r"^absensi_(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+
+def list_partitions(db: Session) -> List[date]:
+    """
+    first day of the month of every monthly partition attached to absensi
+    """
+    rows = db.execute(
+        text(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            """
+        ),
+        {"table": PARTITIONED_TABLE},
+    ).scalars()
+    months = []
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(db: Session, month: date) -> str:
+    """
+    create the partition of month. Rows of that month already stored in the
+    default partition are moved into it before it is attached
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    db.execute(
+        text(f'CREATE TABLE "{name}" (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    )
+    db.execute(
+        text(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE tanggal_absen >= :start AND tanggal_absen < :end
+                RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+            """
+        ),
+        bounds,
+    )
+    # ATTACH does not take bind parameters, bounds are dates formatted by python
+    db.execute(
+        text(
+            f"""ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION "{name}" """
+            f"""FOR VALUES FROM ('{bounds["start"].isoformat()}') TO ('{bounds["end"].isoformat()}')"""
+        )
+    )
+    return name
+
+
+def ensure_partitions(
+    db: Session,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    start: Optional[date] = None,
+    today: Optional[date] = None,
+    is_commit: bool = True,
+) -> List[str]:
+    """
+    create the missing partitions from start (default the current month) up to
+    months_ahead months after the current month, return the created names
+    """
+    current = month_start(today or date.today())
+    month = month_start(start) if start else current
+    existing = set(list_partitions(db))
+    created = []
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            created.append(create_partition(db, month))
+        month = add_months(month, 1)
+    if is_commit:
+        db.commit()
+    return created
+
+
+def drop_partitions(
+    db: Session,
+    before: date,
+    purge: bool = False,
+    today: Optional[date] = None,
+    is_commit: bool = True,
+) -> List[str]:
+    """
+    detach the partitions of the months before `before`. Detached tables keep their
+    rows as standalone absensi_YYYY_MM tables, purge drop them.
+    The current month can never be detached
+    """
+    before = month_start(before)
+    if before > month_start(today or date.today()):
+        raise ValueError("can not detach the partition of the current month or later")
+    detached = []
+    for month in list_partitions(db):
+        if month >= before:
+            continue
+        name = partition_name(month)
+        db.execute(text(f'ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION "{name}"'))
+        if purge:
+            db.execute(text(f'DROP TABLE "{name}"'))
+        detached.append(name)
+    if is_commit:
+        db.commit()
+    return detached
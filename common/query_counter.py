@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Union
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+        self.parameters: List[Any] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+
+@contextmanager
+def count_queries(engine: Union[Engine, AsyncEngine]) -> Iterator[QueryCounter]:
+    """
+    count SQL statements sent by engine inside the with block, example:
+    with count_queries(engine) as counter:
+        client.get("/auth/me", headers=headers)
+    assert counter.count == 1
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
@@ -0,0 +1,129 @@
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from settings import (
+    LOGIN_RATE_LIMIT_IP_CAPACITY,
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+    LOGIN_RATE_LIMIT_EMAIL_CAPACITY,
+    LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+    LOGIN_RATE_LIMIT_MAX_KEYS,
+    LOGIN_RATE_LIMIT_TRUSTED_HOPS,
+)
+
+
+class RateLimitBackend(ABC):
+    """
+    token bucket storage. Default MemoryRateLimitBackend is per worker process,
+    implement this interface (for example on redis with a lua script) to share
+    the buckets between workers
+    """
+
+    @abstractmethod
+    def consume(
+        self, key: str, capacity: float, refill_per_second: float, cost: float = 1
+    ) -> Tuple[bool, float]:
+        """
+        take cost tokens from bucket key, return (allowed, retry_after in seconds)
+        """
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(
+        self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        max_keys: number of bucket kept, least recently used bucket is evicted first
+        (an evicted bucket simply start full again)
+        """
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> (tokens, last refill time)
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(
+        self, key: str, capacity: float, refill_per_second: float, cost: float = 1
+    ) -> Tuple[bool, float]:
+        now = self.clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / refill_per_second
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def client_ip(
+    peer: Optional[str],
+    forwarded_for: Optional[str],
+    trusted_hops: Optional[int] = None,
+) -> Optional[str]:
+    """
+    address the IP bucket is keyed on. With trusted_hops proxies in front
+    (default LOGIN_RATE_LIMIT_TRUSTED_HOPS), each one append the address it
+    received from to X-Forwarded-For, so the client is the trusted_hops-th entry
+    from the right. Entries further left are sent by the client and can not be
+    trusted
+    """
+    if trusted_hops is None:
+        trusted_hops = LOGIN_RATE_LIMIT_TRUSTED_HOPS
+    if trusted_hops <= 0 or not forwarded_for:
+        return peer
+    addresses = [val.strip() for val in forwarded_for.split(",") if val.strip()]
+    if not addresses:
+        return peer
+    return addresses[-min(trusted_hops, len(addresses))]
+
+
+class LoginRateLimiter:
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_capacity: int,
+        ip_per_minute: int,
+        email_capacity: int,
+        email_per_minute: int,
+    ) -> None:
+        self.backend = backend
+        self.ip_capacity = ip_capacity
+        self.ip_refill = ip_per_minute / 60
+        self.email_capacity = email_capacity
+        self.email_refill = email_per_minute / 60
+
+    def check(self, ip: Optional[str], email: str) -> Optional[float]:
+        """
+        return None when the attempt is allowed, otherwise retry_after in seconds
+        """
+        if ip:
+            allowed, retry_after = self.backend.consume(
+                f"ip:{ip}", self.ip_capacity, self.ip_refill
+            )
+            if not allowed:
+                return retry_after
+        allowed, retry_after = self.backend.consume(
+            f"email:{email.strip().lower()}", self.email_capacity, self.email_refill
+        )
+        if not allowed:
+            return retry_after
+        return None
+
+
+login_rate_limiter = LoginRateLimiter(
+    backend=MemoryRateLimitBackend(max_keys=LOGIN_RATE_LIMIT_MAX_KEYS),
+    ip_capacity=LOGIN_RATE_LIMIT_IP_CAPACITY,
+    ip_per_minute=LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+    email_capacity=LOGIN_RATE_LIMIT_EMAIL_CAPACITY,
+    email_per_minute=LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+)
@@ -1,3 +1,4 @@
+from math import ceil
 from typing import Any, Optional, Union
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse, Response
@@ -31,6 +32,20 @@ class Created:
         return JSONResponse(content=self.data, status_code=201)
 
 
+class Accepted:
+    def __init__(self, data: Optional[Any]) -> None:
+        if data is not None:
+            self.data = data
+        else:
+            self.data = ""
+
+    def json(self):
+        """
+        parse class to JSONReponse
+        """
+        return JSONResponse(content=self.data, status_code=202)
+
+
 class NoContent:
     def __init__(self) -> None:
         pass
@@ -152,6 +167,34 @@ class NotFound:
             return JSONResponse(content=self.custom_response, status_code=404)
 
 
+class Conflict:
+    def __init__(
+        self, message: str = "Conflict", custom_response: Optional[Any] = None
+    ) -> None:
+        """
+        custom_response: override default json response
+        default json response:
+        json:{
+            'message': 'Conflict'
+        }
+        status_code: 409
+        """
+        self.custom_response = None
+        if custom_response is not None:
+            self.custom_response = custom_response
+        else:
+            self.message = message
+
+    def json(self) -> JSONResponse:
+        """
+        parse class to JSONReponse
+        """
+        if self.custom_response is None:
+            return JSONResponse(content={"message": self.message}, status_code=409)
+        else:
+            return JSONResponse(content=self.custom_response, status_code=409)
+
+
 class InternalServerError:
     def __init__(
         self, error: str = None, custom_response: Optional[Any] = None
@@ -213,17 +256,89 @@ class NotImplemented:
             return JSONResponse(content=self.custom_response, status_code=501)
 
 
+class ServiceUnavailable:
+    def __init__(
+        self, message: str = "Service Unavailable", custom_response: Optional[Any] = None
+    ) -> None:
+        """
+        custom_response: override default json response
+        default json response:
+        json:{
+            'message': 'Service Unavailable'
+        }
+        status_code: 503
+        """
+        self.custom_response = None
+        if custom_response is not None:
+            self.custom_response = custom_response
+        else:
+            self.message = message
+
+    def json(self) -> JSONResponse:
+        """
+        parse class to JSONReponse
+        """
+        if self.custom_response is None:
+            return JSONResponse(content={"message": self.message}, status_code=503)
+        else:
+            return JSONResponse(content=self.custom_response, status_code=503)
+
+
+class TooManyRequests:
+    def __init__(
+        self,
+        message: str = "Too Many Requests",
+        retry_after: Optional[float] = None,
+        custom_response: Optional[Any] = None,
+    ) -> None:
+        """
+        retry_after: seconds, sent as Retry-After header
+        custom_response: override default json response
+        default json response:
+        json:{
+            'message': 'Too Many Requests'
+        }
+        status_code: 429
+        """
+        self.retry_after = retry_after
+        self.custom_response = None
+        if custom_response is not None:
+            self.custom_response = custom_response
+        else:
+            self.message = message
+
+    def json(self) -> JSONResponse:
+        """
+        parse class to JSONReponse
+        """
+        headers = None
+        if self.retry_after is not None:
+            headers = {"Retry-After": str(max(ceil(self.retry_after), 1))}
+        if self.custom_response is None:
+            return JSONResponse(
+                content={"message": self.message}, status_code=429, headers=headers
+            )
+        else:
+            return JSONResponse(
+                content=self.custom_response, status_code=429, headers=headers
+            )
+
+
 def common_response(
     res: Union[
         Ok,
         Created,
+        Accepted,
         NoContent,
         BadRequest,
         Unauthorized,
         Forbidden,
         NotFound,
+        Conflict,
         InternalServerError,
         NotImplemented,
+        ServiceUnavailable,
+        TooManyRequests,
     ],
 ) -> JSONResponse:
     """
@@ -232,12 +347,16 @@ def common_response(
     if type(res) in [
         Ok,
         Created,
+        Accepted,
         NoContent,
         BadRequest,
         Unauthorized,
         Forbidden,
         NotFound,
+        Conflict,
         NotImplemented,
+        ServiceUnavailable,
+        TooManyRequests,
     ]:
         return res.json()
     elif type(res) in [InternalServerError]:
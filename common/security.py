@@ -1,22 +1,120 @@
-from typing import Optional
+from typing import Iterable, Optional, Tuple, Union, List
+from dataclasses import dataclass
+from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from models.User import User
-from settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TZ
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import get_db_async
+from models.User import User, user_shift
+from settings import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    TZ,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_QUEUE,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    BCRYPT_ROUNDS,
+)
+from common.hash_pool import HashPool
+from common.cache import TTLCache
 import jwt
 import bcrypt
+import hashlib
+import secrets
+import time
 from pytz import timezone
 from datetime import datetime, timedelta
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token/")
+MSG_INVALID_CREDENTIALS = "Invalid/Expired Credentials"
 
 
-def generate_hash_password(password: str) -> str:
-    hash = bcrypt.hashpw(str.encode(password), bcrypt.gensalt())
+class InvalidCredentials(Exception):
+    """
+    raised by get_current_user and get_current_principal,
+    main.py turn it into 401 common_response(Unauthorized)
+    """
+hash_pool = HashPool(
+    max_workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE
+)
+# user id -> Principal, invalidated by repository functions that change a user,
+# the password or user_shift. Each worker has its own cache so entries are also
+# bounded by PRINCIPAL_CACHE_TTL_SECONDS
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    nama: str
+    role_id: Optional[int]
+    shift_ids: Tuple[int, ...]
+
+
+def invalidate_principals(db: Union[Session, AsyncSession], user_ids: Iterable[int]) -> None:
+    """
+    drop the cached principals of user_ids once the transaction of db is committed,
+    right away when it already is (is_commit=True). Dropping them before the commit
+    let a concurrent request cache the old row again
+    """
+    user_ids = list(user_ids)
+    session = getattr(db, "sync_session", db)
+
+    def invalidate(*_) -> None:
+        for user_id in user_ids:
+            principal_cache.invalidate(user_id)
+
+    if session.in_transaction():
+        event.listen(session, "after_commit", invalidate, once=True)
+    else:
+        invalidate()
+
+
+def generate_hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    hash = bcrypt.hashpw(str.encode(password), bcrypt.gensalt(rounds=rounds))
     return hash.decode()
 
 
+def get_hash_rounds(hash: str) -> Optional[int]:
+    """
+    read cost factor from bcrypt hash, example $2b$12$... -> 12
+    """
+    try:
+        return int(hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def password_needs_rehash(hash: str) -> bool:
+    return get_hash_rounds(hash) != BCRYPT_ROUNDS
+
+
+def calibrate_hash_rounds(
+    target_ms: float, min_rounds: int = 4, max_rounds: int = 16, samples: int = 3
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    benchmark bcrypt on this host, return (recommended rounds, [(rounds, avg ms)]).
+    Recommended rounds is the highest cost whose hashing time still fit target_ms
+    """
+    results = []
+    recommended = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        salt = bcrypt.gensalt(rounds=rounds)
+        start = time.perf_counter()
+        for _ in range(samples):
+            bcrypt.hashpw(b"calibrate-password", salt)
+        elapsed_ms = (time.perf_counter() - start) / samples * 1000
+        results.append((rounds, elapsed_ms))
+        if elapsed_ms > target_ms:
+            break
+        recommended = rounds
+    return recommended, results
+
+
 def validated_user_password(hash: str, password: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode(), hash.encode())
@@ -24,8 +122,35 @@ def validated_user_password(hash: str, password: str) -> bool:
         return False
 
 
+async def generate_hash_password_async(password: str) -> str:
+    """
+    run generate_hash_password on hash_pool so bcrypt does not block the event loop
+    raise HashPoolOverloaded when the pool queue is full
+    """
+    return await hash_pool.run(generate_hash_password, password)
+
+
+async def validated_user_password_async(hash: str, password: str) -> bool:
+    """
+    run validated_user_password on hash_pool so bcrypt does not block the event loop
+    raise HashPoolOverloaded when the pool queue is full
+    """
+    return await hash_pool.run(validated_user_password, hash, password)
+
+
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    refresh token already has 256 bit entropy, sha256 is enough (no bcrypt needed)
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 async def generate_jwt_token_from_user(
-    user: User, ignore_timezone: bool = False
+    user: Union[User, Principal], ignore_timezone: bool = False
 ) -> str:
     expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     if ignore_timezone is False:
@@ -47,12 +172,155 @@ async def generate_jwt_token_from_user(
     return jwt_token
 
 
-def get_user_from_jwt_token(db: Session, jwt_token: str) -> Optional[User]:
+def _user_query(id: int, with_relations: bool = False):
+    query = select(User).filter(User.id == id)
+    if with_relations:
+        query = query.options(joinedload(User.userRole), joinedload(User.userShift))
+    return query
+
+
+def _principal_query(id: int):
+    return (
+        select(
+            User.id,
+            User.email,
+            User.nama,
+            User.role_id,
+            func.array_remove(func.array_agg(user_shift.c.shift_id), None),
+        )
+        .outerjoin(user_shift, user_shift.c.user_id == User.id)
+        .filter(User.id == id)
+        .group_by(User.id)
+    )
+
+
+def _token_user_id(payload: dict) -> Optional[int]:
+    """
+    user id of a decoded payload, None when the signed token has no numeric id
+    """
+    try:
+        return int(payload["id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _principal_from_row(row, payload: dict) -> Principal:
+    principal = Principal(
+        id=row[0],
+        email=row[1],
+        nama=row[2],
+        role_id=row[3],
+        shift_ids=tuple(row[4] or ()),
+    )
+    ttl = min(PRINCIPAL_CACHE_TTL_SECONDS, payload["exp"] - datetime.now().timestamp())
+    if ttl > 0:
+        principal_cache.set(principal.id, principal, ttl=ttl)
+    return principal
+
+
+def get_user_from_jwt_token(
+    db: Session, jwt_token: str, with_relations: bool = False
+) -> Optional[User]:
+    """
+    with_relations: load userRole and userShift in the same statement (joined eager load)
+    """
     try:
         payload = jwt.decode(jwt_token, key=SECRET_KEY, algorithms=[ALGORITHM])
-        id = payload.get("id")
-        query = select(User).filter(User.id == id)
-        user = db.execute(query).scalar()
     except jwt.ExpiredSignatureError:
         return None
+    id = _token_user_id(payload)
+    if id is None:
+        return None
+    query = _user_query(id, with_relations)
+    user = db.execute(query).unique().scalar()
     return user
+
+
+async def get_user_from_jwt_token_async(
+    db: AsyncSession, jwt_token: str, with_relations: bool = False
+) -> Optional[User]:
+    """
+    AsyncSession variant of get_user_from_jwt_token
+    """
+    try:
+        payload = jwt.decode(jwt_token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        return None
+    id = _token_user_id(payload)
+    if id is None:
+        return None
+    query = _user_query(id, with_relations)
+    user = (await db.execute(query)).unique().scalar()
+    return user
+
+
+def get_principal_from_jwt_token(db: Session, jwt_token: str) -> Optional[Principal]:
+    """
+    same as get_user_from_jwt_token but return a cached Principal snapshot,
+    the database is only queried on cache miss
+    """
+    try:
+        payload = jwt.decode(jwt_token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    id = _token_user_id(payload)
+    if id is None:
+        return None
+    principal = principal_cache.get(id)
+    if principal is not None:
+        return principal
+    row = db.execute(_principal_query(id)).first()
+    if row is None:
+        return None
+    return _principal_from_row(row, payload)
+
+
+async def get_principal_from_jwt_token_async(
+    db: AsyncSession, jwt_token: str
+) -> Optional[Principal]:
+    """
+    AsyncSession variant of get_principal_from_jwt_token
+    """
+    try:
+        payload = jwt.decode(jwt_token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    id = _token_user_id(payload)
+    if id is None:
+        return None
+    principal = principal_cache.get(id)
+    if principal is not None:
+        return principal
+    row = (await db.execute(_principal_query(id))).first()
+    if row is None:
+        return None
+    return _principal_from_row(row, payload)
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db_async), token: str = Depends(oauth2_scheme)
+) -> User:
+    """
+    FastAPI dependency, resolve bearer token to User with userRole and userShift
+    loaded in one query. Use it when handler need the ORM object
+    """
+    try:
+        user = await get_user_from_jwt_token_async(db, token, with_relations=True)
+    except jwt.InvalidTokenError:
+        user = None
+    if user is None:
+        raise InvalidCredentials()
+    return user
+
+
+async def get_current_principal(
+    db: AsyncSession = Depends(get_db_async), token: str = Depends(oauth2_scheme)
+) -> Principal:
+    """
+    FastAPI dependency, resolve bearer token to cached Principal.
+    Use it when handler only need the caller identity
+    """
+    principal = await get_principal_from_jwt_token_async(db, token)
+    if principal is None:
+        raise InvalidCredentials()
+    return principal
@@ -0,0 +1,130 @@
+from datetime import date, datetime, time
+from unittest import IsolatedAsyncioTestCase
+from models.Shift import Shift
+from schemas.absensi import SyncAbsensiEvent
+from repository.absensi import FORCED_KETERANGAN
+from common.absensi_sync import (
+    SYNC_CREATED,
+    SYNC_CLOSED,
+    SYNC_DUPLICATE,
+    SYNC_INVALID_TIME,
+    SYNC_OUTSIDE_AREA,
+    SYNC_OUTSIDE_SHIFT,
+    SYNC_OPEN_SESSION,
+    SYNC_NO_OPEN_SESSION,
+    SyncRow,
+    plan_sync,
+)
+from settings import LAT_OF_CENTER, LONG_OF_CENTER
+
+NOW = datetime(2024, 1, 10, 17, 0)
+EARLIEST = date(2024, 1, 3)
+
+
+def event(event_id: str, jenis: str, waktu: datetime, latitude=LAT_OF_CENTER, longitude=LONG_OF_CENTER):
+    return SyncAbsensiEvent(
+        event_id=event_id, jenis=jenis, waktu=waktu, latitude=latitude, longitude=longitude
+    )
+
+
+class TestPlanSync(IsolatedAsyncioTestCase):
+    def plan(self, events, open_rows=None, seen=None, shifts=None):
+        return plan_sync(events, open_rows or [], seen or {}, shifts or [], NOW, EARLIEST)
+
+    def statuses(self, plan):
+        return [val.status for val in plan.results]
+
+    async def test_check_in_and_out(self):
+        # When
+        plan = self.plan(
+            [
+                event("1", "masuk", datetime(2024, 1, 9, 7, 0)),
+                event("2", "keluar", datetime(2024, 1, 9, 15, 0)),
+                event("3", "masuk", datetime(2024, 1, 10, 7, 0)),
+            ]
+        )
+
+        # Expect
+        self.assertEqual(self.statuses(plan), [SYNC_CREATED, SYNC_CLOSED, SYNC_CREATED])
+        self.assertEqual(len(plan.new_rows), 2)
+        self.assertEqual(plan.new_rows[0].jam_keluar, time(15, 0))
+        self.assertIsNone(plan.new_rows[1].jam_keluar)
+        self.assertEqual(plan.closed_rows, [])
+
+    async def test_close_open_session_of_database(self):
+        # Given
+        today = SyncRow(id=7, tanggal_absen=date(2024, 1, 10), jam_masuk=time(7), lokasi_masuk="x")
+
+        # When
+        plan = self.plan([event("1", "keluar", datetime(2024, 1, 10, 15, 0))], open_rows=[today])
+
+        # Expect
+        self.assertEqual(self.statuses(plan), [SYNC_CLOSED])
+        self.assertEqual(plan.closed_rows, [today])
+        self.assertEqual(plan.new_rows, [])
+
+    async def test_check_in_force_previous_day(self):
+        # Given
+        yesterday = SyncRow(id=7, tanggal_absen=date(2024, 1, 9), jam_masuk=time(7), lokasi_masuk="x")
+
+        # When
+        plan = self.plan([event("1", "masuk", datetime(2024, 1, 10, 7, 0))], open_rows=[yesterday])
+
+        # Expect
+        self.assertEqual(self.statuses(plan), [SYNC_CREATED])
+        self.assertEqual(yesterday.keterangan, FORCED_KETERANGAN)
+        self.assertEqual(yesterday.lokasi_keluar, "x")
+        self.assertEqual(plan.closed_rows, [yesterday])
+
+    async def test_rejected_events(self):
+        # Given
+        today = SyncRow(id=7, tanggal_absen=date(2024, 1, 10), jam_masuk=time(7), lokasi_masuk="x")
+
+        # When
+        open_session = self.plan([event("1", "masuk", datetime(2024, 1, 10, 8, 0))], open_rows=[today])
+        no_session = self.plan([event("1", "keluar", datetime(2024, 1, 10, 15, 0))])
+        before_masuk = self.plan([event("1", "keluar", datetime(2024, 1, 10, 6, 0))], open_rows=[today])
+        too_old = self.plan([event("1", "masuk", datetime(2024, 1, 1, 7, 0))])
+        future = self.plan([event("1", "masuk", datetime(2024, 1, 11, 7, 0))])
+        outside = self.plan([event("1", "masuk", datetime(2024, 1, 10, 7, 0), latitude=LAT_OF_CENTER + 1)])
+
+        # Expect
+        self.assertEqual(self.statuses(open_session), [SYNC_OPEN_SESSION])
+        self.assertEqual(self.statuses(no_session), [SYNC_NO_OPEN_SESSION])
+        self.assertEqual(self.statuses(before_masuk), [SYNC_INVALID_TIME])
+        self.assertEqual(self.statuses(too_old), [SYNC_INVALID_TIME])
+        self.assertEqual(self.statuses(future), [SYNC_INVALID_TIME])
+        self.assertEqual(self.statuses(outside), [SYNC_OUTSIDE_AREA])
+        self.assertEqual(today.jam_keluar, None)
+
+    async def test_shift_window(self):
+        # Given
+        shifts = [Shift(nama_shift="Pagi", jam_mulai=time(7), jam_akhir=time(12))]
+
+        # When
+        plan = self.plan(
+            [
+                event("1", "masuk", datetime(2024, 1, 10, 3, 0)),
+                event("2", "masuk", datetime(2024, 1, 10, 6, 30)),
+            ],
+            shifts=shifts,
+        )
+
+        # Expect
+        self.assertEqual(self.statuses(plan), [SYNC_OUTSIDE_SHIFT, SYNC_CREATED])
+
+    async def test_duplicate(self):
+        # When
+        plan = self.plan(
+            [
+                event("1", "masuk", datetime(2024, 1, 10, 7, 0)),
+                event("1", "masuk", datetime(2024, 1, 10, 7, 0)),
+                event("2", "keluar", datetime(2024, 1, 10, 15, 0)),
+            ],
+            seen={"2": 41},
+        )
+
+        # Expect
+        self.assertEqual(self.statuses(plan), [SYNC_CREATED, SYNC_DUPLICATE, SYNC_DUPLICATE])
+        self.assertEqual(plan.results[2].absensi_id, 41)
+        self.assertEqual(len(plan.new_rows), 1)
@@ -0,0 +1,193 @@
+import tempfile
+from datetime import date, time
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+import alembic.config
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import factory_session, clear_all_data_on_database
+from models.Absensi import Absensi
+from migrations.factories.UserFactory import UserFactory
+from migrations.factories.RoleFactory import RoleFactory
+from repository import absensi as absensi_repo
+from common.partitions import create_partition, list_partitions
+from common.archive import (
+    _MonthWriter,
+    _save_manifest,
+    archive_absensi,
+    archive_cutoff,
+    archived_absensi,
+    load_manifest,
+)
+
+
+def write_archive(directory: str, cutoff: date, rows: list) -> None:
+    files = []
+    for month in sorted({row[1].replace(day=1) for row in rows}):
+        writer = _MonthWriter(directory, month, "test")
+        for row in rows:
+            if row[1].replace(day=1) == month:
+                writer.write(row)
+        files.append(writer.close())
+    _save_manifest(directory, {"cutoff": cutoff.isoformat(), "files": files})
+
+
+class TestArchiveRead(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        # ARCHIVE_COLUMNS order
+        write_archive(
+            self.directory,
+            date(2024, 3, 1),
+            [
+                (1, date(2024, 1, 10), time(7), time(15), None, "-6.2, 106.8", None, 1, None, None, "Budi", "budi@example.com"),
+                (2, date(2024, 1, 11), time(8), time(15), None, "-6.2, 106.8", None, 2, None, None, "Ani", "ani@example.com"),
+                (3, date(2024, 2, 10), time(7), None, None, "-6.2, 106.8", None, 1, None, None, "Budi", "budi@example.com"),
+            ],
+        )
+        return super().setUp()
+
+    async def test_archived_absensi(self):
+        # When
+        all_rows = archived_absensi(directory=self.directory)
+        january = archived_absensi(date(2024, 1, 1), date(2024, 1, 31), directory=self.directory)
+        budi = archived_absensi(user_name="bud", directory=self.directory)
+        jam_masuk = archived_absensi(jam_masuk=time(8), directory=self.directory)
+
+        # Expect
+        self.assertEqual(archive_cutoff(self.directory), date(2024, 3, 1))
+        self.assertEqual(sorted(val.id for val in all_rows), [1, 2, 3])
+        self.assertEqual(sorted(val.id for val in january), [1, 2])
+        self.assertEqual(sorted(val.id for val in budi), [1, 3])
+        self.assertEqual([val.id for val in jam_masuk], [2])
+        self.assertEqual(jam_masuk[0].absen_user.nama, "Ani")
+        self.assertEqual(jam_masuk[0].lokasi_masuk, "-6.2, 106.8")
+        self.assertIsNone(jam_masuk[0].lokasi_keluar)
+
+    async def test_range_after_cutoff(self):
+        # Expect
+        self.assertEqual(
+            archived_absensi(date(2024, 3, 1), date(2024, 3, 31), directory=self.directory), []
+        )
+        self.assertEqual(archived_absensi(directory=tempfile.mkdtemp()), [])
+
+
+class TestArchive(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        alembic_args = ["-c", "alembic.ini", "upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        self.db: Session = factory_session()
+        clear_all_data_on_database(self.db)
+        self.directory = tempfile.mkdtemp()
+        return super().setUp()
+
+    async def test_archive_absensi(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, lokasi_masuk, user_id)
+                SELECT DATE '2024-01-01' + n, TIME '07:00', TIME '15:00', 'sekolah', :user_id
+                FROM generate_series(0, 59) AS n
+                """
+            ),
+            {"user_id": user.id},
+        )
+        self.db.commit()
+
+        # When
+        report = archive_absensi(
+            db=self.db, before=date(2024, 2, 1), directory=self.directory, batch_size=7
+        )
+
+        # Expect
+        self.assertEqual(report["rows"], 31)
+        self.assertEqual(report["deleted"], 31)
+        self.assertEqual([val["month"] for val in report["files"]], ["2024-01"])
+        self.assertTrue((Path(self.directory) / report["files"][0]["file"]).exists())
+        self.assertEqual(load_manifest(self.directory)["cutoff"], "2024-02-01")
+        self.assertEqual(self.db.query(Absensi).count(), 29)
+
+    async def test_archive_absensi_drop_partitions(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        for month in [date(2024, 1, 1), date(2024, 2, 1)]:
+            create_partition(self.db, month)
+            self.addCleanup(
+                lambda name=f"absensi_{month:%Y_%m}": (
+                    self.db.rollback(),
+                    self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"')),
+                    self.db.commit(),
+                )
+            )
+        self.db.commit()
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, lokasi_masuk, user_id)
+                SELECT DATE '2024-01-01' + n, TIME '07:00', TIME '15:00', 'sekolah', :user_id
+                FROM generate_series(0, 59) AS n
+                """
+            ),
+            {"user_id": user.id},
+        )
+        self.db.commit()
+
+        # When
+        report = archive_absensi(
+            db=self.db, before=date(2024, 2, 10), directory=self.directory, batch_size=7
+        )
+
+        # Expect
+        self.assertEqual(report["rows"], 40)
+        self.assertEqual(report["deleted"], 40)
+        months = list_partitions(self.db)
+        self.assertNotIn(date(2024, 1, 1), months)
+        self.assertIn(date(2024, 2, 1), months)
+        self.assertEqual(self.db.query(Absensi).count(), 20)
+
+    async def test_export_excel_admin_read_archive(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, user_id)
+                VALUES (DATE '2024-01-15', TIME '07:00', :user_id),
+                       (DATE '2024-02-15', TIME '07:00', :user_id)
+                """
+            ),
+            {"user_id": user.id},
+        )
+        self.db.commit()
+        archive_absensi(db=self.db, before=date(2024, 2, 1), directory=self.directory)
+
+        # When
+        data = absensi_repo.export_excel_admin(
+            db=self.db,
+            start_date="2024-01-01",
+            end_date="2024-02-28",
+            archive_directory=self.directory,
+        )
+
+        # Expect
+        self.assertEqual(
+            [str(val.tanggal_absen) for val in data], ["2024-02-15", "2024-01-15"]
+        )
+        self.assertEqual(data[1].absen_user.nama, "Guru")
+
+    def tearDown(self) -> None:
+        self.db.rollback()
+        clear_all_data_on_database(self.db)
+        factory_session.remove()
+        return super().tearDown()
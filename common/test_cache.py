@@ -0,0 +1,59 @@
+import time
+from unittest import TestCase
+from common.cache import TTLCache
+
+
+class TestTTLCache(TestCase):
+    def test_get_set(self):
+        # Given
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+
+        # When
+        result = cache.get("a")
+
+        # Expect
+        self.assertEqual(result, 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_lru_eviction(self):
+        # Given
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # When
+        cache.set("c", 3)
+
+        # Expect
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expired_entry(self):
+        # Given
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=0.01)
+        cache.set("b", 2)
+
+        # When
+        time.sleep(0.02)
+
+        # Expect
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_invalidate_where(self):
+        # Given
+        cache = TTLCache()
+        cache.set(("a", 1), 1)
+        cache.set(("a", 2), 2)
+        cache.set(("b", 1), 3)
+
+        # When
+        removed = cache.invalidate_where(lambda key, value: key[0] == "a")
+
+        # Expect
+        self.assertEqual(removed, 2)
+        self.assertEqual(len(cache), 1)
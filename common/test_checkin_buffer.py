@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time as time_module
+from datetime import date, time
+from unittest import IsolatedAsyncioTestCase
+from common.checkin_buffer import (
+    BufferedCheckIn,
+    CheckInBuffer,
+    CheckInBufferFull,
+    CheckInJournal,
+    is_rejected_row,
+)
+from sqlalchemy.exc import DBAPIError
+
+TODAY = date(2024, 1, 10)
+
+
+class TestCheckInBuffer(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.batches = []
+        self.directory = tempfile.mkdtemp()
+        return super().setUp()
+
+    async def flush(self, entries):
+        self.batches.append([val.user_id for val in entries])
+        return [val.user_id for val in entries]
+
+    def buffer(self, flush=None, max_size=100, batch_size=2, flush_ms=10000, journal=None):
+        return CheckInBuffer(
+            flush=flush or self.flush,
+            max_size=max_size,
+            batch_size=batch_size,
+            flush_ms=flush_ms,
+            journal=journal,
+            max_retry_seconds=0.01,
+        )
+
+    async def submit(self, buffer, user_id):
+        return await buffer.submit(
+            user_id=user_id, tanggal_absen=TODAY, jam_masuk=time(7), lokasi_masuk="sekolah"
+        )
+
+    async def test_batch_size_trigger(self):
+        # Given
+        buffer = self.buffer(batch_size=2)
+        await buffer.start()
+
+        # When
+        for user_id in [1, 2, 3]:
+            await self.submit(buffer, user_id)
+        await asyncio.sleep(0.05)
+
+        # Expect
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertEqual(buffer.metrics()["queue_depth"], 1)
+        await buffer.stop()
+        self.assertEqual(self.batches, [[1, 2], [3]])
+        self.assertEqual(buffer.metrics()["written"], 3)
+
+    async def test_flush_interval_trigger(self):
+        # Given
+        buffer = self.buffer(batch_size=100, flush_ms=20)
+        await buffer.start()
+
+        # When
+        await self.submit(buffer, 1)
+        await asyncio.sleep(0.1)
+
+        # Expect
+        self.assertEqual(self.batches, [[1]])
+        await buffer.stop()
+
+    async def test_backpressure(self):
+        # Given
+        release = asyncio.Event()
+
+        async def slow(entries):
+            await release.wait()
+            return await self.flush(entries)
+
+        buffer = self.buffer(flush=slow, max_size=2, flush_ms=1)
+        await buffer.start()
+
+        # When
+        first = await self.submit(buffer, 1)
+        again = await self.submit(buffer, 1)
+        await self.submit(buffer, 2)
+        await asyncio.sleep(0.01)
+
+        # Expect
+        self.assertIsNotNone(first)
+        self.assertIsNone(again)
+        with self.assertRaises(CheckInBufferFull):
+            await self.submit(buffer, 3)
+        self.assertEqual(buffer.metrics()["in_flight"], 2)
+        self.assertEqual(buffer.metrics()["rejected"], 1)
+        release.set()
+        await buffer.stop()
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertIsNotNone(await self.submit(buffer, 3))
+
+    async def test_retry_failed_flush(self):
+        # Given
+        calls = []
+
+        async def flaky(entries):
+            calls.append(len(entries))
+            if len(calls) == 1:
+                raise ConnectionError("database down")
+            return await self.flush(entries)
+
+        buffer = self.buffer(flush=flaky, batch_size=1)
+        await buffer.start()
+
+        # When
+        await self.submit(buffer, 1)
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+        # Expect
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(self.batches, [[1]])
+        self.assertEqual(buffer.metrics()["failures"], 1)
+
+    async def test_journal_replay(self):
+        # Given
+        async def failing(entries):
+            raise ConnectionError("database down")
+
+        buffer = self.buffer(flush=failing, journal=CheckInJournal(self.directory))
+        await buffer.start()
+        for user_id in [1, 2]:
+            await self.submit(buffer, user_id)
+        await buffer.stop(timeout=0.05)
+
+        # When
+        restarted = self.buffer(journal=CheckInJournal(self.directory))
+        await restarted.start()
+        await restarted.stop()
+
+        # Expect
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertEqual(restarted.metrics()["recovered"], 2)
+        journal = CheckInJournal(self.directory)
+        self.assertEqual(journal.open(), [])
+        journal.close()
+
+    async def test_journal_written_off_event_loop(self):
+        # Given
+        threads = []
+
+        class SlowJournal(CheckInJournal):
+            def append(self, entry):
+                threads.append(threading.get_ident())
+                time_module.sleep(0.02)
+                super().append(entry)
+
+        buffer = self.buffer(journal=SlowJournal(self.directory))
+        await buffer.start()
+
+        # When
+        first, again = await asyncio.gather(
+            self.submit(buffer, 1), self.submit(buffer, 1)
+        )
+        await buffer.stop()
+
+        # Expect
+        self.assertIsNotNone(first)
+        self.assertIsNone(again)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(self.batches, [[1]])
+
+    async def test_journal_take_over_stopped_worker(self):
+        # Given
+        written = BufferedCheckIn("a", 1, TODAY, time(7), "sekolah")
+        pending = BufferedCheckIn("b", 2, TODAY, time(7, 5), "sekolah", "izin")
+        path = os.path.join(self.directory, "checkin-999999999.jsonl")
+        with open(path, "w") as journal_file:
+            journal_file.write(json.dumps({"add": written.to_json()}) + "\n")
+            journal_file.write(json.dumps({"add": pending.to_json()}) + "\n")
+            journal_file.write(json.dumps({"done": ["a"]}) + "\n")
+            journal_file.write('{"add": {"event_id": "c"')
+
+        # When
+        journal = CheckInJournal(self.directory)
+        recovered = journal.open()
+        journal.close()
+
+        # Expect
+        self.assertEqual(recovered, [pending])
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(journal.path)])
+
+    async def test_bad_check_in_does_not_block_queue(self):
+        # Given
+        class BadRow(Exception):
+            pass
+
+        async def strict(entries):
+            if any(val.user_id == 2 for val in entries):
+                raise BadRow("value too long for type character varying(100)")
+            return await self.flush(entries)
+
+        buffer = CheckInBuffer(
+            flush=strict,
+            max_size=100,
+            batch_size=4,
+            flush_ms=10000,
+            journal=CheckInJournal(self.directory),
+            max_retry_seconds=0.01,
+            is_rejected=lambda exc: isinstance(exc, BadRow),
+        )
+        await buffer.start()
+
+        # When
+        for user_id in [1, 2, 3, 4, 5]:
+            await self.submit(buffer, user_id)
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+        # Expect
+        self.assertEqual(self.batches, [[1], [3, 4], [5]])
+        metrics = buffer.metrics()
+        self.assertEqual(metrics["written"], 4)
+        self.assertEqual(metrics["quarantined"], 1)
+        self.assertEqual(metrics["failures"], 0)
+        self.assertEqual(metrics["queue_depth"], 0)
+        with open(os.path.join(self.directory, "quarantine.jsonl")) as quarantine_file:
+            quarantined = [json.loads(line) for line in quarantine_file]
+        self.assertEqual([val["add"]["user_id"] for val in quarantined], [2])
+        journal = CheckInJournal(self.directory)
+        self.assertEqual(journal.open(), [])
+        journal.close()
+
+    async def test_dropped_check_in_quarantined(self):
+        # Given
+        async def open_session(entries):
+            # user 2 still has an open session of the day
+            await self.flush(entries)
+            return [val.user_id for val in entries if val.user_id != 2]
+
+        buffer = self.buffer(
+            flush=open_session, batch_size=2, journal=CheckInJournal(self.directory)
+        )
+        await buffer.start()
+
+        # When
+        for user_id in [1, 2]:
+            await self.submit(buffer, user_id)
+        await buffer.stop()
+
+        # Expect
+        metrics = buffer.metrics()
+        self.assertEqual(metrics["written"], 1)
+        self.assertEqual(metrics["dropped"], 1)
+        with open(os.path.join(self.directory, "quarantine.jsonl")) as quarantine_file:
+            quarantined = [json.loads(line) for line in quarantine_file]
+        self.assertEqual([val["add"]["user_id"] for val in quarantined], [2])
+        journal = CheckInJournal(self.directory)
+        self.assertEqual(journal.open(), [])
+        journal.close()
+
+    def test_is_rejected_row(self):
+        class PostgresError(Exception):
+            def __init__(self, sqlstate):
+                self.sqlstate = sqlstate
+
+        too_long = DBAPIError("INSERT", {}, PostgresError("22001"))
+        not_null = DBAPIError("INSERT", {}, PostgresError("23502"))
+        connection = DBAPIError("INSERT", {}, PostgresError("08006"))
+
+        self.assertTrue(is_rejected_row(too_long))
+        self.assertTrue(is_rejected_row(not_null))
+        self.assertFalse(is_rejected_row(connection))
+        self.assertFalse(is_rejected_row(ConnectionError("database down")))
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+from unittest import IsolatedAsyncioTestCase
+from common.dashboard_cache import (
+    ADMIN_SCOPE,
+    dashboard_cache,
+    dashboard_ttl,
+    cached_dashboard,
+    invalidate_dashboard,
+)
+from settings import (
+    DASHBOARD_CACHE_TTL_SECONDS,
+    DASHBOARD_CACHE_HISTORY_TTL_SECONDS,
+    SYNC_MAX_AGE_DAYS,
+)
+
+
+class TestDashboardCache(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        dashboard_cache.clear()
+        self.calls = 0
+        return super().setUp()
+
+    async def compute(self) -> int:
+        self.calls += 1
+        return self.calls
+
+    async def test_cached_dashboard(self):
+        # Given
+        start_date, end_date = date(2024, 1, 1), date(2024, 1, 31)
+
+        # When
+        first = await cached_dashboard("admin/count-day", ADMIN_SCOPE, start_date, end_date, self.compute)
+        second = await cached_dashboard("admin/count-day", ADMIN_SCOPE, start_date, end_date, self.compute)
+        other_user = await cached_dashboard("user/count-day", 7, start_date, end_date, self.compute)
+
+        # Expect
+        self.assertEqual((first, second, other_user), (1, 1, 2))
+        self.assertEqual(self.calls, 2)
+
+    async def test_dashboard_ttl(self):
+        # Given
+        today = date(2024, 2, 1)
+
+        last_sync_day = today - timedelta(days=SYNC_MAX_AGE_DAYS)
+
+        # Expect
+        self.assertEqual(
+            dashboard_ttl(last_sync_day - timedelta(days=1), today=today),
+            DASHBOARD_CACHE_HISTORY_TTL_SECONDS,
+        )
+        self.assertEqual(dashboard_ttl(last_sync_day, today=today), DASHBOARD_CACHE_TTL_SECONDS)
+        self.assertEqual(dashboard_ttl(date(2024, 1, 31), today=today), DASHBOARD_CACHE_TTL_SECONDS)
+        self.assertEqual(dashboard_ttl(today, today=today), DASHBOARD_CACHE_TTL_SECONDS)
+        self.assertEqual(dashboard_ttl(date(2024, 2, 29), today=today), DASHBOARD_CACHE_TTL_SECONDS)
+
+    async def test_invalidate_dashboard(self):
+        # Given
+        today = date.today()
+        january = (date(2024, 1, 1), date(2024, 1, 31))
+        this_week = (today - timedelta(days=6), today)
+        await cached_dashboard("admin/count-day", ADMIN_SCOPE, *january, self.compute)
+        await cached_dashboard("admin/count-day", ADMIN_SCOPE, *this_week, self.compute)
+        await cached_dashboard("user/count-day", 7, *this_week, self.compute)
+        await cached_dashboard("user/count-day", 8, *this_week, self.compute)
+
+        # When
+        removed = invalidate_dashboard(today, user_id=7)
+
+        # Expect
+        self.assertEqual(removed, 2)
+        self.assertEqual(len(dashboard_cache), 2)
+        self.assertEqual(
+            await cached_dashboard("admin/count-day", ADMIN_SCOPE, *january, self.compute), 1
+        )
+        self.assertEqual(await cached_dashboard("user/count-day", 8, *this_week, self.compute), 4)
+
+    async def test_invalidate_while_computing(self):
+        # Given
+        today = date.today()
+
+        async def compute_then_write():
+            invalidate_dashboard(today)
+            return "stale"
+
+        # When
+        stale = await cached_dashboard("admin/count-day", ADMIN_SCOPE, today, today, compute_then_write)
+
+        # Expect
+        self.assertEqual(stale, "stale")
+        self.assertEqual(len(dashboard_cache), 0)
+
+    def tearDown(self) -> None:
+        dashboard_cache.clear()
+        return super().tearDown()
@@ -0,0 +1,61 @@
+from unittest import IsolatedAsyncioTestCase
+from sqlalchemy import create_engine, exc, text
+from common.db_pool import InstrumentedQueuePool, pool_metrics
+
+
+class TestDbPool(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        return super().tearDown()
+
+    async def test_checkout_metrics(self):
+        # Given
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        # When
+        metrics = pool_metrics(self.engine.pool)
+
+        # Expect
+        self.assertEqual(metrics["pool_size"], 1)
+        self.assertEqual(metrics["max_connections"], 1)
+        self.assertEqual(metrics["checkouts"], 1)
+        self.assertEqual(metrics["connects"], 1)
+        self.assertEqual(metrics["checked_out"], 0)
+        self.assertEqual(metrics["timeouts"], 0)
+
+    async def test_timeout_metrics(self):
+        # Given
+        conn = self.engine.connect()
+
+        # When
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+        metrics = pool_metrics(self.engine.pool)
+        conn.close()
+
+        # Expect
+        self.assertEqual(metrics["checked_out"], 1)
+        self.assertEqual(metrics["timeouts"], 1)
+        self.assertGreaterEqual(metrics["wait_ms"]["max"], 0)
+
+    async def test_stats_survive_dispose(self):
+        # Given
+        with self.engine.connect():
+            pass
+
+        # When
+        self.engine.dispose()
+
+        # Expect
+        self.assertEqual(pool_metrics(self.engine.pool)["checkouts"], 1)
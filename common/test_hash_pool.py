@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase
+from common.hash_pool import HashPool, HashPoolOverloaded
+
+
+class TestHashPool(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.pool = HashPool(max_workers=1, max_queue=1)
+        self.release = threading.Event()
+        return super().setUp()
+
+    def blocking_job(self, value: int) -> int:
+        self.release.wait(timeout=5)
+        return value
+
+    async def test_run(self):
+        # Given
+        self.release.set()
+
+        # When
+        result = await self.pool.run(self.blocking_job, 7)
+
+        # Expect
+        self.assertEqual(result, 7)
+        metrics = self.pool.metrics()
+        self.assertEqual(metrics["completed"], 1)
+        self.assertEqual(metrics["queue_depth"], 0)
+
+    async def test_reject_when_queue_full(self):
+        # Given
+        running = asyncio.ensure_future(self.pool.run(self.blocking_job, 1))
+        queued = asyncio.ensure_future(self.pool.run(self.blocking_job, 2))
+        await asyncio.sleep(0.05)
+
+        # When
+        with self.assertRaises(HashPoolOverloaded):
+            await self.pool.run(self.blocking_job, 3)
+
+        # Expect
+        metrics = self.pool.metrics()
+        self.assertEqual(metrics["running"], 1)
+        self.assertEqual(metrics["queue_depth"], 1)
+        self.assertEqual(metrics["rejected"], 1)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(running, queued), [1, 2])
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.pool.shutdown()
+        return super().tearDown()
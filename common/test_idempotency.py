@@ -0,0 +1,216 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+import alembic.config
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from common.idempotency import (
+    REPLAYED_HEADER,
+    STORE_DB,
+    STORE_MEMORY,
+    idempotency_cache,
+    idempotent_response,
+    request_fingerprint,
+)
+from common.responses import common_response, Ok, InternalServerError
+from models import Async_Session, factory_session, clear_all_data_on_database
+from models.IdempotencyKey import IdempotencyKey
+from migrations.factories.UserFactory import UserFactory
+from migrations.factories.RoleFactory import RoleFactory
+from repository.aio import idempotency as idempotency_repo
+
+
+class TestIdempotency(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        idempotency_cache.clear()
+        self.calls = 0
+        self.fingerprint = request_fingerprint("POST", "/absensi/masuk", {"lokasi_masuk": "sekolah"})
+        return super().setUp()
+
+    async def compute(self):
+        self.calls += 1
+        return common_response(Ok(data={"id": self.calls}))
+
+    async def send(self, key, fingerprint=None, compute=None):
+        return await idempotent_response(
+            db=None,
+            user_id=1,
+            key=key,
+            fingerprint=fingerprint or self.fingerprint,
+            compute=compute or self.compute,
+            store=STORE_MEMORY,
+        )
+
+    async def test_replay(self):
+        # When
+        first = await self.send("key-1")
+        retry = await self.send("key-1")
+        other_key = await self.send("key-2")
+        without_key = await self.send(None)
+
+        # Expect
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(first.body, retry.body)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.headers[REPLAYED_HEADER], "true")
+        self.assertNotIn(REPLAYED_HEADER, first.headers)
+        self.assertNotEqual(other_key.body, first.body)
+        self.assertNotEqual(without_key.body, first.body)
+
+    async def test_key_reused_for_other_request(self):
+        # Given
+        await self.send("key-1")
+
+        # When
+        response = await self.send(
+            "key-1", fingerprint=request_fingerprint("POST", "/absensi/masuk", {"lokasi_masuk": "rumah"})
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.calls, 1)
+
+    async def test_invalid_key(self):
+        # When
+        empty = await self.send("")
+        too_long = await self.send("x" * 256)
+
+        # Expect
+        self.assertEqual(empty.status_code, 400)
+        self.assertEqual(too_long.status_code, 400)
+        self.assertEqual(self.calls, 0)
+
+    async def test_server_error_not_stored(self):
+        # Given
+        async def failing():
+            self.calls += 1
+            return common_response(InternalServerError(error="database down"))
+
+        # When
+        with self.assertRaises(HTTPException) as first:
+            await self.send("key-1", compute=failing)
+        retry = await self.send("key-1")
+
+        # Expect
+        self.assertEqual(first.exception.status_code, 500)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    async def test_concurrent_same_key(self):
+        # Given
+        release = asyncio.Event()
+
+        async def slow():
+            self.calls += 1
+            await release.wait()
+            return common_response(Ok(data={"id": self.calls}))
+
+        # When
+        first = asyncio.create_task(self.send("key-1", compute=slow))
+        await asyncio.sleep(0)
+        second = await self.send("key-1", compute=slow)
+        release.set()
+        first = await first
+
+        # Expect
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.calls, 1)
+
+
+class TestIdempotencyDbStore(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        alembic_args = ["-c", "alembic.ini", "upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        self.db: Session = factory_session()
+        clear_all_data_on_database(self.db)
+        self.user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        idempotency_cache.clear()
+        self.calls = 0
+        self.fingerprint = request_fingerprint("POST", "/absensi/masuk", {"lokasi_masuk": "sekolah"})
+        return super().setUp()
+
+    async def compute(self):
+        self.calls += 1
+        return common_response(Ok(data={"id": self.calls}))
+
+    async def send(self, key, compute=None):
+        async with Async_Session() as db:
+            return await idempotent_response(
+                db=db,
+                user_id=self.user.id,
+                key=key,
+                fingerprint=self.fingerprint,
+                compute=compute or self.compute,
+                store=STORE_DB,
+            )
+
+    async def test_replay_on_other_worker(self):
+        # When
+        first = await self.send("key-1")
+        # other worker, nothing in its memory
+        idempotency_cache.clear()
+        retry = await self.send("key-1")
+
+        # Expect
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.headers[REPLAYED_HEADER], "true")
+        self.assertEqual(retry.body, first.body)
+
+    async def test_key_reserved_by_other_worker(self):
+        # Given
+        async with Async_Session() as db:
+            reserved = await idempotency_repo.reserve(
+                db, user_id=self.user.id, key="key-1", fingerprint=self.fingerprint, ttl_seconds=60
+            )
+            again = await idempotency_repo.reserve(
+                db, user_id=self.user.id, key="key-1", fingerprint=self.fingerprint, ttl_seconds=60
+            )
+
+        # When
+        while_running = await self.send("key-1")
+        async with Async_Session() as db:
+            await idempotency_repo.complete(
+                db,
+                user_id=self.user.id,
+                key="key-1",
+                fingerprint=self.fingerprint,
+                status_code=200,
+                response={"id": 99},
+                ttl_seconds=60,
+            )
+        after = await self.send("key-1")
+
+        # Expect
+        self.assertTrue(reserved)
+        self.assertFalse(again)
+        self.assertEqual(while_running.status_code, 409)
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.headers[REPLAYED_HEADER], "true")
+        self.assertEqual(self.calls, 0)
+
+    async def test_server_error_releases_key(self):
+        # Given
+        async def failing():
+            self.calls += 1
+            return common_response(InternalServerError(error="database down"))
+
+        # When
+        with self.assertRaises(HTTPException):
+            await self.send("key-1", compute=failing)
+        released = self.db.query(IdempotencyKey).count()
+        retry = await self.send("key-1")
+
+        # Expect
+        self.assertEqual(released, 0)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    def tearDown(self) -> None:
+        idempotency_cache.clear()
+        self.db.rollback()
+        factory_session.remove()
+        return super().tearDown()
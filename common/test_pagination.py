@@ -0,0 +1,36 @@
+from unittest import IsolatedAsyncioTestCase
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from common.pagination import encode_cursor, decode_cursor, InvalidCursor, Explain
+from models.Role import Role
+
+
+class TestPagination(IsolatedAsyncioTestCase):
+    async def test_cursor_round_trip(self):
+        # Given
+        cursor = encode_cursor(date(2025, 1, 17), 42)
+
+        # When
+        result = decode_cursor(cursor)
+
+        # Expect
+        self.assertEqual(result, (date(2025, 1, 17), 42))
+        self.assertNotIn("=", cursor)
+
+    async def test_invalid_cursor(self):
+        # Expect
+        for cursor in ["", "not-a-cursor", encode_cursor(date(2025, 1, 17), 1)[:-3]]:
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    async def test_explain_statement(self):
+        # Given
+        stmt = select(Role).filter(Role.jabatan.ilike("%dmi%")).order_by(Role.id)
+
+        # When
+        sql = str(Explain(stmt).compile(dialect=postgresql.dialect()))
+
+        # Expect
+        self.assertTrue(sql.startswith("EXPLAIN (FORMAT JSON) SELECT"))
+        self.assertIn("ILIKE", sql)
@@ -0,0 +1,86 @@
+from unittest import TestCase
+from common.rate_limit import (
+    MemoryRateLimitBackend,
+    LoginRateLimiter,
+    RateLimitBackend,
+    client_ip,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLoginRateLimiter(TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.backend = MemoryRateLimitBackend(max_keys=100, clock=self.clock)
+        self.limiter = LoginRateLimiter(
+            backend=self.backend,
+            ip_capacity=10,
+            ip_per_minute=10,
+            email_capacity=2,
+            email_per_minute=6,
+        )
+        return super().setUp()
+
+    def test_email_bucket(self):
+        # Given
+        self.limiter.check(ip="10.0.0.1", email="guru@example.com")
+        self.limiter.check(ip="10.0.0.2", email="GURU@example.com ")
+
+        # When
+        retry_after = self.limiter.check(ip="10.0.0.3", email="guru@example.com")
+        self.clock.now += 10
+        after_refill = self.limiter.check(ip="10.0.0.3", email="guru@example.com")
+
+        # Expect
+        self.assertAlmostEqual(retry_after, 10.0)
+        self.assertIsNone(after_refill)
+
+    def test_ip_bucket(self):
+        # Given
+        for i in range(10):
+            self.limiter.check(ip="10.0.0.1", email=f"user{i}@example.com")
+
+        # When
+        retry_after = self.limiter.check(ip="10.0.0.1", email="other@example.com")
+
+        # Expect
+        self.assertIsNotNone(retry_after)
+        self.assertIsNone(self.limiter.check(ip="10.0.0.2", email="other@example.com"))
+
+    def test_eviction(self):
+        # Given
+        backend = MemoryRateLimitBackend(max_keys=2, clock=self.clock)
+
+        # When
+        for key in ["a", "b", "c"]:
+            backend.consume(key, capacity=1, refill_per_second=1)
+
+        # Expect
+        self.assertEqual(len(backend), 2)
+
+    def test_incomplete_backend(self):
+        # Given
+        class NoConsume(RateLimitBackend):
+            pass
+
+        # Expect
+        with self.assertRaises(TypeError):
+            NoConsume()
+
+    def test_client_ip(self):
+        # Given
+        forwarded_for = "1.1.1.1, 10.0.0.5, 192.168.1.20"
+
+        # Expect
+        self.assertEqual(client_ip("172.16.0.1", forwarded_for, trusted_hops=0), "172.16.0.1")
+        self.assertEqual(client_ip("172.16.0.1", forwarded_for, trusted_hops=1), "192.168.1.20")
+        self.assertEqual(client_ip("172.16.0.1", forwarded_for, trusted_hops=2), "10.0.0.5")
+        self.assertEqual(client_ip("172.16.0.1", "10.0.0.5", trusted_hops=2), "10.0.0.5")
+        self.assertEqual(client_ip("172.16.0.1", None, trusted_hops=1), "172.16.0.1")
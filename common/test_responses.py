@@ -2,8 +2,10 @@ from unittest import TestCase
 from common.responses import (
     Ok,
     Created,
+    Accepted,
     NoContent,
     NotFound,
+    Conflict,
     Unauthorized,
     BadRequest,
     Forbidden,
@@ -35,6 +37,17 @@ class TestResponseService(TestCase):
         self.assertEqual(result.body, b'{"id":1,"name":"Test User Created"}')
         self.assertEqual(result.status_code, 201)
 
+    def test_Accepted(self):
+        # Given
+        req = Accepted(data={"id": None, "event_id": "abc"})
+
+        # When
+        result = common_response(res=req)
+
+        # Expect
+        self.assertEqual(result.body, b'{"id":null,"event_id":"abc"}')
+        self.assertEqual(result.status_code, 202)
+
     def test_NoContent(self):
         # Given
         req = NoContent()
@@ -125,6 +138,17 @@ class TestResponseService(TestCase):
         self.assertEqual(result.body, b'{"message":"Not Found"}')
         self.assertEqual(result.status_code, 404)
 
+    def test_Conflict(self):
+        # Given
+        req = Conflict(message="Already checked out")
+
+        # When
+        result = common_response(req)
+
+        # Expect
+        self.assertEqual(result.body, b'{"message":"Already checked out"}')
+        self.assertEqual(result.status_code, 409)
+
     def test_InternalServerError(self):
         # Given
         req = InternalServerError(error="Something wrong with application")
@@ -7,8 +7,16 @@ from common.security import (
     validated_user_password,
     generate_jwt_token_from_user,
     get_user_from_jwt_token,
+    get_principal_from_jwt_token,
+    principal_cache,
+    get_hash_rounds,
+    password_needs_rehash,
 )
 from migrations.factories.UserFactory import UserFactory
+from repository import user as user_repo, auth as auth_repo
+from settings import SECRET_KEY, ALGORITHM
+from datetime import datetime, timedelta
+import jwt
 
 
 class TestSecurity(IsolatedAsyncioTestCase):
@@ -17,6 +25,7 @@ class TestSecurity(IsolatedAsyncioTestCase):
         alembic.config.main(argv=alembic_args)
         self.db: Session = factory_session()
         clear_all_data_on_database(db=self.db)
+        principal_cache.clear()
         return super().setUp()
 
     async def test_hash_password(self):
@@ -28,6 +37,18 @@ class TestSecurity(IsolatedAsyncioTestCase):
         # Expect
         self.assertTrue(result)
 
+    async def test_password_needs_rehash(self):
+        # Given
+        hash = generate_hash_password(password="abc123!", rounds=4)
+
+        # When
+        result = password_needs_rehash(hash)
+
+        # Expect
+        self.assertEqual(get_hash_rounds(hash), 4)
+        self.assertTrue(result)
+        self.assertFalse(password_needs_rehash(generate_hash_password("abc123!")))
+
     async def test_jwt_token(self):
         # Given
         user = UserFactory.create(
@@ -45,6 +66,94 @@ class TestSecurity(IsolatedAsyncioTestCase):
         self.assertEqual(user.email, token_user.email)
         self.assertEqual(user.nama, token_user.nama)
 
+    async def test_principal_cache(self):
+        # Given
+        user = UserFactory.create(
+            email="test@example.com", nama="test", password="12qwaszx"
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+
+        # When
+        principal = get_principal_from_jwt_token(db=self.db, jwt_token=token)
+        cached = get_principal_from_jwt_token(db=self.db, jwt_token=token)
+        user_repo.update_user(
+            db=self.db, id=user.id, nama="renamed", email=user.email, jabatan=None
+        )
+        refreshed = get_principal_from_jwt_token(db=self.db, jwt_token=token)
+
+        # Expect
+        self.assertEqual(principal.id, user.id)
+        self.assertEqual(principal.shift_ids, ())
+        self.assertIs(principal, cached)
+        self.assertEqual(refreshed.nama, "renamed")
+
+    async def test_token_without_id(self):
+        # Given
+        token = jwt.encode(
+            {"email": "test@example.com", "exp": datetime.now() + timedelta(minutes=5)},
+            SECRET_KEY,
+            algorithm=ALGORITHM,
+        )
+
+        # When
+        token_user = get_user_from_jwt_token(db=self.db, jwt_token=token)
+        principal = get_principal_from_jwt_token(db=self.db, jwt_token=token)
+
+        # Expect
+        self.assertIsNone(token_user)
+        self.assertIsNone(principal)
+
+    async def test_principal_cache_invalidated_after_commit(self):
+        # Given
+        user = UserFactory.create(
+            email="test@example.com", nama="test", password="12qwaszx"
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        get_principal_from_jwt_token(db=self.db, jwt_token=token)
+
+        # When
+        user_repo.update_user(
+            db=self.db,
+            id=user.id,
+            nama="renamed",
+            email=user.email,
+            jabatan=None,
+            is_commit=False,
+        )
+        before_commit = principal_cache.get(user.id)
+        self.db.commit()
+        after_commit = principal_cache.get(user.id)
+
+        # Expect
+        self.assertEqual(before_commit.nama, "test")
+        self.assertIsNone(after_commit)
+
+    async def test_check_user_password(self):
+        # Given
+        user = UserFactory.create(
+            email="test@example.com",
+            nama="test",
+            password=generate_hash_password("12qwaszx", rounds=5),
+        )
+        self.db.commit()
+
+        # When
+        wrong = auth_repo.check_user_password(
+            db=self.db, email="test@example.com", password="wrong"
+        )
+        valid = auth_repo.check_user_password(
+            db=self.db, email="test@example.com", password="12qwaszx"
+        )
+
+        # Expect
+        self.assertFalse(wrong)
+        self.assertTrue(valid)
+        self.db.refresh(user)
+        self.assertFalse(password_needs_rehash(user.password))
+        self.assertTrue(validated_user_password(user.password, "12qwaszx"))
+
     def tearDown(self) -> None:
         self.db.rollback()
         factory_session.remove()
@@ -0,0 +1,61 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from common.security import hash_pool, validated_user_password
+from common.user_import import parse_user_rows, validate_user_rows, hash_passwords_async
+
+
+class TestUserImport(TestCase):
+    def test_parse_csv(self):
+        # Given
+        content = b"nama_user,email,password,jabatan\nGuru,guru@example.com,12qwaszx,3\n"
+
+        # When
+        rows = parse_user_rows(content, "csv")
+
+        # Expect
+        self.assertEqual(
+            rows,
+            [{"nama_user": "Guru", "email": "guru@example.com", "password": "12qwaszx", "jabatan": "3"}],
+        )
+
+    def test_parse_json(self):
+        # Given
+        content = b'[{"nama_user": "Guru", "email": "guru@example.com", "password": "12qwaszx", "jabatan": 3}]'
+
+        # When
+        rows = parse_user_rows(content, "json")
+
+        # Expect
+        self.assertEqual(rows[0]["jabatan"], 3)
+
+    def test_validate_rows(self):
+        # Given
+        rows = [
+            {"nama_user": "Guru", "email": "guru@example.com", "password": "12qwaszx", "jabatan": "3"},
+            {"nama_user": "Guru 2", "email": "guru@example.com", "password": "12qwaszx", "jabatan": "3"},
+            {"nama_user": "", "email": "kosong@example.com", "password": "12qwaszx", "jabatan": "3"},
+            {"nama_user": "Karyawan", "email": "karyawan@example.com", "password": "12qwaszx", "jabatan": "x"},
+        ]
+
+        # When
+        valid, errors = validate_user_rows(rows)
+
+        # Expect
+        self.assertEqual(
+            valid,
+            [(1, {"nama": "Guru", "email": "guru@example.com", "password": "12qwaszx", "role_id": 3})],
+        )
+        self.assertEqual([val["row"] for val in errors], [2, 3, 4])
+
+
+class TestHashPasswordsAsync(IsolatedAsyncioTestCase):
+    async def test_hash_on_hash_pool(self):
+        # Given
+        passwords = [f"password-{n}" for n in range(hash_pool.max_workers + 3)]
+        completed = hash_pool.metrics()["completed"]
+
+        # When
+        hashes = await hash_passwords_async(passwords)
+
+        # Expect
+        self.assertEqual(hash_pool.metrics()["completed"], completed + len(passwords))
+        self.assertTrue(all(validated_user_password(*val) for val in zip(hashes, passwords)))
@@ -0,0 +1,223 @@
+import asyncio
+import csv
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Set, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.security import generate_hash_password, generate_hash_password_async, hash_pool
+from repository import user as user_repo
+from repository.aio import user as user_aio_repo
+
+IMPORT_FIELDS = ("nama_user", "email", "password", "jabatan")
+
+
+def parse_user_rows(content: bytes, format: str) -> List[dict]:
+    """
+    format: "csv" (header nama_user,email,password,jabatan) or "json" (list of object)
+    """
+    text = content.decode("utf-8-sig")
+    if format == "csv":
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    if format == "json":
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be a list of object")
+        return rows
+    raise ValueError(f"Unsupported import format {format}")
+
+
+def validate_user_rows(rows: List[dict]) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """
+    check field and length the same way as CreateUserRequest, without database.
+    return ([(row number, clean row)], [error])
+    """
+    valid = []
+    errors = []
+    seen_emails = set()
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "email": None, "message": "Row must be an object"})
+            continue
+        nama = str(row.get("nama_user") or "").strip()
+        email = str(row.get("email") or "").strip()
+        password = str(row.get("password") or "")
+        message = None
+        if not 1 <= len(nama) <= 50:
+            message = "nama_user length must be 1-50"
+        elif not 1 <= len(email) <= 30:
+            message = "email length must be 1-30"
+        elif not 1 <= len(password) <= 50:
+            message = "password length must be 1-50"
+        elif email in seen_emails:
+            message = "Duplicate email in import file"
+        else:
+            try:
+                jabatan = int(row.get("jabatan"))
+            except (TypeError, ValueError):
+                message = "jabatan must be role id"
+        if message is not None:
+            errors.append({"row": number, "email": email or None, "message": message})
+            continue
+        seen_emails.add(email)
+        valid.append(
+            (number, {"nama": nama, "email": email, "password": password, "role_id": jabatan})
+        )
+    return valid, errors
+
+
+def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """
+    bcrypt is CPU bound, spread it across processes for big import.
+    Only for `cli.py import-users`, forking inside a uvicorn worker that already
+    runs threads is unsafe, the route hash on hash_pool (hash_passwords_async)
+    """
+    if len(passwords) <= 1 or workers <= 1:
+        return [generate_hash_password(password) for password in passwords]
+    chunksize = max(len(passwords) // (workers * 4), 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate_hash_password, passwords, chunksize=chunksize))
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """
+    hash on the shared hash_pool, at most max_workers jobs of this import at a time
+    so its queue stays free for login. Raise HashPoolOverloaded when it is full
+    """
+    semaphore = asyncio.Semaphore(hash_pool.max_workers)
+
+    async def hash_one(password: str) -> str:
+        async with semaphore:
+            return await generate_hash_password_async(password)
+
+    return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+
+def _sort_out(
+    valid: List[Tuple[int, dict]],
+    errors: List[dict],
+    existing_emails: Set[str],
+    existing_roles: Set[int],
+) -> List[Tuple[int, dict]]:
+    """
+    rows of valid to insert, the others are added to errors
+    """
+    to_insert = []
+    for number, row in valid:
+        if row["email"] in existing_emails:
+            errors.append({"row": number, "email": row["email"], "message": "This email already exist!"})
+        elif row["role_id"] not in existing_roles:
+            errors.append({"row": number, "email": row["email"], "message": "jabatan not found"})
+        else:
+            to_insert.append((number, row))
+    return to_insert
+
+
+def prepare_import(db: Session, rows: List[dict]) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """
+    validate rows, check email and jabatan with one query each.
+    return ([(row number, row to insert)], [error])
+    """
+    valid, errors = validate_user_rows(rows)
+    existing_emails = user_repo.get_existing_emails(db, [row["email"] for _, row in valid])
+    existing_roles = user_repo.get_existing_role_ids(db, {row["role_id"] for _, row in valid})
+    return _sort_out(valid, errors, existing_emails, existing_roles), errors
+
+
+async def prepare_import_async(
+    db: AsyncSession, rows: List[dict]
+) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """
+    AsyncSession variant of prepare_import
+    """
+    valid, errors = validate_user_rows(rows)
+    existing_emails = await user_aio_repo.get_existing_emails(
+        db, [row["email"] for _, row in valid]
+    )
+    existing_roles = await user_aio_repo.get_existing_role_ids(
+        db, {row["role_id"] for _, row in valid}
+    )
+    return _sort_out(valid, errors, existing_emails, existing_roles), errors
+
+
+def _with_hashes(to_insert: List[Tuple[int, dict]], hashes: List[str]) -> List[dict]:
+    for (_, row), hash in zip(to_insert, hashes):
+        row["password"] = hash
+    return [row for _, row in to_insert]
+
+
+def finish_import(
+    db: Session,
+    rows: List[dict],
+    to_insert: List[Tuple[int, dict]],
+    hashes: List[str],
+    errors: List[dict],
+    start: float,
+) -> dict:
+    """
+    insert every row of prepare_import with its hashed password in one transaction,
+    return the import report
+    """
+    created = set(user_repo.bulk_create_users(db, _with_hashes(to_insert, hashes)))
+    return _import_report(rows, to_insert, created, errors, start)
+
+
+async def finish_import_async(
+    db: AsyncSession,
+    rows: List[dict],
+    to_insert: List[Tuple[int, dict]],
+    hashes: List[str],
+    errors: List[dict],
+    start: float,
+) -> dict:
+    """
+    AsyncSession variant of finish_import
+    """
+    created = set(await user_aio_repo.bulk_create_users(db, _with_hashes(to_insert, hashes)))
+    return _import_report(rows, to_insert, created, errors, start)
+
+
+def _import_report(
+    rows: List[dict],
+    to_insert: List[Tuple[int, dict]],
+    created: Set[str],
+    errors: List[dict],
+    start: float,
+) -> dict:
+    for number, row in to_insert:
+        if row["email"] not in created:
+            # email taken by other request between the check and the insert
+            errors.append({"row": number, "email": row["email"], "message": "This email already exist!"})
+
+    elapsed = time.perf_counter() - start
+    errors.sort(key=lambda val: val["row"])
+    return {
+        "total": len(rows),
+        "created": len(created),
+        "failed": len(errors),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(created) / elapsed, 2) if elapsed > 0 else 0,
+        "errors": errors,
+    }
+
+
+def import_users(db: Session, rows: List[dict], workers: int) -> dict:
+    """
+    `cli.py import-users`: hash passwords on a process pool of workers
+    """
+    start = time.perf_counter()
+    to_insert, errors = prepare_import(db, rows)
+    hashes = hash_passwords([row["password"] for _, row in to_insert], workers=workers)
+    return finish_import(db, rows, to_insert, hashes, errors, start)
+
+
+async def import_users_async(db: AsyncSession, rows: List[dict]) -> dict:
+    """
+    /user-management/import: passwords on hash_pool
+    """
+    start = time.perf_counter()
+    to_insert, errors = await prepare_import_async(db, rows)
+    hashes = await hash_passwords_async([row["password"] for _, row in to_insert])
+    return await finish_import_async(db, rows, to_insert, hashes, errors, start)
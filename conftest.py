@@ -0,0 +1,5 @@
+import os
+
+# TestClient run each request on a new event loop, asyncpg connection can not be
+# shared between loops so the async engine must not pool connections in tests
+os.environ.setdefault("DB_ASYNC_NULL_POOL", "true")
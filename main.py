@@ -1,10 +1,31 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from routes import routers
+from common.responses import common_response, Unauthorized
+from common.security import InvalidCredentials, MSG_INVALID_CREDENTIALS
+from common.checkin_buffer import checkin_buffer
+from settings import CHECKIN_BUFFER_ENABLED
 
-app = FastAPI(title="Absensi Python")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the journal of a stopped worker is replayed by start
+    if CHECKIN_BUFFER_ENABLED:
+        await checkin_buffer.start()
+    yield
+    if CHECKIN_BUFFER_ENABLED:
+        await checkin_buffer.stop()
+
+
+app = FastAPI(title="Absensi Python", lifespan=lifespan)
 app.include_router(routers)
 
 
+@app.exception_handler(InvalidCredentials)
+async def invalid_credentials_handler(request: Request, exc: InvalidCredentials):
+    return common_response(Unauthorized(message=MSG_INVALID_CREDENTIALS))
+
+
 @app.get("/")
 async def root():
     return {"message": "Absensi Python"}
@@ -0,0 +1,169 @@
+import json
+from datetime import date, timedelta
+from unittest import IsolatedAsyncioTestCase
+import alembic.config
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from models import factory_session, clear_all_data_on_database
+from models.Absensi import Absensi
+from models.User import User
+from common.query_counter import count_queries
+from common.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    month_start,
+    partition_name,
+    list_partitions,
+    ensure_partitions,
+    drop_partitions,
+)
+from repository import absensi as absensi_repo
+from repository.aio import absensi as absensi_aio_repo
+from migrations.factories.UserFactory import UserFactory
+from migrations.factories.RoleFactory import RoleFactory
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+class TestAbsensiPartitions(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        alembic_args = ["-c", "alembic.ini", "upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        self.db: Session = factory_session()
+        clear_all_data_on_database(self.db)
+        self.current = month_start(date.today())
+        self.first = add_months(self.current, -5)
+        user = UserFactory.create(
+            email="guru@example.com",
+            nama="Guru",
+            userRole=RoleFactory.create(jabatan="Guru"),
+        )
+        self.db.commit()
+        self.user = self.db.query(User).filter(User.id == user.id).one()
+        # one row on the 10th of the last 6 months, the older ones land in the default partition
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, user_id)
+                SELECT (CAST(:first AS date) + (n || ' month')::interval + interval '9 days')::date,
+                       time '07:00', time '15:00', :user_id
+                FROM generate_series(0, 5) AS n
+                """
+            ),
+            {"first": self.first, "user_id": self.user.id},
+        )
+        self.db.commit()
+        return super().setUp()
+
+    def scanned_partitions(self, fn) -> set:
+        with count_queries(self.db.get_bind()) as counter:
+            fn()
+        relations = set()
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            raw = self.db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            ).scalar()
+            plan = raw if isinstance(raw, list) else json.loads(raw)
+            relations |= {
+                node["Relation Name"]
+                for node in plan_nodes(plan[0]["Plan"])
+                if node.get("Relation Name", "").startswith("absensi")
+            }
+        return relations
+
+    async def test_ensure_partitions(self):
+        # When
+        created = ensure_partitions(db=self.db, months_ahead=2, start=self.first)
+
+        # Expect
+        months = list_partitions(self.db)
+        for n in range(0, 8):
+            self.assertIn(add_months(self.first, n), months)
+        self.assertIn(partition_name(self.first), created)
+        default_rows = self.db.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+        self.assertEqual(default_rows, 0)
+        self.assertEqual(self.db.query(Absensi).count(), 6)
+        # a second run has nothing to do
+        self.assertEqual(ensure_partitions(db=self.db, months_ahead=2, start=self.first), [])
+
+    async def test_one_month_report_scan_one_partition(self):
+        # Given
+        ensure_partitions(db=self.db, start=self.first)
+        month = add_months(self.current, -2)
+        start_date = str(month)
+        end_date = str(add_months(month, 1) - timedelta(days=1))
+
+        # When
+        admin = self.scanned_partitions(
+            lambda: absensi_repo.export_excel_admin(
+                db=self.db, start_date=start_date, end_date=end_date
+            )
+        )
+        user = self.scanned_partitions(
+            lambda: absensi_repo.export_excel_user(
+                db=self.db, start_date=start_date, end_date=end_date, user=self.user
+            )
+        )
+        page = self.scanned_partitions(
+            lambda: absensi_repo.paginate_list_admin(
+                db=self.db, start_date=start_date, end_date=end_date
+            )
+        )
+        user_page = self.scanned_partitions(
+            lambda: absensi_repo.paginate_list_only_user(
+                db=self.db, user=self.user, start_date=start_date, end_date=end_date
+            )
+        )
+        # filter of the /absensi/ user list (AsyncSession route)
+        user_list = absensi_aio_repo._filter_list_user(
+            select(Absensi), user=self.user, start_date=start_date, end_date=end_date
+        )
+        user_route = self.scanned_partitions(lambda: self.db.execute(user_list).all())
+        (rows, num_data, _) = absensi_repo.paginate_list_only_user(
+            db=self.db, user=self.user, start_date=start_date, end_date=end_date
+        )
+
+        # Expect
+        self.assertEqual(admin, {partition_name(month)})
+        self.assertEqual(user, {partition_name(month)})
+        self.assertEqual(page, {partition_name(month)})
+        self.assertEqual(user_page, {partition_name(month)})
+        self.assertEqual(user_route, {partition_name(month)})
+        self.assertEqual(num_data, 1)
+        self.assertEqual([val.tanggal_absen for val in rows], [month + timedelta(days=9)])
+
+    async def test_drop_partitions(self):
+        # Given
+        ensure_partitions(db=self.db, start=self.first)
+        before = add_months(self.current, -3)
+
+        # When
+        detached = drop_partitions(db=self.db, before=before)
+
+        # Expect
+        self.assertEqual(
+            detached, [partition_name(self.first), partition_name(add_months(self.first, 1))]
+        )
+        self.assertNotIn(self.first, list_partitions(self.db))
+        # detached table keep its rows, absensi does not see them anymore
+        kept = self.db.execute(text(f'SELECT count(*) FROM "{partition_name(self.first)}"')).scalar()
+        self.assertEqual(kept, 1)
+        self.assertEqual(self.db.query(Absensi).count(), 4)
+        with self.assertRaises(ValueError):
+            drop_partitions(db=self.db, before=add_months(self.current, 1))
+
+    def tearDown(self) -> None:
+        self.db.rollback()
+        # back to the partitions created by the migration
+        drop_partitions(db=self.db, before=self.current, purge=True)
+        for month in range(0, 5):
+            name = partition_name(add_months(self.first, month))
+            self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        self.db.commit()
+        clear_all_data_on_database(self.db)
+        factory_session.remove()
+        return super().tearDown()
@@ -0,0 +1,184 @@
+import json
+import time
+from statistics import median
+from datetime import date, timedelta
+from unittest import IsolatedAsyncioTestCase
+import alembic.config
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import factory_session, clear_all_data_on_database
+from models.User import User
+from common.query_counter import count_queries
+from repository import absensi as absensi_repo, auth as auth_repo
+from repository.aio.search import search_statement
+from settings import SEARCH_LATENCY_TARGET_MS
+
+NUM_USER = 10_000
+NUM_ABSENSI = 1_000_000
+# warm runs timed by test_search_user, printed with -s
+NUM_LATENCY_RUN = 5
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+class TestHotPathIndexes(IsolatedAsyncioTestCase):
+    """
+    EXPLAIN the statements sent by the repository on a 1M row absensi table,
+    the planner must pick an index instead of a sequential scan
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        alembic_args = ["upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        cls.db: Session = factory_session()
+        clear_all_data_on_database(db=cls.db)
+        cls.db.execute(text("INSERT INTO role (nama_role) VALUES ('Guru')"))
+        cls.db.execute(
+            text(
+                """
+                INSERT INTO "user" (email, nama, password, role_id)
+                SELECT 'user' || n || '@example.com', 'user ' || n, 'x', (SELECT min(id) FROM role)
+                FROM generate_series(1, :num_user) AS n
+                """
+            ),
+            {"num_user": NUM_USER},
+        )
+        # 100 days of history per user, only the last day of 1% users still open
+        cls.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, user_id)
+                SELECT current_date - (n / :num_user)::int,
+                       time '07:00',
+                       CASE WHEN n < :num_user AND n % 100 = 0 THEN NULL ELSE time '15:00' END,
+                       u.min_id + n % :num_user
+                FROM generate_series(0, :num_absensi - 1) AS n,
+                     (SELECT min(id) AS min_id FROM "user") AS u
+                """
+            ),
+            {"num_user": NUM_USER, "num_absensi": NUM_ABSENSI},
+        )
+        cls.db.commit()
+        cls.db.execute(text("ANALYZE absensi"))
+        cls.db.execute(text('ANALYZE "user"'))
+        cls.db.commit()
+        cls.user = cls.db.query(User).filter(User.email == "user500@example.com").one()
+
+    def explain(self, fn) -> list:
+        """
+        run fn, EXPLAIN every statement it sent and return the plan nodes
+        """
+        with count_queries(self.db.get_bind()) as counter:
+            fn()
+        nodes = []
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            raw = self.db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            ).scalar()
+            plan = raw if isinstance(raw, list) else json.loads(raw)
+            nodes.extend(plan_nodes(plan[0]["Plan"]))
+        return nodes
+
+    def assertIndexScan(self, nodes: list, relation: str) -> None:
+        scans = [node for node in nodes if node.get("Relation Name") == relation]
+        self.assertNotEqual(scans, [], f"{relation} is not scanned")
+        for node in scans:
+            self.assertNotEqual(node["Node Type"], "Seq Scan", f"{relation}: {node}")
+
+    def test_get_absen_without_jam_keluar(self):
+        # When
+        nodes = self.explain(
+            lambda: absensi_repo.get_absen_without_jam_keluar(db=self.db, user=self.user)
+        )
+
+        # Expect
+        self.assertIndexScan(nodes, "absensi")
+        index_names = {node.get("Index Name") for node in nodes}
+        self.assertIn("ix_absensi_open_session", index_names)
+
+    def test_get_date_gt_today(self):
+        # When
+        nodes = self.explain(
+            lambda: absensi_repo.get_date_gt_today(db=self.db, user=self.user)
+        )
+
+        # Expect
+        self.assertIndexScan(nodes, "absensi")
+
+    def test_report_by_date(self):
+        # When
+        nodes = self.explain(
+            lambda: absensi_repo.export_excel_admin(
+                db=self.db,
+                start_date=str(date.today() - timedelta(days=2)),
+                end_date=str(date.today() - timedelta(days=1)),
+            )
+        )
+
+        # Expect
+        self.assertIndexScan(nodes, "absensi")
+
+    def test_user_history_by_date(self):
+        # When
+        nodes = self.explain(
+            lambda: absensi_repo.export_excel_user(
+                db=self.db,
+                start_date=str(date.today() - timedelta(days=30)),
+                end_date=str(date.today()),
+                user=self.user,
+            )
+        )
+
+        # Expect
+        self.assertIndexScan(nodes, "absensi")
+        index_names = {node.get("Index Name") for node in nodes}
+        self.assertIn("ix_absensi_user_id_tanggal_absen_id", index_names)
+
+    def test_login_by_email(self):
+        # When
+        nodes = self.explain(
+            lambda: auth_repo.get_user_by_email(db=self.db, email="user500@example.com")
+        )
+
+        # Expect
+        self.assertIndexScan(nodes, "user")
+
+    def test_search_user(self):
+        # Given
+        stmt = search_statement("user5000", limit=10)
+
+        # When
+        nodes = self.explain(lambda: self.db.execute(stmt).all())
+        results = self.db.execute(stmt).all()
+        took_ms = []
+        for _ in range(NUM_LATENCY_RUN):
+            started_at = time.perf_counter()
+            self.db.execute(stmt).all()
+            took_ms.append((time.perf_counter() - started_at) * 1000)
+
+        # Expect
+        self.assertIndexScan(nodes, "user")
+        index_names = {node.get("Index Name") for node in nodes}
+        self.assertTrue(
+            {"ix_user_nama_trgm", "ix_user_email_trgm"} & index_names, index_names
+        )
+        self.assertEqual([val.label for val in results], ["user 5000"])
+        # benchmark output only, wall clock is not asserted on a shared CI runner
+        print(
+            f"search median {median(took_ms):.1f} ms over {NUM_LATENCY_RUN} warm runs,"
+            f" target {SEARCH_LATENCY_TARGET_MS} ms"
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.db.rollback()
+        # clear_all_data_on_database delete absensi row by row
+        cls.db.execute(text("TRUNCATE absensi"))
+        cls.db.commit()
+        clear_all_data_on_database(cls.db)
+        factory_session.remove()
@@ -0,0 +1,131 @@
+"""partition absensi by month
+
+Revision ID: 0b6d2e9f4a18
+Revises: e41f6c8a2b57
+Create Date: 2026-10-18 16:20:47.118054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6d2e9f4a18'
+down_revision: Union[str, None] = 'e41f6c8a2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, tanggal_absen, keterangan, user_id, shift_id, kehadiran_id, "
+    "jam_masuk, jam_keluar, lokasi_masuk, lokasi_keluar"
+)
+# partitions created ahead of the current month, `python cli.py partitions ensure`
+# keep creating them afterwards
+MONTHS_AHEAD = 3
+
+
+def create_indexes() -> None:
+    op.create_index(
+        "ix_absensi_user_id_tanggal_absen_id", "absensi", ["user_id", "tanggal_absen", "id"]
+    )
+    op.create_index("ix_absensi_tanggal_absen_id", "absensi", ["tanggal_absen", "id"])
+    op.create_index(
+        "ix_absensi_open_session",
+        "absensi",
+        ["user_id"],
+        postgresql_where=sa.text("jam_keluar IS NULL"),
+    )
+
+
+def upgrade() -> None:
+    # keep the id sequence, it is dropped with the old table otherwise
+    op.execute("ALTER SEQUENCE absensi_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE absensi RENAME TO absensi_unpartitioned")
+    op.execute("ALTER INDEX absensi_pkey RENAME TO absensi_unpartitioned_pkey")
+
+    # primary key of a partitioned table must contain the partition key.
+    # tanggal_absen is always set by create_masuk, a row without it can not be
+    # placed in a partition and stops the migration
+    op.execute(
+        """
+        CREATE TABLE absensi (
+            id integer NOT NULL DEFAULT nextval('absensi_id_seq'),
+            tanggal_absen date NOT NULL,
+            keterangan varchar(100),
+            user_id integer REFERENCES "user" (id),
+            shift_id integer REFERENCES shift (id),
+            kehadiran_id integer REFERENCES kehadiran (id),
+            jam_masuk time,
+            jam_keluar time,
+            lokasi_masuk varchar,
+            lokasi_keluar varchar,
+            CONSTRAINT absensi_pkey PRIMARY KEY (id, tanggal_absen)
+        ) PARTITION BY RANGE (tanggal_absen)
+        """
+    )
+    op.execute(
+        f"""
+        DO $$
+        DECLARE month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', LEAST(
+                        (SELECT min(tanggal_absen) FROM absensi_unpartitioned), current_date
+                    )),
+                    date_trunc('month', current_date) + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF absensi FOR VALUES FROM (%L) TO (%L)',
+                    'absensi_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    # rows dated after the last partition, until `partitions ensure` split them out
+    op.execute("CREATE TABLE absensi_default PARTITION OF absensi DEFAULT")
+    op.execute(
+        f"INSERT INTO absensi ({COLUMNS}) SELECT {COLUMNS} FROM absensi_unpartitioned"
+    )
+    op.execute("DROP TABLE absensi_unpartitioned")
+    op.execute("ALTER SEQUENCE absensi_id_seq OWNED BY absensi.id")
+    create_indexes()
+
+
+def downgrade() -> None:
+    # partitions detached by `partitions drop` are not part of absensi anymore and
+    # are left as they are
+    op.execute("ALTER SEQUENCE absensi_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE absensi RENAME TO absensi_partitioned")
+    op.execute("ALTER INDEX absensi_pkey RENAME TO absensi_partitioned_pkey")
+    op.execute("DROP INDEX ix_absensi_user_id_tanggal_absen_id")
+    op.execute("DROP INDEX ix_absensi_tanggal_absen_id")
+    op.execute("DROP INDEX ix_absensi_open_session")
+    op.execute(
+        """
+        CREATE TABLE absensi (
+            id integer NOT NULL DEFAULT nextval('absensi_id_seq'),
+            tanggal_absen date,
+            keterangan varchar(100),
+            user_id integer REFERENCES "user" (id),
+            shift_id integer REFERENCES shift (id),
+            kehadiran_id integer REFERENCES kehadiran (id),
+            jam_masuk time,
+            jam_keluar time,
+            lokasi_masuk varchar,
+            lokasi_keluar varchar,
+            CONSTRAINT absensi_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(f"INSERT INTO absensi ({COLUMNS}) SELECT {COLUMNS} FROM absensi_partitioned")
+    op.execute("DROP TABLE absensi_partitioned")
+    op.execute("ALTER SEQUENCE absensi_id_seq OWNED BY absensi.id")
+    create_indexes()
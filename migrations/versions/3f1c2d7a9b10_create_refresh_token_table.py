@@ -0,0 +1,39 @@
+"""create refresh_token table
+
+Revision ID: 3f1c2d7a9b10
+Revises: be3877ccb875
+Create Date: 2026-10-18 08:12:41.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2d7a9b10'
+down_revision: Union[str, None] = 'be3877ccb875'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Integer()),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("token_hash", sa.String(length=64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.UniqueConstraint("token_hash"),
+    )
+    op.create_index("ix_refresh_token_user_id", "refresh_token", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_token_user_id", table_name="refresh_token")
+    op.drop_table("refresh_token")
@@ -0,0 +1,62 @@
+"""hot path indexes
+
+Revision ID: 5c9e0f3a7d21
+Revises: 8d4e6b21c0f3
+Create Date: 2026-10-18 11:42:08.317402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c9e0f3a7d21'
+down_revision: Union[str, None] = '8d4e6b21c0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # per user history and check-in lookups (user_id = ? AND tanggal_absen ...)
+    op.create_index(
+        "ix_absensi_user_id_tanggal_absen", "absensi", ["user_id", "tanggal_absen"]
+    )
+    # admin report filter on date range without user
+    op.create_index("ix_absensi_tanggal_absen", "absensi", ["tanggal_absen"])
+    # open sessions only, stays small no matter how big absensi grows
+    op.create_index(
+        "ix_absensi_open_session",
+        "absensi",
+        ["user_id"],
+        postgresql_where=sa.text("jam_keluar IS NULL"),
+    )
+    # ix_user_email (unique) is created by 8d4e6b21c0f3
+
+    # user_shift had no key, remove duplicated assignments before adding it
+    op.execute(
+        """
+        DELETE FROM user_shift a
+        USING user_shift b
+        WHERE a.ctid < b.ctid
+          AND a.user_id = b.user_id
+          AND a.shift_id = b.shift_id
+        """
+    )
+    op.execute("DELETE FROM user_shift WHERE user_id IS NULL OR shift_id IS NULL")
+    op.alter_column("user_shift", "user_id", existing_type=sa.Integer(), nullable=False)
+    op.alter_column("user_shift", "shift_id", existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key("pk_user_shift", "user_shift", ["user_id", "shift_id"])
+    # the primary key serve user -> shifts, this one serve shift -> users
+    op.create_index("ix_user_shift_shift_id_user_id", "user_shift", ["shift_id", "user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_shift_shift_id_user_id", table_name="user_shift")
+    op.drop_constraint("pk_user_shift", "user_shift", type_="primary")
+    op.alter_column("user_shift", "shift_id", existing_type=sa.Integer(), nullable=True)
+    op.alter_column("user_shift", "user_id", existing_type=sa.Integer(), nullable=True)
+    op.drop_index("ix_absensi_open_session", table_name="absensi")
+    op.drop_index("ix_absensi_tanggal_absen", table_name="absensi")
+    op.drop_index("ix_absensi_user_id_tanggal_absen", table_name="absensi")
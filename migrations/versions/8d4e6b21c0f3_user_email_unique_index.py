@@ -0,0 +1,28 @@
+"""user email unique index
+
+Revision ID: 8d4e6b21c0f3
+Revises: 3f1c2d7a9b10
+Create Date: 2026-10-18 09:03:17.551204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e6b21c0f3'
+down_revision: Union[str, None] = '3f1c2d7a9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # email uniqueness used to be checked by the pydantic schema, duplicate
+    # rows must be cleaned up before this migration can run
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_email", table_name="user")
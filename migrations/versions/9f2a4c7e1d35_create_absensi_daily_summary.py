@@ -0,0 +1,65 @@
+"""create absensi daily summary
+
+Revision ID: 9f2a4c7e1d35
+Revises: 0b6d2e9f4a18
+Create Date: 2026-10-18 17:05:32.481906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2a4c7e1d35'
+down_revision: Union[str, None] = '0b6d2e9f4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "absensi_daily_summary",
+        sa.Column("id", sa.Integer, nullable=False, autoincrement=True, primary_key=True),
+        sa.Column("tanggal_absen", sa.Date, nullable=False),
+        sa.Column("role_id", sa.Integer),
+        sa.Column("check_ins", sa.Integer, nullable=False, server_default=sa.text("0")),
+        sa.Column("check_outs", sa.Integer, nullable=False, server_default=sa.text("0")),
+        sa.Column("late_count", sa.Integer, nullable=False, server_default=sa.text("0")),
+    )
+    op.create_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id",
+        "absensi_daily_summary",
+        ["tanggal_absen", "role_id"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    # backfill, same rule as repository/daily_summary.rebuild_statements
+    op.execute(
+        """
+        INSERT INTO absensi_daily_summary
+            (tanggal_absen, role_id, check_ins, check_outs, late_count)
+        SELECT a.tanggal_absen,
+               u.role_id,
+               count(a.id),
+               count(a.jam_keluar),
+               count(a.id) FILTER (WHERE a.jam_masuk > s.jam_mulai)
+        FROM absensi a
+        LEFT JOIN "user" u ON u.id = a.user_id
+        LEFT JOIN (
+            SELECT us.user_id, min(sh.jam_mulai_shift) AS jam_mulai
+            FROM user_shift us
+            JOIN shift sh ON sh.id = us.shift_id
+            GROUP BY us.user_id
+        ) s ON s.user_id = a.user_id
+        GROUP BY a.tanggal_absen, u.role_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id", table_name="absensi_daily_summary"
+    )
+    op.drop_table("absensi_daily_summary")
@@ -0,0 +1,40 @@
+"""absensi keyset indexes
+
+Revision ID: a7b3d19e4c62
+Revises: 5c9e0f3a7d21
+Create Date: 2026-10-18 13:15:40.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b3d19e4c62'
+down_revision: Union[str, None] = '5c9e0f3a7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keyset pagination seek on (tanggal_absen, id), id is appended so the
+    # row comparison and the ORDER BY are both served by the index
+    op.create_index(
+        "ix_absensi_tanggal_absen_id", "absensi", ["tanggal_absen", "id"]
+    )
+    op.create_index(
+        "ix_absensi_user_id_tanggal_absen_id", "absensi", ["user_id", "tanggal_absen", "id"]
+    )
+    op.drop_index("ix_absensi_tanggal_absen", table_name="absensi")
+    op.drop_index("ix_absensi_user_id_tanggal_absen", table_name="absensi")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_absensi_user_id_tanggal_absen", "absensi", ["user_id", "tanggal_absen"]
+    )
+    op.create_index("ix_absensi_tanggal_absen", "absensi", ["tanggal_absen"])
+    op.drop_index("ix_absensi_user_id_tanggal_absen_id", table_name="absensi")
+    op.drop_index("ix_absensi_tanggal_absen_id", table_name="absensi")
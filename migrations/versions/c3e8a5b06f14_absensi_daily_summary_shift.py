@@ -0,0 +1,97 @@
+"""absensi daily summary per shift
+
+Revision ID: c3e8a5b06f14
+Revises: 9f2a4c7e1d35
+Create Date: 2026-10-18 17:48:19.263514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a5b06f14'
+down_revision: Union[str, None] = '9f2a4c7e1d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("absensi_daily_summary", sa.Column("shift_id", sa.Integer))
+    op.drop_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id", table_name="absensi_daily_summary"
+    )
+    op.create_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id_shift_id",
+        "absensi_daily_summary",
+        ["tanggal_absen", "role_id", "shift_id"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    # recompute the days still in absensi, same rule as
+    # repository/daily_summary.rebuild_statements. Archived days keep shift_id NULL
+    op.execute(
+        """
+        DELETE FROM absensi_daily_summary
+        WHERE tanggal_absen >= (SELECT min(tanggal_absen) FROM absensi)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO absensi_daily_summary
+            (tanggal_absen, role_id, shift_id, check_ins, check_outs, late_count)
+        SELECT a.tanggal_absen,
+               u.role_id,
+               s.shift_id,
+               count(a.id),
+               count(a.jam_keluar),
+               count(a.id) FILTER (WHERE a.jam_masuk > s.jam_mulai)
+        FROM absensi a
+        LEFT JOIN "user" u ON u.id = a.user_id
+        LEFT JOIN (
+            SELECT DISTINCT ON (us.user_id)
+                   us.user_id, sh.id AS shift_id, sh.jam_mulai_shift AS jam_mulai
+            FROM user_shift us
+            JOIN shift sh ON sh.id = us.shift_id
+            ORDER BY us.user_id, sh.jam_mulai_shift ASC NULLS LAST, sh.id ASC
+        ) s ON s.user_id = a.user_id
+        GROUP BY a.tanggal_absen, u.role_id, s.shift_id
+        """
+    )
+
+
+def downgrade() -> None:
+    # merge the shifts back into one row per day and role
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE absensi_daily_summary_merged ON COMMIT DROP AS
+        SELECT tanggal_absen, role_id,
+               sum(check_ins) AS check_ins,
+               sum(check_outs) AS check_outs,
+               sum(late_count) AS late_count
+        FROM absensi_daily_summary
+        GROUP BY tanggal_absen, role_id
+        """
+    )
+    op.execute("DELETE FROM absensi_daily_summary")
+    op.drop_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id_shift_id",
+        table_name="absensi_daily_summary",
+    )
+    op.drop_column("absensi_daily_summary", "shift_id")
+    op.create_index(
+        "ix_absensi_daily_summary_tanggal_absen_role_id",
+        "absensi_daily_summary",
+        ["tanggal_absen", "role_id"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+    op.execute(
+        """
+        INSERT INTO absensi_daily_summary (tanggal_absen, role_id, check_ins, check_outs, late_count)
+        SELECT tanggal_absen, role_id, check_ins, check_outs, late_count
+        FROM absensi_daily_summary_merged
+        """
+    )
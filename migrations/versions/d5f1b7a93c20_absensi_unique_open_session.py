@@ -0,0 +1,58 @@
+"""absensi unique open session
+
+Revision ID: d5f1b7a93c20
+Revises: c3e8a5b06f14
+Create Date: 2026-10-18 18:31:07.915248
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1b7a93c20'
+down_revision: Union[str, None] = 'c3e8a5b06f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # duplicate open sessions left by concurrent check-in, the first one of the
+    # day is kept open and the others are closed at their own jam_masuk.
+    # absensi_daily_summary does not count these check-out, `python cli.py
+    # rebuild-summary` after the upgrade if any row was closed
+    op.execute(
+        """
+        UPDATE absensi a
+        SET jam_keluar = a.jam_masuk,
+            lokasi_keluar = a.lokasi_masuk,
+            keterangan = 'Check-in ganda'
+        FROM (
+            SELECT id, tanggal_absen,
+                   row_number() OVER (PARTITION BY user_id, tanggal_absen ORDER BY id) AS n
+            FROM absensi
+            WHERE jam_keluar IS NULL
+        ) d
+        WHERE a.id = d.id AND a.tanggal_absen = d.tanggal_absen AND d.n > 1
+        """
+    )
+    op.drop_index("ix_absensi_open_session", table_name="absensi")
+    op.create_index(
+        "ix_absensi_open_session",
+        "absensi",
+        ["user_id", "tanggal_absen"],
+        unique=True,
+        postgresql_where=sa.text("jam_keluar IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_absensi_open_session", table_name="absensi")
+    op.create_index(
+        "ix_absensi_open_session",
+        "absensi",
+        ["user_id"],
+        postgresql_where=sa.text("jam_keluar IS NULL"),
+    )
@@ -0,0 +1,45 @@
+"""trigram search indexes
+
+Revision ID: e41f6c8a2b57
+Revises: a7b3d19e4c62
+Create Date: 2026-10-18 15:02:11.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41f6c8a2b57'
+down_revision: Union[str, None] = 'a7b3d19e4c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index, table, column) searched with ILIKE '%...%' and /search
+TRIGRAM_INDEXES = [
+    ("ix_user_nama_trgm", "user", "nama"),
+    ("ix_user_email_trgm", "user", "email"),
+    ("ix_role_nama_role_trgm", "role", "nama_role"),
+    ("ix_shift_nama_shift_trgm", "shift", "nama_shift"),
+    ("ix_kehadiran_nama_kehadiran_trgm", "kehadiran", "nama_kehadiran"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    # pg_trgm is left installed, other databases objects may use it
+    for name, table, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
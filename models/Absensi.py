@@ -1,13 +1,30 @@
 from . import Base
-from sqlalchemy import Column, Integer, Time, ForeignKey, String, Date
+from sqlalchemy import Column, Integer, Time, ForeignKey, String, Date, Index, text
 from sqlalchemy.orm import relationship
 
 
 class Absensi(Base):
     __tablename__ = "absensi"
+    __table_args__ = (
+        Index("ix_absensi_user_id_tanggal_absen_id", "user_id", "tanggal_absen", "id"),
+        Index("ix_absensi_tanggal_absen_id", "tanggal_absen", "id"),
+        # one open session per user, a unique index of a partitioned table must
+        # contain tanggal_absen so it is one per user and day. Open sessions of
+        # the previous days are closed by the check-in (forced_absen_gt_today)
+        Index(
+            "ix_absensi_open_session",
+            "user_id",
+            "tanggal_absen",
+            unique=True,
+            postgresql_where=text("jam_keluar IS NULL"),
+        ),
+        # monthly partitions, see common/partitions.py
+        {"postgresql_partition_by": "RANGE (tanggal_absen)"},
+    )
 
     id = Column("id", Integer, nullable=False, autoincrement=True, primary_key=True)
-    tanggal_absen = Column("tanggal_absen", Date)
+    # part of the table primary key because absensi is partitioned on it
+    tanggal_absen = Column("tanggal_absen", Date, nullable=False, primary_key=True)
     jam_masuk = Column("jam_masuk", Time)
     jam_keluar = Column("jam_keluar", Time)
     keterangan = Column("keterangan", String(100))
@@ -17,6 +34,9 @@ class Absensi(Base):
     shift_id = Column("shift_id", ForeignKey("shift.id"))
     kehadiran_id = Column("kehadiran_id", ForeignKey("kehadiran.id"))
 
+    # id alone is still unique, keep it as the identity of the mapped object
+    __mapper_args__ = {"primary_key": [id]}
+
     # Relation
     absen_user = relationship("User", backref="absen_user", foreign_keys=[user_id])
 
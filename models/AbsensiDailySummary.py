@@ -0,0 +1,29 @@
+from . import Base
+from sqlalchemy import Column, Integer, Date, Index, text
+
+
+class AbsensiDailySummary(Base):
+    __tablename__ = "absensi_daily_summary"
+    __table_args__ = (
+        # one row per day, role and first shift of the user, NULL is the users
+        # without role or shift
+        Index(
+            "ix_absensi_daily_summary_tanggal_absen_role_id_shift_id",
+            "tanggal_absen",
+            "role_id",
+            "shift_id",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id = Column("id", Integer, nullable=False, autoincrement=True, primary_key=True)
+    tanggal_absen = Column("tanggal_absen", Date, nullable=False)
+    # role of the user at check-in, no foreign key: derived data, deleting a role
+    # must not touch it and `rebuild-summary` recompute it from absensi
+    role_id = Column("role_id", Integer)
+    # shift with the earliest jam_mulai of the user at check-in, no foreign key either
+    shift_id = Column("shift_id", Integer)
+    check_ins = Column("check_ins", Integer, nullable=False, server_default=text("0"))
+    check_outs = Column("check_outs", Integer, nullable=False, server_default=text("0"))
+    late_count = Column("late_count", Integer, nullable=False, server_default=text("0"))
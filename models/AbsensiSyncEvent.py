@@ -0,0 +1,19 @@
+from . import Base
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, PrimaryKeyConstraint
+
+
+class AbsensiSyncEvent(Base):
+    """
+    offline event written by /absensi/sync, an event sent again is not written twice
+    """
+    __tablename__ = "absensi_sync_event"
+    __table_args__ = (PrimaryKeyConstraint("user_id", "event_id"),)
+
+    user_id = Column("user_id", ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    # generated by the app when the event is recorded offline
+    event_id = Column("event_id", String(64), nullable=False)
+    # absensi row created or closed by the event, no foreign key: the primary key
+    # of the partitioned absensi is (id, tanggal_absen) and rows get archived
+    absensi_id = Column("absensi_id", Integer)
+    status = Column("status", String(16), nullable=False)
+    created_at = Column("created_at", DateTime, nullable=False)
@@ -0,0 +1,25 @@
+from . import Base
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class IdempotencyKey(Base):
+    """
+    response stored for an Idempotency-Key when IDEMPOTENCY_STORE is "db",
+    shared by every worker. Rows past expires_at are ignored and deleted by
+    `python cli.py purge-idempotency`
+    """
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "key"),
+        Index("ix_idempotency_key_expires_at", "expires_at"),
+    )
+
+    user_id = Column("user_id", ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    key = Column("key", String(255), nullable=False)
+    # sha256 hex digest of method, path and body of the first request
+    fingerprint = Column("fingerprint", String(64), nullable=False)
+    status_code = Column("status_code", Integer, nullable=False)
+    response = Column("response", JSONB)
+    created_at = Column("created_at", DateTime, nullable=False)
+    expires_at = Column("expires_at", DateTime, nullable=False)
@@ -1,9 +1,17 @@
 from . import Base
-from sqlalchemy import Column, Integer, String, VARCHAR
+from sqlalchemy import Column, Integer, String, VARCHAR, Index
 
 
 class Kehadiran(Base):
     __tablename__ = "kehadiran"
+    __table_args__ = (
+        Index(
+            "ix_kehadiran_nama_kehadiran_trgm",
+            "nama_kehadiran",
+            postgresql_using="gin",
+            postgresql_ops={"nama_kehadiran": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column("id", Integer, nullable=False, autoincrement=True, primary_key=True)
     nama_kehadiran = Column("nama_kehadiran", String(50))
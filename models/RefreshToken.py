@@ -0,0 +1,18 @@
+from . import Base
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_token"
+
+    id = Column("id", Integer, nullable=False, autoincrement=True, primary_key=True)
+    user_id = Column("user_id", ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    # sha256 hex digest, the plain token is only known by the client
+    token_hash = Column("token_hash", String(64), nullable=False, unique=True)
+    expires_at = Column("expires_at", DateTime, nullable=False)
+    revoked_at = Column("revoked_at", DateTime)
+    created_at = Column("created_at", DateTime, nullable=False)
+
+    # Relation
+    token_user = relationship("User", foreign_keys=[user_id])
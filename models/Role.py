@@ -1,9 +1,17 @@
 from . import Base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 
 
 class Role(Base):
     __tablename__ = "role"
+    __table_args__ = (
+        Index(
+            "ix_role_nama_role_trgm",
+            "nama_role",
+            postgresql_using="gin",
+            postgresql_ops={"nama_role": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column("id", Integer, primary_key=True, nullable=False, autoincrement=True)
     jabatan = Column("nama_role", String(100))
@@ -1,11 +1,19 @@
 from sqlalchemy.orm import relationship
 from . import Base
-from sqlalchemy import Column, Integer, VARCHAR, Time
+from sqlalchemy import Column, Integer, VARCHAR, Time, Index
 from models.User import user_shift
 
 
 class Shift(Base):
     __tablename__ = "shift"
+    __table_args__ = (
+        Index(
+            "ix_shift_nama_shift_trgm",
+            "nama_shift",
+            postgresql_using="gin",
+            postgresql_ops={"nama_shift": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column("id", Integer, primary_key=True, nullable=False, autoincrement=True)
     nama_shift = Column("nama_shift", VARCHAR(50))
@@ -1,19 +1,25 @@
 from . import Base
-from sqlalchemy import Column, Integer, String, VARCHAR, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, VARCHAR, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 
 user_shift = Table(
     'user_shift',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('user.id')),
-    Column('shift_id', Integer, ForeignKey('shift.id'))
+    Column('user_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Column('shift_id', Integer, ForeignKey('shift.id'), primary_key=True),
+    Index('ix_user_shift_shift_id_user_id', 'shift_id', 'user_id'),
 )
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (
+        # substring search (ILIKE '%...%'), needs the pg_trgm extension
+        Index("ix_user_nama_trgm", "nama", postgresql_using="gin", postgresql_ops={"nama": "gin_trgm_ops"}),
+        Index("ix_user_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
 
     id = Column("id", Integer, primary_key=True, nullable=False, autoincrement=True)
-    email = Column("email", VARCHAR(30), nullable=False)
+    email = Column("email", VARCHAR(30), nullable=False, unique=True, index=True)
     nama = Column("nama", String(50), nullable=False)
     password = Column("password", String(255), nullable=False)
     role_id = Column("role_id", ForeignKey("role.id"))
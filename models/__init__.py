@@ -5,10 +5,14 @@ from sqlalchemy.orm import (
     declarative_base,
     Session as SqlalchemySession,
 )
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from settings import (
-    DB_PORT, DB_HOST, DB_USER, DB_NAME, DB_PASSWORD
+    DB_PORT, DB_HOST, DB_USER, DB_NAME, DB_PASSWORD,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    DB_ASYNC_NULL_POOL,
 )
+from common.db_pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
 # Create SQLAlchemySession
 user = DB_USER
@@ -23,17 +27,20 @@ database = DB_NAME
 
 engine = create_engine(
     f"postgresql+psycopg2cffi://{user}:{password}@{host}:{port}/{database}",
-    pool_size=100,
-    max_overflow=0,
-    pool_timeout=300,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
 )
+# single session factory, shared by request sessions, seeders, cli and tests
 Session = sessionmaker(engine, future=True)
 factory_session = scoped_session(Session)
 
 
 def get_db_sync():
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
+    db = Session(autoflush=False)
     try:
         yield db
     finally:
@@ -41,13 +48,36 @@ def get_db_sync():
 
 
 # how to use async session on orm see:
-# https://docs.sqlalchemy.org/en/14/orm/extensions/asyncio.html#synopsis-orm
+# https://docs.sqlalchemy.org/en/20/orm/extensions/asyncio.html#synopsis-orm
 # asyncpg currently not working on PyPy
-# Create async session
-async_engine = create_async_engine(
-    f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}"
+# Create async session, used by every route through get_db_async.
+# The sync engine above stay for alembic, seeders, cli and test fixtures
+if DB_ASYNC_NULL_POOL:
+    # asyncpg connection is bound to the event loop that opened it,
+    # TestClient run every request on a fresh loop so pooling must be off there
+    async_engine = create_async_engine(
+        f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}",
+        poolclass=NullPool,
+    )
+else:
+    async_engine = create_async_engine(
+        f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+# expire_on_commit=False, attribute access after commit must not trigger implicit IO
+Async_Session = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
-Async_Session = sessionmaker(async_engine, class_=AsyncSession)
+
+
+async def get_db_async():
+    async with Async_Session() as db:
+        yield db
 
 # base for model
 Base = declarative_base()
@@ -59,10 +89,18 @@ from .Shift import Shift  # NoQA
 from .Kehadiran import Kehadiran  # NoQA
 from .Absensi import Absensi  # NoQA
 from .Shift import Shift # NOQA
+from .RefreshToken import RefreshToken  # NoQA
+from .AbsensiDailySummary import AbsensiDailySummary  # NoQA
+from .IdempotencyKey import IdempotencyKey  # NoQA
+from .AbsensiSyncEvent import AbsensiSyncEvent  # NoQA
 
 
 def clear_all_data_on_database(db: SqlalchemySession):
     db.execute(text("DELETE FROM public.user_shift"))
+    db.execute(text("DELETE FROM public.refresh_token"))
+    db.execute(text("DELETE FROM public.absensi_daily_summary"))
+    db.execute(text("DELETE FROM public.idempotency_key"))
+    db.execute(text("DELETE FROM public.absensi_sync_event"))
     stmt = select(Shift)
     all_data = db.execute(stmt).scalars().all()
     for val in all_data:
@@ -1,21 +1,37 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func, and_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import (
+    select, func, and_, or_, update, exists, union_all, cast, literal, values, column,
+    Sequence, Date, DateTime, Time, String, Integer
+)
 from models.Absensi import Absensi
+from models.AbsensiSyncEvent import AbsensiSyncEvent
+from models.Role import Role
 from models.Shift import Shift
 from models.User import User
+from common.security import Principal
+from common.archive import archived_absensi
+from common.dashboard_cache import invalidate_dashboard
+from repository.daily_summary import (
+    record_check_in,
+    record_check_out,
+    check_in_from,
+    check_out_from,
+)
 from math import ceil
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Union
 from datetime import datetime, timedelta
 import pytz
 from settings import (
     TZ,
     MAX_MINUTE_ABSEN_IN,
-    MIN_MINUTE_ABSEN_IN
+    MIN_MINUTE_ABSEN_IN,
+    ARCHIVE_DIR,
 )
 
 def paginate_list_only_user(
     db: Session,
-    user: User,
+    user: Union[User, Principal],
     page: int = 1,
     page_size: int = 10,
     start_date: Optional[datetime] = None,
@@ -25,8 +41,8 @@ def paginate_list_only_user(
 ) -> Tuple[List[Absensi], int, int]:
     limit = page_size
     offset = (page - 1) * limit
-    stmt = select(Absensi).filter(Absensi.absen_user == user)
-    stmt_count = select(func.count(Absensi.id)).filter(Absensi.absen_user == user)
+    stmt = select(Absensi).filter(Absensi.user_id == user.id)
+    stmt_count = select(func.count(Absensi.id)).filter(Absensi.user_id == user.id)
     if jam_masuk or jam_keluar is not None:
         if jam_masuk:
             jam_masuk = datetime.strptime(jam_masuk, "%H:%M:%S").time()
@@ -42,16 +58,16 @@ def paginate_list_only_user(
         stmt = stmt.filter(
             and_(
                 Absensi.tanggal_absen >= start_date,
-                Absensi.tanggal_absen >= end_date,
+                Absensi.tanggal_absen <= end_date,
             )
         )
         stmt_count = stmt_count.filter(
             and_(
                 Absensi.tanggal_absen >= start_date,
-                Absensi.tanggal_absen >= end_date,
+                Absensi.tanggal_absen <= end_date,
             )
         )
-    stmt = stmt.order_by(Absensi.tanggal_absen.asc()).limit(limit=limit).offset(offset=offset)
+    stmt = stmt.order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc()).limit(limit=limit).offset(offset=offset)
     get_list = db.execute(stmt).scalars().all()
     num_data = db.execute(stmt_count).scalar()
     num_page = ceil(num_data / limit)
@@ -69,7 +85,12 @@ def paginate_list_admin(
 ) -> Tuple[List[Absensi], int, int]:
     limit = page_size
     offset = (page - 1) * limit
-    stmt = select(Absensi)
+    # the report read absen_user, userRole and userShift of every row: many-to-one
+    # are joined, the user_shift collection is one selectin query per page
+    stmt = select(Absensi).options(
+        joinedload(Absensi.absen_user).joinedload(User.userRole),
+        joinedload(Absensi.absen_user).selectinload(User.userShift),
+    )
     stmt_count = select(func.count(Absensi.id))
     if user_name is not None:
         stmt = stmt.join(User).filter(User.nama.ilike(f"%{user_name}%"))
@@ -98,7 +119,7 @@ def paginate_list_admin(
             jam_keluar = datetime.strptime(jam_keluar, "%H:%M:%S").time()
             stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
             stmt_count = stmt_count.filter(Absensi.jam_keluar == jam_keluar)
-    stmt = stmt.order_by(Absensi.tanggal_absen.asc()).limit(limit=limit).offset(offset=offset)
+    stmt = stmt.order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc()).limit(limit=limit).offset(offset=offset)
     get_list = db.execute(stmt).scalars().all()
     num_data = db.execute(stmt_count).scalar()
     num_page = ceil(num_data / limit)
@@ -117,7 +138,7 @@ def get_absen_without_jam_keluar(
     user: User
 ) -> Absensi:
     query = select(Absensi).filter(
-        Absensi.absen_user == user,
+        Absensi.user_id == user.id,
         Absensi.jam_keluar == None #NOQA
     )
     data = db.execute(query).scalar()
@@ -129,13 +150,418 @@ def get_date_gt_today(
 ) -> Absensi:
     end_date = datetime.today().date()
     query = select(Absensi).filter(
-        Absensi.absen_user == user,
+        Absensi.user_id == user.id,
         Absensi.tanggal_absen < end_date,
         Absensi.jam_keluar == None #NOQA
     )
     data = db.execute(query).scalar()
     return data
 
+FORCED_KETERANGAN = "Absen lebih dari sehari"
+# outcome of absen_masuk_statement
+CHECK_IN_CREATED = "created"
+CHECK_IN_FORCED = "forced"
+CHECK_IN_OPEN = "open"
+# outcome of absen_keluar
+CHECK_OUT_UPDATED = "updated"
+CHECK_OUT_NOT_FOUND = "not_found"
+CHECK_OUT_CLOSED = "closed"
+
+def absen_masuk_statement(
+    user_id: int,
+    tanggal_absen,
+    jam_sekarang,
+    lokasi_masuk: str,
+    keterangan: Optional[str] = None,
+):
+    """
+    the whole check-in in one statement:
+    - open sessions of the days before tanggal_absen are closed like
+      forced_absen_gt_today and nothing is inserted, the user check-in again
+    - otherwise the row is inserted unless the user already has an open session
+      today (ix_absensi_open_session, ON CONFLICT DO NOTHING)
+    - absensi_daily_summary follow both
+    Return one (outcome, id, tanggal_absen, jam_masuk, keterangan, lokasi_masuk)
+    per closed (CHECK_IN_FORCED) or created (CHECK_IN_CREATED) row, no row when
+    the session of today is still open
+    """
+    table = Absensi.__table__
+    returning = (
+        table.c.id,
+        table.c.user_id,
+        table.c.tanggal_absen,
+        table.c.jam_masuk,
+        table.c.keterangan,
+        table.c.lokasi_masuk,
+    )
+    forced = (
+        update(table)
+        .where(
+            table.c.user_id == user_id,
+            table.c.jam_keluar == None, #NOQA
+            table.c.tanggal_absen < tanggal_absen,
+        )
+        .values(
+            jam_keluar=jam_sekarang,
+            lokasi_keluar=table.c.lokasi_masuk,
+            keterangan=FORCED_KETERANGAN,
+        )
+        .returning(*returning)
+        .cte("forced")
+    )
+    new_row = select(
+        cast(tanggal_absen, Date),
+        cast(jam_sekarang, Time),
+        cast(keterangan, String),
+        cast(lokasi_masuk, String),
+        cast(user_id, Integer),
+    ).where(~exists(select(forced.c.id)))
+    inserted = (
+        pg_insert(table)
+        .from_select(
+            ["tanggal_absen", "jam_masuk", "keterangan", "lokasi_masuk", "user_id"], new_row
+        )
+        .on_conflict_do_nothing(
+            index_elements=["user_id", "tanggal_absen"],
+            index_where=table.c.jam_keluar == None, #NOQA
+        )
+        .returning(*returning)
+        .cte("inserted")
+    )
+
+    def outcome(cte, name: str):
+        return select(
+            literal(name).label("outcome"),
+            cte.c.id,
+            cte.c.tanggal_absen,
+            cte.c.jam_masuk,
+            cte.c.keterangan,
+            cte.c.lokasi_masuk,
+        )
+
+    return union_all(
+        outcome(forced, CHECK_IN_FORCED), outcome(inserted, CHECK_IN_CREATED)
+    ).add_cte(
+        check_in_from(inserted).cte("summary_check_in"),
+        check_out_from(forced).cte("summary_check_out"),
+    )
+
+def absen_keluar_statement(
+    id: int,
+    user_id: int,
+    jam_sekarang,
+    lokasi_keluar: str,
+):
+    """
+    the whole check-out in one statement: the row is updated only when it belongs
+    to user_id and is still open, absensi_daily_summary follow it.
+    Return the updated row with the role of the user, no row otherwise
+    """
+    table = Absensi.__table__
+    updated = (
+        update(table)
+        .where(
+            table.c.id == id,
+            table.c.user_id == user_id,
+            table.c.jam_keluar == None, #NOQA
+        )
+        .values(jam_keluar=jam_sekarang, lokasi_keluar=lokasi_keluar)
+        .returning(
+            table.c.id,
+            table.c.user_id,
+            table.c.tanggal_absen,
+            table.c.jam_masuk,
+            table.c.jam_keluar,
+            table.c.keterangan,
+            table.c.lokasi_masuk,
+            table.c.lokasi_keluar,
+        )
+        .cte("updated")
+    )
+    return (
+        select(
+            updated,
+            Role.id.label("role_id"),
+            Role.jabatan.label("nama_role"),
+        )
+        .select_from(updated)
+        .outerjoin(User, User.id == updated.c.user_id)
+        .outerjoin(Role, Role.id == User.role_id)
+        .add_cte(check_out_from(updated).cte("summary_check_out"))
+    )
+
+def absen_masuk_batch_statement(rows: list, now: datetime):
+    """
+    write a batch of buffered check-ins (event_id, user_id, tanggal_absen,
+    jam_masuk, lokasi_masuk, keterangan), one per user, in one statement:
+    - events already in absensi_sync_event are skipped (journal replayed twice)
+    - open sessions of the previous days are closed like forced_absen_gt_today,
+      the check-in is still inserted: it was already acknowledged
+    - a user whose session of that day is still open, or who was deleted, is
+      skipped (ix_absensi_open_session, ON CONFLICT DO NOTHING)
+    - absensi_daily_summary follow both
+    Return (outcome, user_id, tanggal_absen) of every inserted (CHECK_IN_CREATED)
+    or closed (CHECK_IN_FORCED) row
+    """
+    table = Absensi.__table__
+    batch_values = values(
+        column("event_id", String),
+        column("user_id", Integer),
+        column("tanggal_absen", Date),
+        column("jam_masuk", Time),
+        column("lokasi_masuk", String),
+        column("keterangan", String),
+        name="batch_values",
+    ).data(rows)
+    batch = (
+        select(*[cast(val, val.type).label(val.name) for val in batch_values.c])
+        .where(
+            ~exists(
+                select(AbsensiSyncEvent.event_id).where(
+                    AbsensiSyncEvent.user_id == batch_values.c.user_id,
+                    AbsensiSyncEvent.event_id == batch_values.c.event_id,
+                )
+            ),
+            # a user deleted since the check-in would fail the whole batch
+            exists(select(User.id).where(User.id == batch_values.c.user_id)),
+        )
+        .cte("batch")
+    )
+    forced = (
+        update(table)
+        .where(
+            table.c.user_id == batch.c.user_id,
+            table.c.jam_keluar == None, #NOQA
+            table.c.tanggal_absen < batch.c.tanggal_absen,
+        )
+        .values(
+            jam_keluar=batch.c.jam_masuk,
+            lokasi_keluar=table.c.lokasi_masuk,
+            keterangan=FORCED_KETERANGAN,
+        )
+        .returning(table.c.user_id, table.c.tanggal_absen)
+        .cte("forced")
+    )
+    inserted = (
+        pg_insert(table)
+        .from_select(
+            ["tanggal_absen", "jam_masuk", "keterangan", "lokasi_masuk", "user_id"],
+            select(
+                batch.c.tanggal_absen,
+                batch.c.jam_masuk,
+                batch.c.keterangan,
+                batch.c.lokasi_masuk,
+                batch.c.user_id,
+            ).where(
+                # closes first, see absen_sync_statement
+                select(func.count()).select_from(forced).scalar_subquery() >= 0
+            ),
+        )
+        .on_conflict_do_nothing(
+            index_elements=["user_id", "tanggal_absen"],
+            index_where=table.c.jam_keluar == None, #NOQA
+        )
+        .returning(table.c.id, table.c.user_id, table.c.tanggal_absen, table.c.jam_masuk)
+        .cte("inserted")
+    )
+    recorded = (
+        pg_insert(AbsensiSyncEvent)
+        .from_select(
+            ["user_id", "event_id", "absensi_id", "status", "created_at"],
+            select(
+                batch.c.user_id,
+                batch.c.event_id,
+                inserted.c.id,
+                literal(CHECK_IN_CREATED, String),
+                cast(now, DateTime),
+            ).join(
+                inserted,
+                and_(
+                    inserted.c.user_id == batch.c.user_id,
+                    inserted.c.tanggal_absen == batch.c.tanggal_absen,
+                ),
+            ),
+        )
+        .on_conflict_do_nothing()
+        .cte("recorded")
+    )
+    return union_all(
+        select(literal(CHECK_IN_CREATED).label("outcome"), inserted.c.user_id, inserted.c.tanggal_absen),
+        select(literal(CHECK_IN_FORCED).label("outcome"), forced.c.user_id, forced.c.tanggal_absen),
+    ).add_cte(
+        recorded,
+        check_in_from(inserted).cte("summary_check_in"),
+        check_out_from(forced).cte("summary_check_out"),
+    )
+
+def absen_sync_statement(
+    user_id: int,
+    new_rows: list,
+    closed_rows: list,
+    events: list,
+    now: datetime,
+):
+    """
+    write a planned /absensi/sync batch in one statement:
+    - new_rows (tanggal_absen, jam_masuk, jam_keluar, keterangan, lokasi_masuk,
+      lokasi_keluar) in one multi-row INSERT, an open row conflicting with a
+      concurrent check-in (ix_absensi_open_session) is skipped
+    - closed_rows (id, tanggal_absen, jam_keluar, lokasi_keluar, keterangan, None
+      keeps the keterangan) in one UPDATE .. FROM VALUES, only while still open
+    - events (event_id, status, index in new_rows or None, id of closed_rows or
+      None) of the rows actually written go into absensi_sync_event
+    - absensi_daily_summary follow the rows
+    Return (event_id, absensi_id) of every recorded event
+    """
+    table = Absensi.__table__
+    absensi_ids = []
+    check_ins = []
+    check_outs = []
+    joins = []
+    if closed_rows:
+        closed_values = values(
+            column("id", Integer),
+            column("tanggal_absen", Date),
+            column("jam_keluar", Time),
+            column("lokasi_keluar", String),
+            column("keterangan", String),
+            name="closed_values",
+        ).data(closed_rows)
+        closed_values = select(
+            *[cast(val, val.type).label(val.name) for val in closed_values.c]
+        ).subquery("closed_values")
+        closed = (
+            update(table)
+            .where(
+                table.c.id == closed_values.c.id,
+                table.c.tanggal_absen == closed_values.c.tanggal_absen,
+                table.c.user_id == user_id,
+                table.c.jam_keluar == None, #NOQA
+            )
+            .values(
+                jam_keluar=closed_values.c.jam_keluar,
+                lokasi_keluar=closed_values.c.lokasi_keluar,
+                keterangan=func.coalesce(closed_values.c.keterangan, table.c.keterangan),
+            )
+            .returning(table.c.id, table.c.user_id, table.c.tanggal_absen)
+            .cte("closed")
+        )
+        check_outs.append(select(closed.c.user_id, closed.c.tanggal_absen))
+        joins.append((closed, lambda event: closed.c.id == event.c.absensi_id))
+        absensi_ids.append(closed.c.id)
+
+    if new_rows:
+        new_values = values(
+            column("ord", Integer),
+            column("tanggal_absen", Date),
+            column("jam_masuk", Time),
+            column("jam_keluar", Time),
+            column("keterangan", String),
+            column("lokasi_masuk", String),
+            column("lokasi_keluar", String),
+            name="new_values",
+        ).data([(ord, *row) for ord, row in enumerate(new_rows)])
+        # ids drawn before the insert, RETURNING does not keep the VALUES order.
+        # A column of NULL only is text in VALUES, every column is cast back
+        new_ids = select(
+            Sequence("absensi_id_seq").next_value().label("id"),
+            *[cast(val, val.type).label(val.name) for val in new_values.c],
+        )
+        if closed_rows:
+            # sub-statements of a WITH run in no given order, reading closed runs it
+            # first so a session closed and checked-in again the same day does
+            # not conflict with itself
+            new_ids = new_ids.where(
+                select(func.count()).select_from(closed).scalar_subquery() >= 0
+            )
+        new_ids = new_ids.cte("new_ids")
+        inserted = (
+            pg_insert(table)
+            .from_select(
+                [
+                    "id",
+                    "tanggal_absen",
+                    "jam_masuk",
+                    "jam_keluar",
+                    "keterangan",
+                    "lokasi_masuk",
+                    "lokasi_keluar",
+                    "user_id",
+                ],
+                select(
+                    new_ids.c.id,
+                    new_ids.c.tanggal_absen,
+                    new_ids.c.jam_masuk,
+                    new_ids.c.jam_keluar,
+                    new_ids.c.keterangan,
+                    new_ids.c.lokasi_masuk,
+                    new_ids.c.lokasi_keluar,
+                    cast(user_id, Integer),
+                ),
+            )
+            .on_conflict_do_nothing(
+                index_elements=["user_id", "tanggal_absen"],
+                index_where=table.c.jam_keluar == None, #NOQA
+            )
+            .returning(
+                table.c.id,
+                table.c.user_id,
+                table.c.tanggal_absen,
+                table.c.jam_masuk,
+                table.c.jam_keluar,
+            )
+            .cte("inserted")
+        )
+        check_ins.append(inserted)
+        check_outs.append(
+            select(inserted.c.user_id, inserted.c.tanggal_absen).where(
+                inserted.c.jam_keluar != None #NOQA
+            )
+        )
+        written = (
+            select(new_ids.c.ord, inserted.c.id)
+            .join(inserted, inserted.c.id == new_ids.c.id)
+            .cte("written")
+        )
+        joins.append((written, lambda event: written.c.ord == event.c.ord))
+        absensi_ids.append(written.c.id)
+    event_values = values(
+        column("event_id", String),
+        column("status", String),
+        column("ord", Integer),
+        column("absensi_id", Integer),
+        name="event_values",
+    ).data(events)
+    event_values = select(
+        *[cast(val, val.type).label(val.name) for val in event_values.c]
+    ).subquery("event_values")
+    recorded_rows = select(
+        cast(user_id, Integer),
+        event_values.c.event_id,
+        func.coalesce(*absensi_ids) if len(absensi_ids) > 1 else absensi_ids[0],
+        event_values.c.status,
+        cast(now, DateTime),
+    ).select_from(event_values)
+    for source, on in joins:
+        recorded_rows = recorded_rows.outerjoin(source, on(event_values))
+    recorded = (
+        pg_insert(AbsensiSyncEvent)
+        .from_select(
+            ["user_id", "event_id", "absensi_id", "status", "created_at"],
+            recorded_rows.where(or_(*[val != None for val in absensi_ids])), #NOQA
+        )
+        .on_conflict_do_nothing()
+        .returning(AbsensiSyncEvent.event_id, AbsensiSyncEvent.absensi_id)
+        .cte("recorded")
+    )
+
+    summary = []
+    if check_ins:
+        summary.append(check_in_from(check_ins[0]).cte("summary_check_in"))
+    checked_out = union_all(*check_outs).cte("checked_out") if len(check_outs) > 1 else check_outs[0].cte("checked_out")
+    summary.append(check_out_from(checked_out).cte("summary_check_out"))
+    return select(recorded.c.event_id, recorded.c.absensi_id).add_cte(*summary)
+
 def forced_absen_gt_today(
     db: Session,
     id: int,
@@ -147,10 +573,12 @@ def forced_absen_gt_today(
     data = db.execute(query).scalar()
     data.jam_keluar = datetime.now().astimezone(tz=pytz.timezone(TZ)).strftime("%H:%M:%S"),
     data.lokasi_keluar = data.lokasi_masuk
-    data.keterangan = "Absen lebih dari sehari"
+    data.keterangan = FORCED_KETERANGAN
     db.add(data)
+    record_check_out(db, data.user_id, data.tanggal_absen, is_commit=False)
     if is_commit:
         db.commit()
+    invalidate_dashboard(data.tanggal_absen, data.user_id)
     return data
 
 def create_masuk(
@@ -170,8 +598,12 @@ def create_masuk(
         absen_user=userId,
     )
     db.add(new_data)
+    record_check_in(
+        db, userId.id, new_data.tanggal_absen, new_data.jam_masuk, is_commit=False
+    )
     if is_commit:
         db.commit()
+    invalidate_dashboard(new_data.tanggal_absen, userId.id)
     return new_data
 
 def update_exit(
@@ -192,8 +624,10 @@ def update_exit(
     data.jam_keluar = datetime.now().astimezone(tz=pytz.timezone(TZ)).strftime("%H:%M:%S")
     data.lokasi_keluar = lokasi_keluar
     db.add(data)
+    record_check_out(db, data.user_id, data.tanggal_absen, is_commit=False)
     if is_commit:
         db.commit()
+    invalidate_dashboard(data.tanggal_absen, data.user_id)
     return data
 
 def export_excel_admin(
@@ -203,13 +637,20 @@ def export_excel_admin(
     jam_masuk: Optional[str] = None,
     jam_keluar: Optional[str] = None,
     user_name: Optional[str] = None,
+    archive_directory: str = ARCHIVE_DIR,
 ) -> Tuple[List[Absensi], int, int]:
+    """
+    rows dated before the archive cutoff (`python cli.py archive`) are read from
+    the archive files and merged, archived rows are not attached to db
+    """
     stmt = select(Absensi)
+    date_range = (None, None)
     if user_name is not None:
         stmt = stmt.join(User).filter(User.nama.ilike(f"%{user_name}%"))
     if start_date and end_date is not None:
         start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        date_range = (start_date, end_date)
         stmt = stmt.filter(
             and_(
                 Absensi.tanggal_absen >= start_date,
@@ -225,6 +666,15 @@ def export_excel_admin(
             stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
     stmt = stmt.order_by(Absensi.tanggal_absen.desc())
     get_list = db.execute(stmt).scalars().all()
+    archived = archived_absensi(
+        *date_range,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+        user_name=user_name,
+        directory=archive_directory,
+    )
+    if archived:
+        get_list = sorted([*get_list, *archived], key=lambda val: val.tanggal_absen, reverse=True)
     return get_list
 
 
@@ -236,7 +686,7 @@ def export_excel_user(
     jam_keluar: Optional[str] = None,
     user: Optional[str] = None,
 ) -> Tuple[List[Absensi], int, int]:
-    stmt = select(Absensi).filter(Absensi.absen_user == user)
+    stmt = select(Absensi).filter(Absensi.user_id == user.id)
     if start_date and end_date is not None:
         start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
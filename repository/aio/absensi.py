@@ -0,0 +1,618 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select, and_, tuple_
+from models.Absensi import Absensi
+from models.AbsensiSyncEvent import AbsensiSyncEvent
+from models.Shift import Shift
+from models.User import User
+from common.security import Principal
+from common.pagination import CountMode, encode_cursor, decode_cursor, paginate
+from common.archive import archived_absensi, archive_cutoff
+from common.absensi_sync import SyncRow, SyncResult, SYNC_CONFLICT, plan_sync
+from common.dashboard_cache import invalidate_dashboard
+from repository.aio.daily_summary import record_check_in, record_check_out
+from repository.absensi import (
+    FORCED_KETERANGAN,
+    CHECK_IN_CREATED,
+    CHECK_IN_FORCED,
+    CHECK_IN_OPEN,
+    CHECK_OUT_UPDATED,
+    CHECK_OUT_NOT_FOUND,
+    CHECK_OUT_CLOSED,
+    absen_masuk_statement,
+    absen_keluar_statement,
+    absen_sync_statement,
+    absen_masuk_batch_statement,
+)
+from typing import Tuple, List, Optional, Union
+from datetime import datetime, timedelta
+import pytz
+from settings import TZ, ARCHIVE_DIR, SYNC_MAX_AGE_DAYS
+
+
+def _with_user():
+    # absen_user with userRole and userShift, read by the admin/detail responses.
+    # many-to-one are joined into the page query, the user_shift collection is a
+    # single selectin query so the statements per page do not grow with page_size
+    return (
+        joinedload(Absensi.absen_user).joinedload(User.userRole),
+        joinedload(Absensi.absen_user).selectinload(User.userShift),
+    )
+
+
+def now_time():
+    # asyncpg only bind datetime.time to TIME columns, not "HH:MM:SS" strings
+    return datetime.now().astimezone(tz=pytz.timezone(TZ)).time().replace(microsecond=0)
+
+
+def _filter_list_user(
+    stmt,
+    user: Union[User, Principal],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+):
+    stmt = stmt.filter(Absensi.user_id == user.id)
+    if jam_masuk or jam_keluar is not None:
+        if jam_masuk:
+            jam_masuk = datetime.strptime(jam_masuk, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_masuk == jam_masuk)
+        if jam_keluar:
+            jam_keluar = datetime.strptime(jam_keluar, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
+    if start_date and end_date is not None:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        stmt = stmt.filter(
+            and_(
+                Absensi.tanggal_absen >= start_date,
+                Absensi.tanggal_absen <= end_date,
+            )
+        )
+    return stmt
+
+def _filter_list_admin(
+    stmt,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_name: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+):
+    if user_name is not None:
+        stmt = stmt.join(User).filter(User.nama.ilike(f"%{user_name}%"))
+    if start_date and end_date is not None:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        stmt = stmt.filter(
+            and_(
+                Absensi.tanggal_absen >= start_date,
+                Absensi.tanggal_absen <= end_date,
+            )
+        )
+    if jam_masuk or jam_keluar is not None:
+        if jam_masuk:
+            jam_masuk = datetime.strptime(jam_masuk, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_masuk == jam_masuk)
+        if jam_keluar:
+            jam_keluar = datetime.strptime(jam_keluar, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
+    return stmt
+
+async def _seek_page(
+    db: AsyncSession, stmt, cursor: Optional[str], page_size: int
+) -> Tuple[List[Absensi], Optional[str]]:
+    """
+    keyset page ordered by (tanggal_absen, id): rows after cursor are found through
+    the index instead of reading and discarding every earlier page like OFFSET
+    """
+    if cursor:
+        tanggal_absen, id = decode_cursor(cursor)
+        # the plain range is redundant but row comparison can not prune partitions
+        stmt = stmt.filter(
+            Absensi.tanggal_absen >= tanggal_absen,
+            tuple_(Absensi.tanggal_absen, Absensi.id) > tuple_(tanggal_absen, id),
+        )
+    stmt = stmt.order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc()).limit(page_size + 1)
+    get_list = (await db.execute(stmt)).unique().scalars().all()
+    next_cursor = None
+    if len(get_list) > page_size:
+        get_list = get_list[:page_size]
+        next_cursor = encode_cursor(get_list[-1].tanggal_absen, get_list[-1].id)
+    return get_list, next_cursor
+
+def _next_cursor(
+    get_list: List[Absensi], page: int, page_size: int, num_data: Optional[int], count: CountMode
+) -> Optional[str]:
+    # page mode also hand out a cursor so client can switch to keyset after any page
+    if not get_list:
+        return None
+    if count == CountMode.exact:
+        has_next = (page - 1) * page_size + len(get_list) < num_data
+    else:
+        has_next = len(get_list) == page_size
+    if has_next:
+        return encode_cursor(get_list[-1].tanggal_absen, get_list[-1].id)
+    return None
+
+async def paginate_list_only_user(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    page: int = 1,
+    page_size: int = 10,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[Absensi], Optional[int], Optional[int], Optional[str]]:
+    stmt = _filter_list_user(
+        select(Absensi),
+        user=user,
+        start_date=start_date,
+        end_date=end_date,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+    )
+    stmt = stmt.order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc())
+    get_list, num_data, num_page = await paginate(db, stmt, page, page_size, count)
+    return get_list, num_data, num_page, _next_cursor(get_list, page, page_size, num_data, count)
+
+async def cursor_list_only_user(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    cursor: Optional[str] = None,
+    page_size: int = 10,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+) -> Tuple[List[Absensi], Optional[str]]:
+    """
+    cursor: next_cursor of the previous page, empty for the first page.
+    raise InvalidCursor when cursor can not be decoded
+    """
+    stmt = _filter_list_user(
+        select(Absensi),
+        user=user,
+        start_date=start_date,
+        end_date=end_date,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+    )
+    return await _seek_page(db, stmt, cursor, page_size)
+
+async def paginate_list_admin(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_name: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[Absensi], Optional[int], Optional[int], Optional[str]]:
+    stmt = _filter_list_admin(
+        select(Absensi).options(*_with_user()),
+        start_date=start_date,
+        end_date=end_date,
+        user_name=user_name,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+    )
+    stmt = stmt.order_by(Absensi.tanggal_absen.asc(), Absensi.id.asc())
+    get_list, num_data, num_page = await paginate(db, stmt, page, page_size, count)
+    return get_list, num_data, num_page, _next_cursor(get_list, page, page_size, num_data, count)
+
+async def cursor_list_admin(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    page_size: int = 10,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_name: Optional[str] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None
+) -> Tuple[List[Absensi], Optional[str]]:
+    """
+    cursor: next_cursor of the previous page, empty for the first page.
+    raise InvalidCursor when cursor can not be decoded
+    """
+    stmt = _filter_list_admin(
+        select(Absensi).options(*_with_user()),
+        start_date=start_date,
+        end_date=end_date,
+        user_name=user_name,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+    )
+    return await _seek_page(db, stmt, cursor, page_size)
+
+async def get_by_id(
+    db: AsyncSession,
+    id: int,
+) -> Absensi:
+    query = select(Absensi).options(*_with_user()).filter(Absensi.id == id)
+    data = (await db.execute(query)).unique().scalar()
+    return data
+
+async def get_absen_without_jam_keluar(
+    db: AsyncSession,
+    user: Union[User, Principal]
+) -> Absensi:
+    query = select(Absensi).filter(
+        Absensi.user_id == user.id,
+        Absensi.jam_keluar == None #NOQA
+    )
+    data = (await db.execute(query)).scalar()
+    return data
+
+async def has_open_session(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    tanggal_absen,
+) -> bool:
+    """
+    session of tanggal_absen not checked-out yet (ix_absensi_open_session),
+    absen_masuk answer CHECK_IN_OPEN for it
+    """
+    query = select(Absensi.id).filter(
+        Absensi.user_id == user.id,
+        Absensi.tanggal_absen == tanggal_absen,
+        Absensi.jam_keluar == None #NOQA
+    ).limit(1)
+    return (await db.execute(query)).scalar() is not None
+
+async def get_id_by_event(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    event_id: str,
+) -> Optional[int]:
+    """
+    absensi id written for event_id of user (buffered check-in or /absensi/sync),
+    None while the event is not written
+    """
+    query = select(AbsensiSyncEvent.absensi_id).filter(
+        AbsensiSyncEvent.user_id == user.id,
+        AbsensiSyncEvent.event_id == event_id,
+    )
+    return (await db.execute(query)).scalar()
+
+async def get_date_gt_today(
+    db: AsyncSession,
+    user: Union[User, Principal]
+) -> Absensi:
+    end_date = datetime.today().date()
+    query = select(Absensi).filter(
+        Absensi.user_id == user.id,
+        Absensi.tanggal_absen < end_date,
+        Absensi.jam_keluar == None #NOQA
+    )
+    data = (await db.execute(query)).scalar()
+    return data
+
+async def forced_absen_gt_today(
+    db: AsyncSession,
+    id: int,
+    is_commit: bool = True
+):
+    query = select(Absensi).filter(
+        Absensi.id == id,
+    )
+    data = (await db.execute(query)).scalar()
+    data.jam_keluar = now_time()
+    data.lokasi_keluar = data.lokasi_masuk
+    data.keterangan = FORCED_KETERANGAN
+    db.add(data)
+    await record_check_out(db, data.user_id, data.tanggal_absen, is_commit=False)
+    if is_commit:
+        await db.commit()
+    invalidate_dashboard(data.tanggal_absen, data.user_id)
+    return data
+
+async def absen_masuk(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    lokasi_masuk: str,
+    keterangan: Optional[str] = None,
+    is_commit: bool = True
+):
+    """
+    check-in in one round-trip, see absen_masuk_statement. Return
+    (CHECK_IN_CREATED, row), (CHECK_IN_FORCED, None) when open sessions of the
+    previous days were closed instead, or (CHECK_IN_OPEN, None) when the session
+    of today is still open
+    """
+    stmt = absen_masuk_statement(
+        user_id=user.id,
+        tanggal_absen=datetime.today().date(),
+        jam_sekarang=now_time(),
+        lokasi_masuk=lokasi_masuk,
+        keterangan=keterangan,
+    )
+    rows = (await db.execute(stmt)).all()
+    if is_commit:
+        await db.commit()
+    for row in rows:
+        invalidate_dashboard(row.tanggal_absen, user.id)
+    for row in rows:
+        if row.outcome == CHECK_IN_CREATED:
+            return CHECK_IN_CREATED, row
+    if rows:
+        return CHECK_IN_FORCED, None
+    return CHECK_IN_OPEN, None
+
+async def absen_sync(
+    db: AsyncSession,
+    user: User,
+    events: list,
+    is_commit: bool = True
+) -> List[SyncResult]:
+    """
+    write a batch of offline events (see plan_sync), one result per event in order.
+    Reads the open sessions and the known event ids, then writes every accepted
+    event with absen_sync_statement. user must be loaded with userShift
+    """
+    if not events:
+        return []
+    # one sync per user at a time, the plan is made on the rows read below
+    await db.execute(select(User.id).filter(User.id == user.id).with_for_update())
+    query = select(
+        Absensi.id,
+        Absensi.tanggal_absen,
+        Absensi.jam_masuk,
+        Absensi.lokasi_masuk,
+        Absensi.keterangan,
+    ).filter(
+        Absensi.user_id == user.id,
+        Absensi.jam_keluar == None #NOQA
+    )
+    open_rows = [
+        SyncRow(
+            id=val.id,
+            tanggal_absen=val.tanggal_absen,
+            jam_masuk=val.jam_masuk,
+            lokasi_masuk=val.lokasi_masuk,
+            keterangan=val.keterangan,
+        )
+        for val in (await db.execute(query)).all()
+    ]
+    query = select(AbsensiSyncEvent.event_id, AbsensiSyncEvent.absensi_id).filter(
+        AbsensiSyncEvent.user_id == user.id,
+        AbsensiSyncEvent.event_id.in_({val.event_id for val in events}),
+    )
+    seen = dict((await db.execute(query)).all())
+
+    now = datetime.now().astimezone(tz=pytz.timezone(TZ)).replace(tzinfo=None)
+    earliest = now.date() - timedelta(days=SYNC_MAX_AGE_DAYS)
+    # rows before the archive cutoff would never be read again
+    cutoff = archive_cutoff(ARCHIVE_DIR)
+    if cutoff is not None:
+        earliest = max(earliest, cutoff)
+    plan = plan_sync(events, open_rows, seen, user.userShift, now, earliest)
+    accepted = plan.accepted
+    if accepted:
+        ord = {id(row): index for index, row in enumerate(plan.new_rows)}
+        stmt = absen_sync_statement(
+            user_id=user.id,
+            new_rows=[
+                (
+                    val.tanggal_absen,
+                    val.jam_masuk,
+                    val.jam_keluar,
+                    val.keterangan,
+                    val.lokasi_masuk,
+                    val.lokasi_keluar,
+                )
+                for val in plan.new_rows
+            ],
+            closed_rows=[
+                (val.id, val.tanggal_absen, val.jam_keluar, val.lokasi_keluar, val.keterangan)
+                for val in plan.closed_rows
+            ],
+            events=[
+                (val.event_id, val.status, ord.get(id(val.row)), val.row.id)
+                for val in accepted
+            ],
+            now=datetime.now(),
+        )
+        recorded = dict((await db.execute(stmt)).all())
+        for val in accepted:
+            if val.event_id in recorded:
+                val.absensi_id = recorded[val.event_id]
+            else:
+                val.status = SYNC_CONFLICT
+    if is_commit:
+        await db.commit()
+    days = {val.tanggal_absen for val in plan.closed_rows}
+    days |= {val.row.tanggal_absen for val in accepted}
+    for tanggal_absen in days:
+        invalidate_dashboard(tanggal_absen, user.id)
+    return plan.results
+
+async def absen_masuk_batch(
+    db: AsyncSession,
+    entries: list,
+    is_commit: bool = True
+) -> list:
+    """
+    write buffered check-ins (event_id, user_id, tanggal_absen, jam_masuk,
+    lokasi_masuk, keterangan) with absen_masuk_batch_statement.
+    Return (outcome, user_id, tanggal_absen) of the rows inserted or closed
+    """
+    stmt = absen_masuk_batch_statement(rows=entries, now=datetime.now())
+    rows = (await db.execute(stmt)).all()
+    if is_commit:
+        await db.commit()
+    for row in rows:
+        invalidate_dashboard(row.tanggal_absen, row.user_id)
+    return rows
+
+async def create_masuk(
+    db: AsyncSession,
+    lokasi_masuk: str,
+    userId: User,
+    keterangan: Optional[str] = None,
+    is_commit: bool = True
+) -> Absensi:
+    """
+    userId must be loaded with userRole and userShift, the response read them
+    """
+    new_data = Absensi(
+        tanggal_absen=datetime.today().date(),
+        jam_masuk=now_time(),
+        keterangan=keterangan,
+        lokasi_masuk=lokasi_masuk,
+        absen_user=userId,
+    )
+    db.add(new_data)
+    await record_check_in(
+        db, userId.id, new_data.tanggal_absen, new_data.jam_masuk, is_commit=False
+    )
+    if is_commit:
+        await db.commit()
+    invalidate_dashboard(new_data.tanggal_absen, userId.id)
+    return new_data
+
+async def absen_keluar(
+    db: AsyncSession,
+    id: int,
+    user: Union[User, Principal],
+    lokasi_keluar: str,
+    is_commit: bool = True
+):
+    """
+    check-out in one round-trip, see absen_keluar_statement. Return
+    (CHECK_OUT_UPDATED, row), (CHECK_OUT_NOT_FOUND, None) when the row does not
+    exist or belongs to another user, or (CHECK_OUT_CLOSED, None) when it is
+    already checked-out. Only the failures query the row again
+    """
+    stmt = absen_keluar_statement(
+        id=id,
+        user_id=user.id,
+        jam_sekarang=now_time(),
+        lokasi_keluar=lokasi_keluar,
+    )
+    row = (await db.execute(stmt)).first()
+    if is_commit:
+        await db.commit()
+    if row is not None:
+        invalidate_dashboard(row.tanggal_absen, user.id)
+        return CHECK_OUT_UPDATED, row
+    query = select(Absensi.id).filter(Absensi.id == id, Absensi.user_id == user.id)
+    if (await db.execute(query)).scalar() is None:
+        return CHECK_OUT_NOT_FOUND, None
+    return CHECK_OUT_CLOSED, None
+
+async def update_exit(
+    db: AsyncSession,
+    id: int,
+    lokasi_keluar: str,
+    is_commit: bool = True
+) -> Absensi:
+    query = select(Absensi).options(*_with_user()).filter(
+        Absensi.id == id,
+        Absensi.jam_keluar == None, #NOQA
+    )
+    data = (await db.execute(query)).unique().scalar()
+    if data is None:
+        return None
+    data.jam_keluar = now_time()
+    data.lokasi_keluar = lokasi_keluar
+    db.add(data)
+    await record_check_out(db, data.user_id, data.tanggal_absen, is_commit=False)
+    if is_commit:
+        await db.commit()
+    invalidate_dashboard(data.tanggal_absen, data.user_id)
+    return data
+
+async def export_excel_admin(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+    user_name: Optional[str] = None,
+    archive_directory: str = ARCHIVE_DIR,
+) -> List[Absensi]:
+    """
+    rows dated before the archive cutoff are read from the archive files (in a
+    thread, file reads would block the event loop) and merged
+    """
+    stmt = select(Absensi).options(joinedload(Absensi.absen_user))
+    date_range = (None, None)
+    if user_name is not None:
+        stmt = stmt.join(User).filter(User.nama.ilike(f"%{user_name}%"))
+    if start_date and end_date is not None:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        date_range = (start_date, end_date)
+        stmt = stmt.filter(
+            and_(
+                Absensi.tanggal_absen >= start_date,
+                Absensi.tanggal_absen <= end_date,
+            )
+        )
+    if jam_masuk or jam_keluar is not None:
+        if jam_masuk:
+            jam_masuk = datetime.strptime(jam_masuk, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_masuk == jam_masuk)
+        if jam_keluar:
+            jam_keluar = datetime.strptime(jam_keluar, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
+    stmt = stmt.order_by(Absensi.tanggal_absen.desc())
+    get_list = (await db.execute(stmt)).scalars().all()
+    archived = await asyncio.to_thread(
+        archived_absensi,
+        *date_range,
+        jam_masuk=jam_masuk,
+        jam_keluar=jam_keluar,
+        user_name=user_name,
+        directory=archive_directory,
+    )
+    if archived:
+        get_list = sorted([*get_list, *archived], key=lambda val: val.tanggal_absen, reverse=True)
+    return get_list
+
+
+async def export_excel_user(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    jam_masuk: Optional[str] = None,
+    jam_keluar: Optional[str] = None,
+    user: Optional[Union[User, Principal]] = None,
+) -> List[Absensi]:
+    stmt = select(Absensi).filter(Absensi.user_id == user.id)
+    if start_date and end_date is not None:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        stmt = stmt.filter(
+            and_(
+                Absensi.tanggal_absen >= start_date,
+                Absensi.tanggal_absen <= end_date,
+            )
+        )
+    if jam_masuk or jam_keluar is not None:
+        if jam_masuk:
+            jam_masuk = datetime.strptime(jam_masuk, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_masuk == jam_masuk)
+        if jam_keluar:
+            jam_keluar = datetime.strptime(jam_keluar, "%H:%M:%S").time()
+            stmt = stmt.where(Absensi.jam_keluar == jam_keluar)
+    stmt = stmt.order_by(Absensi.tanggal_absen.desc())
+    get_list = (await db.execute(stmt)).scalars().all()
+    return get_list
+
+
+async def get_absen_by_user_shift(
+    db: AsyncSession, user: Union[User, Principal], shift: Shift
+) -> Optional[Absensi]:
+    query = select(Absensi).filter(
+        Absensi.user_id == user.id,
+        Absensi.shift_id == shift.id
+    ).limit(1)
+    return (await db.execute(query)).scalar()
@@ -0,0 +1,138 @@
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from common.security import (
+    validated_user_password_async,
+    generate_hash_password_async,
+    password_needs_rehash,
+    generate_refresh_token,
+    hash_refresh_token,
+    invalidate_principals,
+)
+from models.User import User
+from models.RefreshToken import RefreshToken
+from settings import REFRESH_TOKEN_EXPIRE_DAYS
+
+
+async def check_user_password(
+    db: AsyncSession, email: str, password: str, is_commit: bool = True
+) -> bool:
+    """
+    on success, password hashed with other cost than BCRYPT_ROUNDS is rehashed
+    so changing BCRYPT_ROUNDS does not need mass password reset
+    """
+    user = await get_user_by_email(db=db, email=email)
+    if user is None:
+        return False
+    is_valid = await validated_user_password_async(user.password, password)
+    if is_valid and password_needs_rehash(user.password):
+        user.password = await generate_hash_password_async(password)
+        db.add(user)
+        if is_commit:
+            await db.commit()
+    return is_valid
+
+
+async def check_old_password(user: User, old_password: str) -> None:
+    if await validated_user_password_async(user.password, old_password):
+        return True
+    return None
+
+
+async def change_user_password(
+    db: AsyncSession, user: User, new_password: str, is_commit: bool = True
+) -> None:
+    user.password = await generate_hash_password_async(new_password)
+    db.add(user)
+    await revoke_refresh_tokens(db=db, user_id=user.id, is_commit=False)
+    if is_commit:
+        await db.commit()
+    invalidate_principals(db, [user.id])
+    return user
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    q = select(User).filter(User.email == email)
+    user = (await db.execute(q)).scalar()
+    return user
+
+
+async def create_refresh_token(
+    db: AsyncSession, user_id: int, is_commit: bool = True
+) -> str:
+    """
+    store sha256 of a new refresh token, return the plain token for the client
+    """
+    token = generate_refresh_token()
+    now = datetime.now()
+    db.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=hash_refresh_token(token),
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            created_at=now,
+        )
+    )
+    if is_commit:
+        await db.commit()
+    return token
+
+
+async def rotate_refresh_token(
+    db: AsyncSession, refresh_token: str, is_commit: bool = True
+) -> Optional[Tuple[User, str]]:
+    """
+    revoke refresh_token and issue a new one in the same transaction.
+    return (user, new refresh token) or None when token is unknown, expired or revoked.
+    Reusing a revoked token revoke every refresh token of that user
+    """
+    now = datetime.now()
+    token_hash = hash_refresh_token(refresh_token)
+    stmt = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at == None,  # NOQA
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id)
+    )
+    user_id = (await db.execute(stmt)).scalar()
+    if user_id is None:
+        reused = (
+            await db.execute(
+                select(RefreshToken.user_id).filter(
+                    RefreshToken.token_hash == token_hash,
+                    RefreshToken.revoked_at != None,  # NOQA
+                )
+            )
+        ).scalar()
+        if reused is not None:
+            await revoke_refresh_tokens(db=db, user_id=reused, is_commit=False)
+        if is_commit:
+            await db.commit()
+        return None
+    user = await db.get(User, user_id)
+    new_token = await create_refresh_token(db=db, user_id=user_id, is_commit=False)
+    if is_commit:
+        await db.commit()
+    return user, new_token
+
+
+async def revoke_refresh_tokens(
+    db: AsyncSession, user_id: int, is_commit: bool = True
+) -> None:
+    stmt = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at == None,  # NOQA
+        )
+        .values(revoked_at=datetime.now())
+    )
+    await db.execute(stmt)
+    if is_commit:
+        await db.commit()
+    return None
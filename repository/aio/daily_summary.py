@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, time
+from repository.daily_summary import check_in_statement, check_out_statement
+
+
+async def record_check_in(
+    db: AsyncSession,
+    user_id: int,
+    tanggal_absen: date,
+    jam_masuk: time,
+    is_commit: bool = True,
+) -> None:
+    await db.execute(check_in_statement(user_id, tanggal_absen, jam_masuk))
+    if is_commit:
+        await db.commit()
+
+
+async def record_check_out(
+    db: AsyncSession,
+    user_id: int,
+    tanggal_absen: date,
+    is_commit: bool = True,
+) -> None:
+    await db.execute(check_out_statement(user_id, tanggal_absen))
+    if is_commit:
+        await db.commit()
@@ -0,0 +1,136 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+from models.Absensi import Absensi
+from models.AbsensiDailySummary import AbsensiDailySummary
+from models.User import User
+from common.security import Principal
+from common.dashboard_cache import ADMIN_SCOPE, cached_dashboard
+from repository.dashboard import (
+    summary_admin_statement,
+    summary_user_statement,
+    summary_from_rows,
+)
+from typing import Union
+from datetime import datetime
+
+async def count_day_admin(
+    db: AsyncSession,
+    start_date: str,
+    end_date: str,
+) -> int:
+    # absensi_daily_summary, O(days x roles) rows instead of O(attendances)
+    stmt_count = select(func.coalesce(func.sum(AbsensiDailySummary.check_ins), 0))
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    stmt_count = stmt_count.filter(
+        and_(
+            AbsensiDailySummary.tanggal_absen >= start_date,
+            AbsensiDailySummary.tanggal_absen <= end_date,
+        )
+    )
+
+    async def compute():
+        return (await db.execute(stmt_count)).scalar()
+
+    return await cached_dashboard("admin/count-day", ADMIN_SCOPE, start_date, end_date, compute)
+
+async def count_day_user(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    start_date: str,
+    end_date: str,
+) -> int:
+    stmt_count = select(func.count(Absensi.id)).filter(Absensi.user_id == user.id)
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    stmt_count = stmt_count.filter(
+        and_(
+            Absensi.tanggal_absen >= start_date,
+            Absensi.tanggal_absen <= end_date,
+        )
+    )
+
+    async def compute():
+        return (await db.execute(stmt_count)).scalar()
+
+    return await cached_dashboard("user/count-day", user.id, start_date, end_date, compute)
+
+async def volume_by_month_admin(
+    db: AsyncSession,
+    start_date: str,
+    end_date: str,
+):
+    stmt = select(
+        AbsensiDailySummary.tanggal_absen,
+        func.sum(AbsensiDailySummary.check_ins).label("total"),
+    )
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    stmt = stmt.filter(
+        and_(
+            AbsensiDailySummary.tanggal_absen >= start_date,
+            AbsensiDailySummary.tanggal_absen <= end_date,
+        )
+    )
+    stmt = stmt.group_by(AbsensiDailySummary.tanggal_absen).order_by(
+        AbsensiDailySummary.tanggal_absen.asc()
+    )
+
+    async def compute():
+        return (await db.execute(stmt)).all()
+
+    return await cached_dashboard("admin/volume-month", ADMIN_SCOPE, start_date, end_date, compute)
+
+async def volume_by_month_user(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    start_date: str,
+    end_date: str,
+):
+    # O(days) through ix_absensi_user_id_tanggal_absen_id, the summary has no user grain
+    stmt = select(
+        Absensi.tanggal_absen, func.count(Absensi.id).label("total")
+    ).filter(Absensi.user_id == user.id)
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    stmt = stmt.filter(
+        and_(
+            Absensi.tanggal_absen >= start_date,
+            Absensi.tanggal_absen <= end_date,
+        )
+    )
+    stmt = stmt.group_by(Absensi.tanggal_absen).order_by(Absensi.tanggal_absen.asc())
+
+    async def compute():
+        return (await db.execute(stmt)).all()
+
+    return await cached_dashboard("user/volume-month", user.id, start_date, end_date, compute)
+
+async def summary_admin(
+    db: AsyncSession,
+    start_date: str,
+    end_date: str,
+) -> dict:
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    async def compute():
+        rows = (await db.execute(summary_admin_statement(start_date, end_date))).all()
+        return summary_from_rows(rows, start_date, end_date, breakdown=True)
+
+    return await cached_dashboard("admin/summary", ADMIN_SCOPE, start_date, end_date, compute)
+
+async def summary_user(
+    db: AsyncSession,
+    user: Union[User, Principal],
+    start_date: str,
+    end_date: str,
+) -> dict:
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    async def compute():
+        rows = (await db.execute(summary_user_statement(user.id, start_date, end_date))).all()
+        return summary_from_rows(rows, start_date, end_date, breakdown=False)
+
+    return await cached_dashboard("user/summary", user.id, start_date, end_date, compute)
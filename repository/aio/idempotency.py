@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from repository.idempotency import (
+    PENDING_STATUS,  # NoQA
+    get_statement,
+    reserve_statement,
+    complete_statement,
+    release_statement,
+)
+
+
+async def get_by_key(db: AsyncSession, user_id: int, key: str):
+    """
+    (fingerprint, status_code, response, expires_at) of an unexpired key, None otherwise.
+    status_code is PENDING_STATUS while the first request is running
+    """
+    result = await db.execute(get_statement(user_id, key, datetime.now()))
+    return result.first()
+
+
+async def reserve(
+    db: AsyncSession,
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    ttl_seconds: int,
+    is_commit: bool = True,
+) -> bool:
+    """
+    insert the pending row of the key, False when another request already has it.
+    Committed so the other workers see it before the request runs
+    """
+    now = datetime.now()
+    result = await db.execute(
+        reserve_statement(
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            now=now,
+            expires_at=now + timedelta(seconds=ttl_seconds),
+        )
+    )
+    reserved = result.first() is not None
+    if is_commit:
+        await db.commit()
+    return reserved
+
+
+async def complete(
+    db: AsyncSession,
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    status_code: int,
+    response: Optional[Any],
+    ttl_seconds: int,
+    is_commit: bool = True,
+) -> None:
+    await db.execute(
+        complete_statement(
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            status_code=status_code,
+            response=response,
+            expires_at=datetime.now() + timedelta(seconds=ttl_seconds),
+        )
+    )
+    if is_commit:
+        await db.commit()
+
+
+async def release(
+    db: AsyncSession, user_id: int, key: str, fingerprint: str, is_commit: bool = True
+) -> None:
+    await db.execute(release_statement(user_id, key, fingerprint))
+    if is_commit:
+        await db.commit()
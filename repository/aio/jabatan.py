@@ -0,0 +1,64 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.Role import Role
+from sqlalchemy import select
+from typing import Optional, Tuple, List
+from common.pagination import CountMode, paginate
+
+async def paginate_jabatan(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    jabatan: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[Role], Optional[int], Optional[int]]:
+    stmt = select(Role)
+    if jabatan is not None:
+        stmt = stmt.filter(Role.jabatan.ilike(f"%{jabatan}%"))
+    stmt = stmt.order_by(Role.id.asc())
+    return await paginate(db, stmt, page, page_size, count)
+
+async def get_jabatan_by_id(
+    db: AsyncSession,
+    id: int
+) -> Role:
+    query = select(Role).filter(Role.id == id)
+    return (await db.execute(query)).scalar()
+
+async def create(
+    db: AsyncSession,
+    nama_jabatan: str,
+    is_commit: bool = True
+) -> Role:
+    new_jabatan = Role(
+        jabatan=nama_jabatan
+    )
+    db.add(new_jabatan)
+    if is_commit:
+        await db.commit()
+    return new_jabatan
+
+async def update(
+    db: AsyncSession,
+    id: int,
+    nama_jabatan: str,
+    is_commit: bool = True
+) -> Role:
+    query = select(Role).filter(Role.id == id)
+    data = (await db.execute(query)).scalar()
+    data.jabatan = nama_jabatan
+    db.add(data)
+    if is_commit:
+        await db.commit()
+    return data
+
+async def delete(
+    db: AsyncSession,
+    id: int,
+    is_commit: bool = True
+) -> None:
+    query = select(Role).filter(Role.id == id)
+    data = (await db.execute(query)).scalar()
+    await db.delete(data)
+    if is_commit:
+        await db.commit()
+    return None
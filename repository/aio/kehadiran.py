@@ -0,0 +1,69 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.Kehadiran import Kehadiran
+from typing import Tuple, List, Optional
+from sqlalchemy import select
+from common.pagination import CountMode, paginate
+
+async def paginate_list(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    nama_kehadiran: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[Kehadiran], Optional[int], Optional[int]]:
+    stmt = select(Kehadiran)
+    if nama_kehadiran is not None:
+        stmt = stmt.filter(Kehadiran.nama_kehadiran.ilike(f"%{nama_kehadiran}%"))
+
+    stmt = stmt.order_by(Kehadiran.id.asc())
+    return await paginate(db, stmt, page, page_size, count)
+
+async def get_by_id(
+    db: AsyncSession,
+    id: int
+) -> Kehadiran:
+    query = select(Kehadiran).filter(Kehadiran.id == id)
+    return (await db.execute(query)).scalar()
+
+async def create(
+    db: AsyncSession,
+    nama_kehadiran: str,
+    keterangan: str,
+    is_commit: bool = True
+) -> Kehadiran:
+    new_data = Kehadiran(
+        nama_kehadiran=nama_kehadiran,
+        keterangan=keterangan
+    )
+    db.add(new_data)
+    if is_commit:
+        await db.commit()
+    return new_data
+
+async def update(
+    db: AsyncSession,
+    id: int,
+    nama_kehadiran: str,
+    keterangan: str,
+    is_commit: bool = True
+) -> Kehadiran:
+    query = select(Kehadiran).filter(Kehadiran.id == id)
+    data = (await db.execute(query)).scalar()
+    data.nama_kehadiran = nama_kehadiran
+    data.keterangan = keterangan
+    db.add(data)
+    if is_commit:
+        await db.commit()
+    return data
+
+async def delete(
+    db: AsyncSession,
+    id: int,
+    is_commit: bool = True
+) -> None:
+    query = select(Kehadiran).filter(Kehadiran.id == id)
+    data = (await db.execute(query)).scalar()
+    await db.delete(data)
+    if is_commit:
+        await db.commit()
+    return None
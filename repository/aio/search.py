@@ -0,0 +1,49 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal, or_, union_all
+from sqlalchemy.engine import Row
+from models.User import User
+from models.Role import Role
+from models.Shift import Shift
+from models.Kehadiran import Kehadiran
+from typing import List
+
+SEARCH_USER = "user"
+SEARCH_JABATAN = "jabatan"
+SEARCH_SHIFT = "shift"
+SEARCH_KEHADIRAN = "kehadiran"
+
+
+def _match(type: str, id, label, q: str, *columns):
+    """
+    rows of one table matching q in any of columns. ILIKE is served by the
+    gin_trgm_ops indexes, word_similarity rank the matches
+    """
+    score = func.greatest(*[func.word_similarity(q, column) for column in columns])
+    return select(
+        literal(type).label("type"),
+        id.label("id"),
+        label.label("label"),
+        score.label("score"),
+    ).filter(or_(*[column.icontains(q, autoescape=True) for column in columns]))
+
+
+def search_statement(q: str, limit: int = 10):
+    matches = union_all(
+        _match(SEARCH_USER, User.id, User.nama, q, User.nama, User.email),
+        _match(SEARCH_JABATAN, Role.id, Role.jabatan, q, Role.jabatan),
+        _match(SEARCH_SHIFT, Shift.id, Shift.nama_shift, q, Shift.nama_shift),
+        _match(SEARCH_KEHADIRAN, Kehadiran.id, Kehadiran.nama_kehadiran, q, Kehadiran.nama_kehadiran),
+    ).subquery()
+    return (
+        select(matches)
+        .order_by(matches.c.score.desc(), matches.c.label.asc())
+        .limit(limit)
+    )
+
+
+async def search(db: AsyncSession, q: str, limit: int = 10) -> List[Row]:
+    """
+    ranked matches across user (nama, email), jabatan, shift and kehadiran,
+    one statement for all tables
+    """
+    return (await db.execute(search_statement(q, limit))).all()
@@ -0,0 +1,138 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, insert, delete as sql_delete
+from models.Shift import Shift
+from models.User import user_shift, User
+from common.security import invalidate_principals
+from common.pagination import CountMode, paginate
+from typing import Optional, List, Tuple
+from datetime import datetime
+
+async def list_paginate(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    nama_shift: Optional[str] = None,
+    jam_mulai: Optional[str] = None,
+    jam_akhir: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[Shift], Optional[int], Optional[int]]:
+    stmt = select(Shift)
+    if nama_shift is not None:
+        stmt = stmt.filter(Shift.nama_shift.ilike(f"%{nama_shift}%"))
+    if jam_mulai and jam_akhir is not None:
+        jam_mulai = datetime.strptime(jam_mulai, "%H:%M:%S").time()
+        jam_akhir = datetime.strptime(jam_akhir, "%H:%M:%S").time()
+        stmt = stmt.filter(
+            and_(
+                Shift.jam_mulai >= jam_mulai,
+                Shift.jam_akhir <= jam_akhir,
+            )
+        )
+
+    stmt = stmt.order_by(Shift.id.asc())
+    return await paginate(db, stmt, page, page_size, count)
+
+def get_shift_by_user(
+    db: AsyncSession,
+    user: User
+):
+    """
+    user must be loaded with userShift (get_current_user does it)
+    """
+    shifts = user.userShift if user else []
+    return shifts
+
+async def get_by_id(
+    db: AsyncSession,
+    id: int,
+) -> Shift:
+    query = (
+        select(Shift)
+        .options(selectinload(Shift.shiftUser).joinedload(User.userRole))
+        .filter(Shift.id == id)
+    )
+    result = (await db.execute(query)).scalar()
+    return result
+
+async def create(
+    db: AsyncSession,
+    nama_shift: str,
+    jam_mulai: str,
+    jam_akhir: str,
+    is_commit: bool = True
+) -> Shift:
+    new_data = Shift(
+        nama_shift=nama_shift,
+        jam_mulai=datetime.strptime(jam_mulai, "%H:%M:%S").time(),
+        jam_akhir=datetime.strptime(jam_akhir, "%H:%M:%S").time()
+    )
+    db.add(new_data)
+    if is_commit:
+        await db.commit()
+    return new_data
+
+async def update(
+    db: AsyncSession,
+    id: int,
+    nama_shift: str,
+    jam_mulai: str,
+    jam_akhir: str,
+    is_commit: bool = True
+) -> Shift:
+    query = select(Shift).filter(Shift.id == id)
+    data = (await db.execute(query)).scalar()
+    data.nama_shift = nama_shift
+    data.jam_mulai = datetime.strptime(jam_mulai, "%H:%M:%S").time()
+    data.jam_akhir = datetime.strptime(jam_akhir, "%H:%M:%S").time()
+    db.add(data)
+    if is_commit:
+        await db.commit()
+    return data
+
+async def delete(
+    db: AsyncSession,
+    id: int,
+    is_commit: bool = True
+) -> None:
+    query = select(Shift).options(selectinload(Shift.shiftUser)).filter(Shift.id == id)
+    data = (await db.execute(query)).scalar()
+    user_ids = [val.id for val in data.shiftUser]
+    await db.delete(data)
+    if is_commit:
+        await db.commit()
+    invalidate_principals(db, user_ids)
+    return None
+
+async def assign_shift_user(
+    db: AsyncSession,
+    id: int,
+    users: list[int],
+    is_commit: bool = True
+):
+    stmt = (
+        sql_delete(user_shift)
+        .where(user_shift.c.shift_id == id)
+        .returning(user_shift.c.user_id)
+    )
+    changed_users = set((await db.execute(stmt)).scalars().all()) | set(users)
+
+    if users != []:
+        # user_shift primary key is (user_id, shift_id), drop repeated ids
+        mapping = [{"user_id": val, "shift_id": id} for val in dict.fromkeys(users)]
+        stmt = insert(user_shift).values(mapping)
+        await db.execute(stmt)
+
+    # populate_existing, shiftUser of an already loaded Shift is stale after the core statements
+    query = (
+        select(Shift)
+        .options(selectinload(Shift.shiftUser).joinedload(User.userRole))
+        .filter(Shift.id == id)
+        .execution_options(populate_existing=True)
+    )
+    data = (await db.execute(query)).scalar()
+
+    if is_commit:
+        await db.commit()
+    invalidate_principals(db, changed_users)
+    return data
@@ -0,0 +1,120 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from models.User import User
+from models.Role import Role
+from sqlalchemy import select
+from typing import Iterable, List, Optional, Set, Tuple
+from common.security import generate_hash_password_async, invalidate_principals
+from common.pagination import CountMode, paginate
+from repository.user import EmailAlreadyExists, bulk_create_users_statement  # NoQA
+
+
+async def list_users(
+    db: AsyncSession,
+    page: int = 1,
+    page_size: int = 10,
+    nama: Optional[str] = None,
+    email: Optional[str] = None,
+    jabatan: Optional[int] = None,
+    count: CountMode = CountMode.exact,
+) -> Tuple[List[User], Optional[int], Optional[int]]:
+    stmt = select(User).options(joinedload(User.userRole))
+    if nama is not None:
+        stmt = stmt.filter(User.nama.ilike(f"%{nama}%"))
+    if email is not None:
+        stmt = stmt.filter(User.email.ilike(f"%{email}%"))
+    if jabatan is not None:
+        stmt = stmt.filter(User.role_id == jabatan)
+    stmt = stmt.order_by(User.id.asc())
+    return await paginate(db, stmt, page, page_size, count)
+
+
+async def get_user_by_id(db: AsyncSession, id: int) -> User:
+    query = select(User).options(joinedload(User.userRole, innerjoin=True)).filter(User.id == id)
+    return (await db.execute(query)).scalar()
+
+
+async def create_user(
+    db: AsyncSession,
+    nama: str,
+    email: str,
+    password: str,
+    jabatan: int,
+    is_commit: bool = True,
+    is_hashed: bool = False,
+) -> User:
+    stmt = (
+        pg_insert(User)
+        .values(
+            nama=nama,
+            email=email,
+            password=password if is_hashed else await generate_hash_password_async(password),
+            role_id=jabatan,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    new_user = (await db.execute(stmt)).scalar()
+    if new_user is None:
+        raise EmailAlreadyExists(email)
+    await db.refresh(new_user, attribute_names=["userRole"])
+    if is_commit:
+        await db.commit()
+    return new_user
+
+
+async def update_user(
+    db: AsyncSession, id: int, nama: str, email: str, jabatan: int, is_commit: bool = True
+) -> User:
+    query = select(User).filter(User.id == id)
+    data = (await db.execute(query)).scalar()
+    data.nama = nama
+    data.email = email
+    data.role_id = jabatan
+    db.add(data)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise EmailAlreadyExists(email)
+    await db.refresh(data, attribute_names=["userRole"])
+    if is_commit:
+        await db.commit()
+    invalidate_principals(db, [id])
+    return data
+
+
+async def delete_user(db: AsyncSession, id: int, is_commit: bool = True) -> None:
+    query = select(User).options(selectinload(User.userShift)).filter(User.id == id)
+    data = (await db.execute(query)).scalar()
+    await db.delete(data)
+    if is_commit:
+        await db.commit()
+    invalidate_principals(db, [id])
+    return None
+
+
+async def get_existing_emails(db: AsyncSession, emails: Iterable[str]) -> Set[str]:
+    query = select(User.email).filter(User.email.in_(list(emails)))
+    return set((await db.execute(query)).scalars().all())
+
+
+async def get_existing_role_ids(db: AsyncSession, role_ids: Iterable[int]) -> Set[int]:
+    query = select(Role.id).filter(Role.id.in_(list(role_ids)))
+    return set((await db.execute(query)).scalars().all())
+
+
+async def bulk_create_users(
+    db: AsyncSession, users: List[dict], is_commit: bool = True
+) -> List[str]:
+    """
+    see bulk_create_users_statement, return email of inserted rows
+    """
+    if users == []:
+        return []
+    emails = (await db.execute(bulk_create_users_statement(users))).scalars().all()
+    if is_commit:
+        await db.commit()
+    return emails
@@ -1,15 +1,38 @@
-from typing import Optional
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from common.security import validated_user_password, generate_hash_password
+from sqlalchemy import select, update
+from common.security import (
+    validated_user_password,
+    generate_hash_password,
+    password_needs_rehash,
+    generate_refresh_token,
+    hash_refresh_token,
+    invalidate_principals,
+)
 from models.User import User
+from models.RefreshToken import RefreshToken
+from settings import REFRESH_TOKEN_EXPIRE_DAYS
 
 
-def check_user_password(db: Session, email: str, password: str) -> bool:
+def check_user_password(
+    db: Session, email: str, password: str, is_commit: bool = True
+) -> bool:
+    """
+    on success, password hashed with other cost than BCRYPT_ROUNDS is rehashed
+    so changing BCRYPT_ROUNDS does not need mass password reset.
+    Hash in the calling thread, routes use repository.aio.auth
+    """
     user = get_user_by_email(db=db, email=email)
     if user is None:
         return False
-    return validated_user_password(user.password, password)
+    is_valid = validated_user_password(user.password, password)
+    if is_valid and password_needs_rehash(user.password):
+        user.password = generate_hash_password(password)
+        db.add(user)
+        if is_commit:
+            db.commit()
+    return is_valid
 
 
 def check_old_password(user: User, old_password: str) -> None:
@@ -23,8 +46,10 @@ def change_user_password(
 ) -> None:
     user.password = generate_hash_password(new_password)
     db.add(user)
+    revoke_refresh_tokens(db=db, user_id=user.id, is_commit=False)
     if is_commit:
         db.commit()
+    invalidate_principals(db, [user.id])
     return user
 
 
@@ -39,6 +64,82 @@ def change_passowrd(
 ) -> None:
     user.password = generate_hash_password(password=new_password)
     db.add(user)
+    revoke_refresh_tokens(db=db, user_id=user.id, is_commit=False)
     if is_commit:
         db.commit()
+    invalidate_principals(db, [user.id])
     return user
+
+
+def create_refresh_token(db: Session, user_id: int, is_commit: bool = True) -> str:
+    """
+    store sha256 of a new refresh token, return the plain token for the client
+    """
+    token = generate_refresh_token()
+    now = datetime.now()
+    db.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=hash_refresh_token(token),
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            created_at=now,
+        )
+    )
+    if is_commit:
+        db.commit()
+    return token
+
+
+def rotate_refresh_token(
+    db: Session, refresh_token: str, is_commit: bool = True
+) -> Optional[Tuple[User, str]]:
+    """
+    revoke refresh_token and issue a new one in the same transaction.
+    return (user, new refresh token) or None when token is unknown, expired or revoked.
+    Reusing a revoked token revoke every refresh token of that user
+    """
+    now = datetime.now()
+    token_hash = hash_refresh_token(refresh_token)
+    stmt = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at == None,  # NOQA
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id)
+    )
+    user_id = db.execute(stmt).scalar()
+    if user_id is None:
+        reused = db.execute(
+            select(RefreshToken.user_id).filter(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at != None,  # NOQA
+            )
+        ).scalar()
+        if reused is not None:
+            revoke_refresh_tokens(db=db, user_id=reused, is_commit=False)
+        if is_commit:
+            db.commit()
+        return None
+    user = db.get(User, user_id)
+    new_token = create_refresh_token(db=db, user_id=user_id, is_commit=False)
+    if is_commit:
+        db.commit()
+    return user, new_token
+
+
+def revoke_refresh_tokens(db: Session, user_id: int, is_commit: bool = True) -> None:
+    stmt = (
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at == None,  # NOQA
+        )
+        .values(revoked_at=datetime.now())
+    )
+    db.execute(stmt)
+    if is_commit:
+        db.commit()
+    return None
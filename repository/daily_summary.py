@@ -0,0 +1,196 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import select, delete, func, cast, literal_column, text, true, Date, Time, Integer
+from models.Absensi import Absensi
+from models.AbsensiDailySummary import AbsensiDailySummary
+from models.Shift import Shift
+from models.User import User, user_shift
+from datetime import date, time
+from typing import Optional, Union
+
+# absensi_daily_summary is kept in step with absensi by create_masuk, update_exit
+# and forced_absen_gt_today, in the same transaction as the absensi row.
+# Grain is (tanggal_absen, role_id, shift_id): the admin dashboard read
+# O(days x roles x shifts) rows, a per user grain would be as large as absensi
+# itself for daily check-in
+SUMMARY_KEY = ["tanggal_absen", "role_id", "shift_id"]
+SUMMARY_COLUMNS = SUMMARY_KEY + ["check_ins", "check_outs", "late_count"]
+
+
+def first_shift_subquery(user_id=None):
+    """
+    shift with the earliest jam_mulai of every user, a check-in after it is late.
+    Users without shift are never late and have no shift_id.
+    user_id: column of the outer query, return a LATERAL lookup of that user only
+    (one index scan on user_shift) instead of the shifts of every user
+    """
+    stmt = select(
+        user_shift.c.user_id,
+        Shift.id.label("shift_id"),
+        Shift.jam_mulai.label("jam_mulai"),
+    ).join(Shift, Shift.id == user_shift.c.shift_id)
+    if user_id is not None:
+        return (
+            stmt.filter(user_shift.c.user_id == user_id)
+            .order_by(Shift.jam_mulai.asc().nulls_last(), Shift.id.asc())
+            .limit(1)
+            .lateral()
+        )
+    return (
+        stmt.distinct(user_shift.c.user_id)
+        .order_by(user_shift.c.user_id, Shift.jam_mulai.asc().nulls_last(), Shift.id.asc())
+        .subquery()
+    )
+
+
+def _upsert(select_stmt):
+    table = AbsensiDailySummary.__table__
+    stmt = pg_insert(table).from_select(SUMMARY_COLUMNS, select_stmt)
+    return stmt.on_conflict_do_update(
+        index_elements=SUMMARY_KEY,
+        set_={
+            "check_ins": table.c.check_ins + stmt.excluded.check_ins,
+            "check_outs": table.c.check_outs + stmt.excluded.check_outs,
+            "late_count": table.c.late_count + stmt.excluded.late_count,
+        },
+    )
+
+
+def check_in_from(source):
+    """
+    +1 check-in per row of source (a subquery or CTE of absensi rows with user_id,
+    tanggal_absen and jam_masuk) on the row of its day, role and first shift,
+    +1 late when jam_masuk is after that shift. Role and shifts are read by the
+    statement itself
+    """
+    first_shift = first_shift_subquery(source.c.user_id)
+    return _upsert(
+        select(
+            source.c.tanggal_absen,
+            User.role_id,
+            first_shift.c.shift_id,
+            func.count(),
+            literal_column("0"),
+            func.count().filter(source.c.jam_masuk > first_shift.c.jam_mulai),
+        )
+        .select_from(source)
+        .outerjoin(User, User.id == source.c.user_id)
+        .outerjoin(first_shift, true())
+        .group_by(source.c.tanggal_absen, User.role_id, first_shift.c.shift_id)
+    )
+
+
+def check_out_from(source):
+    """
+    +1 check-out per row of source (absensi rows with user_id and tanggal_absen)
+    """
+    first_shift = first_shift_subquery(source.c.user_id)
+    return _upsert(
+        select(
+            source.c.tanggal_absen,
+            User.role_id,
+            first_shift.c.shift_id,
+            literal_column("0"),
+            func.count(),
+            literal_column("0"),
+        )
+        .select_from(source)
+        .outerjoin(User, User.id == source.c.user_id)
+        .outerjoin(first_shift, true())
+        .group_by(source.c.tanggal_absen, User.role_id, first_shift.c.shift_id)
+    )
+
+
+def _one_row(user_id: int, tanggal_absen: date, jam_masuk: Union[time, str, None] = None):
+    return select(
+        cast(user_id, Integer).label("user_id"),
+        cast(tanggal_absen, Date).label("tanggal_absen"),
+        cast(jam_masuk, Time).label("jam_masuk"),
+    ).subquery()
+
+
+def check_in_statement(user_id: int, tanggal_absen: date, jam_masuk: Union[time, str]):
+    return check_in_from(_one_row(user_id, tanggal_absen, jam_masuk))
+
+
+def check_out_statement(user_id: int, tanggal_absen: date):
+    return check_out_from(_one_row(user_id, tanggal_absen))
+
+
+def rebuild_statements(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    statements recomputing the summary of start_date..end_date (inclusive, None is
+    unbounded) from absensi, run in this order in one transaction
+    """
+    summary_range = []
+    absensi_range = []
+    if start_date is not None:
+        summary_range.append(AbsensiDailySummary.tanggal_absen >= start_date)
+        absensi_range.append(Absensi.tanggal_absen >= start_date)
+    if end_date is not None:
+        summary_range.append(AbsensiDailySummary.tanggal_absen <= end_date)
+        absensi_range.append(Absensi.tanggal_absen <= end_date)
+
+    first_shift = first_shift_subquery()
+    grouped = (
+        select(
+            Absensi.tanggal_absen,
+            User.role_id,
+            first_shift.c.shift_id,
+            func.count(Absensi.id),
+            func.count(Absensi.jam_keluar),
+            func.count(Absensi.id).filter(Absensi.jam_masuk > first_shift.c.jam_mulai),
+        )
+        .select_from(Absensi)
+        .outerjoin(User, User.id == Absensi.user_id)
+        .outerjoin(first_shift, first_shift.c.user_id == Absensi.user_id)
+        .filter(*absensi_range)
+        .group_by(Absensi.tanggal_absen, User.role_id, first_shift.c.shift_id)
+    )
+    return [
+        # check-in/out of other transactions wait for the rebuild instead of
+        # incrementing a row that is being replaced, readers are not blocked
+        text("LOCK TABLE absensi_daily_summary IN EXCLUSIVE MODE"),
+        delete(AbsensiDailySummary).filter(*summary_range),
+        pg_insert(AbsensiDailySummary.__table__).from_select(SUMMARY_COLUMNS, grouped),
+    ]
+
+
+def record_check_in(
+    db: Session,
+    user_id: int,
+    tanggal_absen: date,
+    jam_masuk: Union[time, str],
+    is_commit: bool = True,
+) -> None:
+    db.execute(check_in_statement(user_id, tanggal_absen, jam_masuk))
+    if is_commit:
+        db.commit()
+
+
+def record_check_out(
+    db: Session,
+    user_id: int,
+    tanggal_absen: date,
+    is_commit: bool = True,
+) -> None:
+    db.execute(check_out_statement(user_id, tanggal_absen))
+    if is_commit:
+        db.commit()
+
+
+def rebuild_daily_summary(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    is_commit: bool = True,
+) -> int:
+    """
+    recompute the summary from absensi, return the number of summary rows written
+    """
+    result = None
+    for stmt in rebuild_statements(start_date, end_date):
+        result = db.execute(stmt)
+    if is_commit:
+        db.commit()
+    return result.rowcount
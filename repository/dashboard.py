@@ -1,21 +1,28 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, tuple_
 from models.Absensi import Absensi
+from models.AbsensiDailySummary import AbsensiDailySummary
+from models.Role import Role
+from models.Shift import Shift
 from models.User import User
-from datetime import datetime
+from common.security import Principal
+from repository.daily_summary import first_shift_subquery
+from typing import Union
+from datetime import date, datetime, timedelta
 
 def count_day_admin(
     db: Session,
     start_date: str,
     end_date: str,
 ) -> int:
-    stmt_count = select(func.count(Absensi.id))
+    # absensi_daily_summary, O(days x roles) rows instead of O(attendances)
+    stmt_count = select(func.coalesce(func.sum(AbsensiDailySummary.check_ins), 0))
     start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
     stmt_count = stmt_count.filter(
         and_(
-            Absensi.tanggal_absen >= start_date,
-            Absensi.tanggal_absen <= end_date,
+            AbsensiDailySummary.tanggal_absen >= start_date,
+            AbsensiDailySummary.tanggal_absen <= end_date,
         )
     )
     num_data = db.execute(stmt_count).scalar()
@@ -23,11 +30,11 @@ def count_day_admin(
 
 def count_day_user(
     db: Session,
-    user: User,
+    user: Union[User, Principal],
     start_date: str,
     end_date: str,
 ) -> int:
-    stmt_count = select(func.count(Absensi.id)).filter(Absensi.absen_user == user)
+    stmt_count = select(func.count(Absensi.id)).filter(Absensi.user_id == user.id)
     start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
     stmt_count = stmt_count.filter(
@@ -44,26 +51,34 @@ def volume_by_month_admin(
     start_date: str,
     end_date: str,
 ):
-    stmt = select(Absensi.tanggal_absen, func.count(Absensi.id))
+    stmt = select(
+        AbsensiDailySummary.tanggal_absen,
+        func.sum(AbsensiDailySummary.check_ins).label("total"),
+    )
     start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
     stmt = stmt.filter(
         and_(
-            Absensi.tanggal_absen >= start_date,
-            Absensi.tanggal_absen <= end_date,
+            AbsensiDailySummary.tanggal_absen >= start_date,
+            AbsensiDailySummary.tanggal_absen <= end_date,
         )
     )
-    stmt = stmt.group_by(Absensi.tanggal_absen).order_by(Absensi.tanggal_absen.asc())
+    stmt = stmt.group_by(AbsensiDailySummary.tanggal_absen).order_by(
+        AbsensiDailySummary.tanggal_absen.asc()
+    )
     data = db.execute(stmt).all()
     return data
 
 def volume_by_month_user(
     db: Session,
-    user: User,
+    user: Union[User, Principal],
     start_date: str,
     end_date: str,
 ):
-    stmt = select(Absensi.tanggal_absen, func.count(Absensi.id)).filter(Absensi.absen_user == user)
+    # O(days) through ix_absensi_user_id_tanggal_absen_id, the summary has no user grain
+    stmt = select(
+        Absensi.tanggal_absen, func.count(Absensi.id).label("total")
+    ).filter(Absensi.user_id == user.id)
     start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
     stmt = stmt.filter(
@@ -74,4 +89,133 @@ def volume_by_month_user(
     )
     stmt = stmt.group_by(Absensi.tanggal_absen).order_by(Absensi.tanggal_absen.asc())
     data = db.execute(stmt).all()
-    return data
\ No newline at end of file
+    return data
+
+def summary_admin_statement(start_date: date, end_date: date):
+    """
+    total, per day, per role and per shift counts of the range in one pass over
+    absensi_daily_summary. grouping(column) is 0 on the rows grouped by that column
+    """
+    summary = AbsensiDailySummary
+    stmt = (
+        select(
+            summary.tanggal_absen,
+            summary.role_id,
+            Role.jabatan.label("nama_role"),
+            summary.shift_id,
+            Shift.nama_shift,
+            func.grouping(summary.tanggal_absen).label("g_day"),
+            func.grouping(summary.role_id).label("g_role"),
+            func.grouping(summary.shift_id).label("g_shift"),
+            func.sum(summary.check_ins).label("check_ins"),
+            func.sum(summary.check_outs).label("check_outs"),
+            func.sum(summary.late_count).label("late_count"),
+        )
+        .select_from(summary)
+        .outerjoin(Role, Role.id == summary.role_id)
+        .outerjoin(Shift, Shift.id == summary.shift_id)
+        .filter(
+            and_(
+                summary.tanggal_absen >= start_date,
+                summary.tanggal_absen <= end_date,
+            )
+        )
+        .group_by(
+            func.grouping_sets(
+                tuple_(summary.tanggal_absen),
+                tuple_(summary.role_id, Role.jabatan),
+                tuple_(summary.shift_id, Shift.nama_shift),
+                tuple_(),
+            )
+        )
+    )
+    return stmt
+
+def summary_user_statement(user_id: int, start_date: date, end_date: date):
+    """
+    total and per day counts of the range for one user in one pass over its
+    absensi rows (ix_absensi_user_id_tanggal_absen_id)
+    """
+    first_shift = first_shift_subquery()
+    stmt = (
+        select(
+            Absensi.tanggal_absen,
+            func.grouping(Absensi.tanggal_absen).label("g_day"),
+            func.count(Absensi.id).label("check_ins"),
+            func.count(Absensi.jam_keluar).label("check_outs"),
+            func.count(Absensi.id)
+            .filter(Absensi.jam_masuk > first_shift.c.jam_mulai)
+            .label("late_count"),
+        )
+        .select_from(Absensi)
+        .outerjoin(first_shift, first_shift.c.user_id == Absensi.user_id)
+        .filter(
+            and_(
+                Absensi.user_id == user_id,
+                Absensi.tanggal_absen >= start_date,
+                Absensi.tanggal_absen <= end_date,
+            )
+        )
+        .group_by(func.grouping_sets(tuple_(Absensi.tanggal_absen), tuple_()))
+    )
+    return stmt
+
+def summary_from_rows(rows, start_date: date, end_date: date, breakdown: bool) -> dict:
+    """
+    response of /dashboard/*/summary, the series has every day of the range,
+    days without absensi are 0
+    """
+    def counts(row) -> dict:
+        return {
+            "check_ins": int(row.check_ins or 0),
+            "check_outs": int(row.check_outs or 0),
+            "late_count": int(row.late_count or 0),
+        }
+
+    empty = {"check_ins": 0, "check_outs": 0, "late_count": 0}
+    total = dict(empty)
+    series = {}
+    by_role = []
+    by_shift = []
+    for row in rows:
+        if row.g_day == 0:
+            series[row.tanggal_absen] = counts(row)
+        elif breakdown and row.g_role == 0:
+            by_role.append({"role_id": row.role_id, "nama_role": row.nama_role, **counts(row)})
+        elif breakdown and row.g_shift == 0:
+            by_shift.append({"shift_id": row.shift_id, "nama_shift": row.nama_shift, **counts(row)})
+        else:
+            total = counts(row)
+    days = (end_date - start_date).days + 1
+    result = {
+        "total": total,
+        "series": [
+            {"tanggal_absen": str(day), **series.get(day, empty)}
+            for day in (start_date + timedelta(days=n) for n in range(max(days, 0)))
+        ],
+    }
+    if breakdown:
+        result["by_role"] = sorted(by_role, key=lambda val: -val["check_ins"])
+        result["by_shift"] = sorted(by_shift, key=lambda val: -val["check_ins"])
+    return result
+
+def summary_admin(
+    db: Session,
+    start_date: str,
+    end_date: str,
+) -> dict:
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    rows = db.execute(summary_admin_statement(start_date, end_date)).all()
+    return summary_from_rows(rows, start_date, end_date, breakdown=True)
+
+def summary_user(
+    db: Session,
+    user: Union[User, Principal],
+    start_date: str,
+    end_date: str,
+) -> dict:
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    rows = db.execute(summary_user_statement(user.id, start_date, end_date)).all()
+    return summary_from_rows(rows, start_date, end_date, breakdown=False)
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import select, update, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.IdempotencyKey import IdempotencyKey
+
+# status_code of a key reserved by a request that is still running
+PENDING_STATUS = 0
+
+
+def get_statement(user_id: int, key: str, now: datetime):
+    return select(
+        IdempotencyKey.fingerprint,
+        IdempotencyKey.status_code,
+        IdempotencyKey.response,
+        IdempotencyKey.expires_at,
+    ).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at > now,
+    )
+
+
+def reserve_statement(
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    now: datetime,
+    expires_at: datetime,
+):
+    """
+    pending row of the key, RETURNING a row only for the request that got it.
+    The first request wins, an expired row of the same key (also the pending row
+    of a crashed worker) is replaced
+    """
+    stmt = pg_insert(IdempotencyKey).values(
+        user_id=user_id,
+        key=key,
+        fingerprint=fingerprint,
+        status_code=PENDING_STATUS,
+        response=None,
+        created_at=now,
+        expires_at=expires_at,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "key"],
+        set_={
+            "fingerprint": stmt.excluded.fingerprint,
+            "status_code": stmt.excluded.status_code,
+            "response": stmt.excluded.response,
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at <= now,
+    ).returning(IdempotencyKey.key)
+
+
+def complete_statement(
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    status_code: int,
+    response: Optional[Any],
+    expires_at: datetime,
+):
+    """
+    store the response on the pending row reserved by reserve_statement
+    """
+    return (
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.fingerprint == fingerprint,
+            IdempotencyKey.status_code == PENDING_STATUS,
+        )
+        .values(status_code=status_code, response=response, expires_at=expires_at)
+    )
+
+
+def release_statement(user_id: int, key: str, fingerprint: str):
+    """
+    drop the pending row of a request that failed, a retry run it again
+    """
+    return delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.fingerprint == fingerprint,
+        IdempotencyKey.status_code == PENDING_STATUS,
+    )
+
+
+def purge_expired(db: Session, now: Optional[datetime] = None, is_commit: bool = True) -> int:
+    """
+    delete the expired idempotency keys, return the number of deleted rows
+    """
+    result = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.now()))
+    )
+    if is_commit:
+        db.commit()
+    return result.rowcount
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select, func, and_, insert, delete as sql_delete
 from models.Shift import Shift
 from models.User import user_shift, User
+from common.security import invalidate_principals
 from typing import Optional, List, Tuple
 from datetime import datetime
 from math import ceil
@@ -97,9 +98,11 @@ def delete(
     is_commit: bool = True
 ) -> None:
     query = db.query(Shift).filter(Shift.id == id).first()
+    user_ids = [val.id for val in query.shiftUser]
     db.delete(query)
     if is_commit:
         db.commit()
+    invalidate_principals(db, user_ids)
     return None
 
 def assign_shift_user(
@@ -108,11 +111,16 @@ def assign_shift_user(
     users: list[int],
     is_commit: bool = True
 ):
-    stmt = sql_delete(user_shift).where(user_shift.c.shift_id == id)
-    db.execute(stmt)
+    stmt = (
+        sql_delete(user_shift)
+        .where(user_shift.c.shift_id == id)
+        .returning(user_shift.c.user_id)
+    )
+    changed_users = set(db.execute(stmt).scalars().all()) | set(users)
 
     if users != []:
-        mapping = [{"user_id": val, "shift_id": id} for val in users]
+        # user_shift primary key is (user_id, shift_id), drop repeated ids
+        mapping = [{"user_id": val, "shift_id": id} for val in dict.fromkeys(users)]
         stmt = insert(user_shift).values(mapping)
         db.execute(stmt)
 
@@ -121,4 +129,5 @@ def assign_shift_user(
 
     if is_commit:
         db.commit()
+    invalidate_principals(db, changed_users)
     return data
@@ -1,10 +1,19 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from models.User import User
 from models.Role import Role
 from sqlalchemy import select, func
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Set, Tuple
 from math import ceil
-from common.security import generate_hash_password
+from common.security import generate_hash_password, invalidate_principals
+
+
+class EmailAlreadyExists(Exception):
+    """
+    raised by create_user and update_user when email is used by other user
+    (enforced by unique index ix_user_email)
+    """
 
 
 def list_users(
@@ -47,14 +56,22 @@ def create_user(
     password: str,
     jabatan: int,
     is_commit: bool = True,
+    is_hashed: bool = False,
 ) -> User:
-    new_user = User(
-        nama=nama,
-        email=email,
-        password=generate_hash_password(password),
-        role_id=jabatan,
+    stmt = (
+        pg_insert(User)
+        .values(
+            nama=nama,
+            email=email,
+            password=password if is_hashed else generate_hash_password(password),
+            role_id=jabatan,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
     )
-    db.add(new_user)
+    new_user = db.execute(stmt).scalar()
+    if new_user is None:
+        raise EmailAlreadyExists(email)
     if is_commit:
         db.commit()
     return new_user
@@ -69,8 +86,14 @@ def update_user(
     data.email = email
     data.role_id = jabatan
     db.add(data)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise EmailAlreadyExists(email)
     if is_commit:
         db.commit()
+    invalidate_principals(db, [id])
     return data
 
 
@@ -79,4 +102,43 @@ def delete_user(db: Session, id: int, is_commit: bool = True) -> None:
     db.delete(query)
     if is_commit:
         db.commit()
+    invalidate_principals(db, [id])
     return None
+
+
+def get_existing_emails(db: Session, emails: Iterable[str]) -> Set[str]:
+    query = select(User.email).filter(User.email.in_(list(emails)))
+    return set(db.execute(query).scalars().all())
+
+
+def get_existing_role_ids(db: Session, role_ids: Iterable[int]) -> Set[int]:
+    query = select(Role.id).filter(Role.id.in_(list(role_ids)))
+    return set(db.execute(query).scalars().all())
+
+
+def bulk_create_users_statement(users: List[dict]):
+    """
+    users: list of {"nama", "email", "password" (already hashed), "role_id"},
+    inserted with one multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING email.
+    An email taken meanwhile is skipped
+    """
+    return (
+        pg_insert(User)
+        .values(users)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.email)
+    )
+
+
+def bulk_create_users(
+    db: Session, users: List[dict], is_commit: bool = True
+) -> List[str]:
+    """
+    see bulk_create_users_statement, return email of inserted rows
+    """
+    if users == []:
+        return []
+    emails = db.execute(bulk_create_users_statement(users)).scalars().all()
+    if is_commit:
+        db.commit()
+    return emails
@@ -6,6 +6,8 @@ from .shift import router as ShiftRouter
 from .kehadiran import router as KehadiranRouter
 from .absensi import router as AbsensiRouter
 from .dashboard import router as DashboardRouter
+from .metrics import router as MetricsRouter
+from .search import router as SearchRouter
 
 routers = APIRouter()
 routers.include_router(AuthRouter)
@@ -15,3 +17,5 @@ routers.include_router(JabatanRouter)
 routers.include_router(ShiftRouter)
 routers.include_router(KehadiranRouter)
 routers.include_router(AbsensiRouter)
+routers.include_router(MetricsRouter)
+routers.include_router(SearchRouter)
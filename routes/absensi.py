@@ -1,23 +1,32 @@
 from typing import Optional
 from datetime import datetime, timedelta
-from math import radians, sin, cos, asin, sqrt
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from models import get_db_sync
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Header
+from common.security import (
+    Principal,
+    get_current_user,
+    get_current_principal,
+)
+from models import get_db_async
+from common.pagination import CountMode, InvalidCursor
+from common.geo import haversine
+from common.idempotency import IDEMPOTENCY_HEADER, idempotent_response, request_fingerprint
+from common.checkin_buffer import CheckInBufferFull, checkin_buffer
 from models.User import User
 from models.Shift import Shift
-from repository import (
+from repository.aio import (
     absensi as absensi_repo,
     shift as shift_repo
 )
 from common.responses import (
     common_response,
     Ok,
+    Accepted,
     BadRequest,
     NotFound,
+    Conflict,
     InternalServerError,
-    Unauthorized
+    ServiceUnavailable,
 )
 from schemas.absensi import (
     CheckKoordinatRequest,
@@ -26,26 +35,37 @@ from schemas.absensi import (
     PaginateAbsensiUserResponse,
     CreateAbsensiMasukRequest,
     CreateAbsensiMasukResponse,
+    BufferedAbsensiMasukResponse,
     CreateAbsensiKeluarRequest,
     CreateAbsensiKeluarResponse,
+    SyncAbsensiRequest,
+    SyncAbsensiResponse,
     CheckShift
 )
 from schemas.common import (
     BadRequestResponse,
     UnauthorizedResponse,
     ForbiddenResponse,
-    InternalServerErrorResponse
+    NotFoundResponse,
+    ConflictResponse,
+    InternalServerErrorResponse,
+    ServiceUnavailableResponse,
 )
 from settings import (
     LONG_OF_CENTER,
     LAT_OF_CENTER,
     CHECK_KILOMETER_RADIUS,
     MIN_MINUTE_ABSEN_IN,
-    MAX_MINUTE_ABSEN_IN
+    MAX_MINUTE_ABSEN_IN,
+    SYNC_MAX_EVENTS,
+    CHECKIN_BUFFER_ENABLED,
 )
 
 router = APIRouter(prefix="/absensi", tags=["Absensi"])
-MSG_UNAUTHORIZED="Invalid/Expire Credentials"
+MSG_INVALID_CURSOR = "Invalid cursor"
+MSG_NOT_CHECKED_OUT = "Anda belum melakukan Check-Out!"
+MSG_CHECKIN_BUFFER_FULL = "Terlalu banyak check-in yang sedang diproses, silakan coba lagi"
+MSG_CHECKIN_BUFFER_PENDING = "Check-in anda masih diproses, silakan coba lagi"
 
 @router.get(
     "/",
@@ -64,23 +84,34 @@ async def laporan_absensi_by_user(
     jam_keluar: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
+    """
+    page mode (page, page_size) or keyset mode when cursor is sent: empty cursor for
+    the first page then next_cursor of the previous response. Keyset mode skip the
+    total count so count, page_count and page are null.
+    count: exact, estimate (planner estimate, for big reports) or none (count and
+    page_count are null) in page mode
+    """
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = absensi_repo.paginate_list_only_user(
-            user=user,
-            db=db,
-            page=page,
-            page_size=page_size,
+        filters = dict(
             start_date=start_date,
             end_date=end_date,
             jam_masuk=jam_masuk,
             jam_keluar=jam_keluar
         )
+        if cursor is not None:
+            (data, next_cursor) = await absensi_repo.cursor_list_only_user(
+                user=user, db=db, cursor=cursor, page_size=page_size, **filters
+            )
+            (num_data, num_page, page) = (None, None, None)
+        else:
+            (data, num_data, num_page, next_cursor) = await absensi_repo.paginate_list_only_user(
+                user=user, db=db, page=page, page_size=page_size, count=count, **filters
+            )
         return common_response(
             Ok(
                 data={
@@ -88,6 +119,7 @@ async def laporan_absensi_by_user(
                     "page_count": num_page,
                     "page_size": page_size,
                     "page": page,
+                    "next_cursor": next_cursor,
                     "results": [
                         {
                             "id": val.id,
@@ -114,6 +146,8 @@ async def laporan_absensi_by_user(
                 }
             )
         )
+    except InvalidCursor:
+        return common_response(BadRequest(message=MSG_INVALID_CURSOR))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -137,23 +171,35 @@ async def laporan_absensi_only_admin(
     user_name: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.exact,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
+    """
+    page mode (page, page_size) or keyset mode when cursor is sent: empty cursor for
+    the first page then next_cursor of the previous response. Keyset mode skip the
+    total count so count, page_count and page are null.
+    count: exact, estimate (planner estimate, for big reports) or none (count and
+    page_count are null) in page mode
+    """
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = absensi_repo.paginate_list_admin(
-            db=db,
-            page=page,
-            page_size=page_size,
+        filters = dict(
             start_date=start_date,
             end_date=end_date,
             user_name=user_name,
             jam_masuk=jam_masuk,
             jam_keluar=jam_keluar
         )
+        if cursor is not None:
+            (data, next_cursor) = await absensi_repo.cursor_list_admin(
+                db=db, cursor=cursor, page_size=page_size, **filters
+            )
+            (num_data, num_page, page) = (None, None, None)
+        else:
+            (data, num_data, num_page, next_cursor) = await absensi_repo.paginate_list_admin(
+                db=db, page=page, page_size=page_size, count=count, **filters
+            )
         return common_response(
             Ok(
                 data={
@@ -161,6 +207,7 @@ async def laporan_absensi_only_admin(
                     "page_count": num_page,
                     "page_size": page_size,
                     "page": page,
+                    "next_cursor": next_cursor,
                     "results": [
                         {
                             "id": val.id,
@@ -191,6 +238,8 @@ async def laporan_absensi_only_admin(
                 }
             )
         )
+    except InvalidCursor:
+        return common_response(BadRequest(message=MSG_INVALID_CURSOR))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -207,15 +256,12 @@ async def laporan_absensi_only_admin(
     }
 )
 async def detail_absen(
-    id: str,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    id: int,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = absensi_repo.get_by_id(db, id)
+        data = await absensi_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
         return common_response(
@@ -258,73 +304,83 @@ async def detail_absen(
     "/masuk",
     responses={
         "200": {"model": CreateAbsensiMasukResponse},
+        "202": {"model": BufferedAbsensiMasukResponse},
         "400": {"model": BadRequestResponse},
         "401": {"model": UnauthorizedResponse},
         "403": {"model": ForbiddenResponse},
+        "409": {"model": ConflictResponse},
         "500": {"model": InternalServerErrorResponse},
+        "503": {"model": ServiceUnavailableResponse},
     }
 )
 async def absen_masuk(
     req: CreateAbsensiMasukRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ):
-    try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-
-        check_tanggal_checkout = absensi_repo.get_date_gt_today(db=db, user=user)
-        if check_tanggal_checkout is not None:
-            absensi_repo.forced_absen_gt_today(db=db, id=check_tanggal_checkout.id)
-            return common_response(BadRequest(custom_response={"message": "Maaf, Absensi anda lebih dari sehari. Harap ulang check-in anda lagi!"}))
-
-        check_jam_keluar = absensi_repo.get_absen_without_jam_keluar(db=db, user=user)
-        if check_jam_keluar is not None:
-            return common_response(BadRequest(custom_response={"message": "Anda belum melakukan Check-Out!"}))
-
-        # jam_sekarang = datetime.now().time()
-        # shift, can_check_in, _ = check_shift(db=db, user=user)
+    # a retry with the same Idempotency-Key get the first response back
+    return await idempotent_response(
+        db=db,
+        user_id=user.id,
+        key=idempotency_key,
+        fingerprint=request_fingerprint("POST", "/absensi/masuk", req.model_dump()),
+        compute=lambda: _absen_masuk(req=req, db=db, user=user),
+    )
+
+def _absen_masuk_data(user: User, data: dict) -> dict:
+    # get_current_user loaded userRole and userShift, nothing is read back
+    return {
+        **data,
+        "user": {
+            "id": user.id,
+            "nama_user": user.nama,
+            "email": user.email,
+            "jabatan": {
+                "id": user.userRole.id,
+                "nama_jabatan": user.userRole.jabatan
+            } if user.userRole else None,
+            "shift": [
+                {
+                    "id": val.id,
+                    "nama_shift": val.nama_shift,
+                    "jam_mulai": str(val.jam_mulai),
+                    "jam_akhir": str(val.jam_akhir),
+                }
+                for val in user.userShift
+            ]
+            if user.userShift else []
+        },
+    }
 
-        # if not can_check_in:
-        #     return common_response(BadRequest(custom_response={"message": "Anda belum bisa Absen Masuk sekarang"}))
+async def _absen_masuk(req: CreateAbsensiMasukRequest, db: AsyncSession, user: User):
+    try:
+        if CHECKIN_BUFFER_ENABLED and checkin_buffer.running:
+            return await _buffer_absen_masuk(req=req, db=db, user=user)
 
-        data = absensi_repo.create_masuk(
+        outcome, data = await absensi_repo.absen_masuk(
             db=db,
-            keterangan=req.keterangan,
-            userId=user,
+            user=user,
             lokasi_masuk=req.lokasi_masuk,
-            # shift=shift
+            keterangan=req.keterangan,
         )
+        if outcome == absensi_repo.CHECK_IN_FORCED:
+            return common_response(BadRequest(custom_response={"message": "Maaf, Absensi anda lebih dari sehari. Harap ulang check-in anda lagi!"}))
+        if outcome == absensi_repo.CHECK_IN_OPEN:
+            return common_response(BadRequest(custom_response={"message": MSG_NOT_CHECKED_OUT}))
 
         return common_response(
             Ok(
-                data={
-                    "id": data.id,
-                    "tanggal_absen": str(data.tanggal_absen),
-                    "jam_masuk": str(data.jam_masuk),
-                    "keterangan": data.keterangan if data.keterangan is not None else data.keterangan,
-                    "lokasi_masuk": data.lokasi_masuk,
-                    "user": {
-                        "id": data.absen_user.id,
-                        "nama_user": data.absen_user.nama,
-                        "email": data.absen_user.email,
-                        "jabatan": {
-                            "id": data.absen_user.userRole.id,
-                            "nama_jabatan": data.absen_user.userRole.jabatan
-                        } if data.absen_user.userRole else None,
-                        "shift": [
-                            {
-                                "id": val.id,
-                                "nama_shift": val.nama_shift,
-                                "jam_mulai": str(val.jam_mulai),
-                                "jam_akhir": str(val.jam_akhir),
-                            }
-                            for val in data.absen_user.userShift
-                        ]
-                        if data.absen_user.userShift else []
+                data=_absen_masuk_data(
+                    user,
+                    {
+                        "id": data.id,
+                        "tanggal_absen": str(data.tanggal_absen),
+                        "jam_masuk": str(data.jam_masuk),
+                        "keterangan": data.keterangan,
+                        "lokasi_masuk": data.lokasi_masuk,
                     },
-                }
+                )
             )
         )
 
@@ -333,7 +389,47 @@ async def absen_masuk(
         traceback.print_exc()
         return common_response(InternalServerError(error=str(e)))
 
-def check_shift(db: Session, user: User):
+async def _buffer_absen_masuk(req: CreateAbsensiMasukRequest, db: AsyncSession, user: User):
+    """
+    202 once the check-in is in the write-behind buffer, the buffer write it to
+    absensi within CHECKIN_BUFFER_FLUSH_MS. An open session of today is refused
+    here like the synchronous check-in, one of the previous days is closed when
+    the check-in is written
+    """
+    tanggal_absen = datetime.today().date()
+    if checkin_buffer.is_pending(user.id) or await absensi_repo.has_open_session(
+        db=db, user=user, tanggal_absen=tanggal_absen
+    ):
+        return common_response(BadRequest(custom_response={"message": MSG_NOT_CHECKED_OUT}))
+    try:
+        entry = await checkin_buffer.submit(
+            user_id=user.id,
+            tanggal_absen=tanggal_absen,
+            jam_masuk=absensi_repo.now_time(),
+            lokasi_masuk=req.lokasi_masuk,
+            keterangan=req.keterangan,
+        )
+    except CheckInBufferFull:
+        return common_response(ServiceUnavailable(message=MSG_CHECKIN_BUFFER_FULL))
+    if entry is None:
+        return common_response(BadRequest(custom_response={"message": MSG_NOT_CHECKED_OUT}))
+    return common_response(
+        Accepted(
+            data=_absen_masuk_data(
+                user,
+                {
+                    "id": None,
+                    "event_id": entry.event_id,
+                    "tanggal_absen": str(entry.tanggal_absen),
+                    "jam_masuk": str(entry.jam_masuk),
+                    "keterangan": entry.keterangan,
+                    "lokasi_masuk": entry.lokasi_masuk,
+                },
+            )
+        )
+    )
+
+async def check_shift(db: AsyncSession, user: User):
         shift = get_active_shift(db, user)
 
         # if not shift:
@@ -345,7 +441,7 @@ def check_shift(db: Session, user: User):
         shift_end = datetime.combine(today, shift.jam_akhir)
 
         can_check_in = shift_start - timedelta(minutes=MIN_MINUTE_ABSEN_IN) <= now <= shift_start
-        data = absensi_repo.get_absen_by_user_shift(db=db, user=user, shift=shift)
+        data = await absensi_repo.get_absen_by_user_shift(db=db, user=user, shift=shift)
         can_check_out = shift_end + timedelta(minutes=MAX_MINUTE_ABSEN_IN) <= now <= shift_end and (not data or not data.jam_keluar)
         return shift, can_check_in, can_check_out
 
@@ -360,13 +456,10 @@ def check_shift(db: Session, user: User):
     }
 )
 async def check_absen_shift(
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: User = Depends(get_current_user)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
 
         """
         Endpoint untuk mengecek apakah user bisa melakukan check-in atau check-out.
@@ -382,7 +475,7 @@ async def check_absen_shift(
         shift_end = datetime.combine(today, shift.jam_akhir)
 
         can_check_in = shift_start - timedelta(minutes=MIN_MINUTE_ABSEN_IN) <= now <= shift_start
-        data = absensi_repo.get_absen_by_user_shift(db=db, user=user, shift=shift)
+        data = await absensi_repo.get_absen_by_user_shift(db=db, user=user, shift=shift)
         can_check_out = shift_end + timedelta(minutes=MAX_MINUTE_ABSEN_IN) >= now >= shift_end and (not data or not data.jam_keluar)
 
         return common_response(
@@ -405,7 +498,7 @@ async def check_absen_shift(
         return common_response(InternalServerError(error=str(e)))
 
 
-def get_active_shift(db: Session, user: User) -> Optional[Shift]:
+def get_active_shift(db: AsyncSession, user: User) -> Optional[Shift]:
     """
     Mencari shift yang sedang aktif berdasarkan waktu saat ini.
     """
@@ -436,13 +529,10 @@ def get_active_shift(db: Session, user: User) -> Optional[Shift]:
 async def check_koordinat(
     # req:
     req: CheckKoordinatRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
 
         check_radius = haversine(LONG_OF_CENTER, LAT_OF_CENTER, req.longitude, req.latitude)
         area = CHECK_KILOMETER_RADIUS # in kilometer
@@ -464,22 +554,6 @@ async def check_koordinat(
         traceback.print_exc()
         return common_response(InternalServerError(error=str(e)))
 
-def haversine(lon1, lat1, lon2, lat2):
-    """
-    Calculate the great circle distance between two points
-    on the earth (specified in decimal degrees)
-    """
-    # convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-
-    # haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371 # Radius of earth in kilometers. Use 3956 for miles
-    return c * r
-
 @router.put(
     "/keluar/{id}/",
     responses={
@@ -487,33 +561,94 @@ def haversine(lon1, lat1, lon2, lat2):
         "400": {"model": BadRequestResponse},
         "401": {"model": UnauthorizedResponse},
         "403": {"model": ForbiddenResponse},
+        "404": {"model": NotFoundResponse},
+        "409": {"model": ConflictResponse},
         "500": {"model": InternalServerErrorResponse},
     }
 )
 async def absen_keluar(
-    id: str,
+    id: int,
     req: CreateAbsensiKeluarRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+):
+    # a retry with the same Idempotency-Key get the first response back
+    return await idempotent_response(
+        db=db,
+        user_id=user.id,
+        key=idempotency_key,
+        fingerprint=request_fingerprint("PUT", f"/absensi/keluar/{id}/", req.model_dump()),
+        compute=lambda: _absen_keluar(id=id, req=req, db=db, user=user),
+    )
+
+@router.put(
+    "/keluar/event/{event_id}/",
+    responses={
+        "200": {"model": CreateAbsensiKeluarResponse},
+        "400": {"model": BadRequestResponse},
+        "401": {"model": UnauthorizedResponse},
+        "403": {"model": ForbiddenResponse},
+        "404": {"model": NotFoundResponse},
+        "409": {"model": ConflictResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def absen_keluar_by_event(
+    event_id: str,
+    req: CreateAbsensiKeluarRequest,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+):
+    """
+    Check-out dengan event_id dari jawaban 202 check-in yang di-buffer (id masih null).
+    Selama check-in belum ditulis ke database dijawab 409, coba lagi.
+    """
+    # a retry with the same Idempotency-Key get the first response back
+    return await idempotent_response(
+        db=db,
+        user_id=user.id,
+        key=idempotency_key,
+        fingerprint=request_fingerprint(
+            "PUT", f"/absensi/keluar/event/{event_id}/", req.model_dump()
+        ),
+        compute=lambda: _absen_keluar_by_event(event_id=event_id, req=req, db=db, user=user),
+    )
+
+async def _absen_keluar_by_event(
+    event_id: str, req: CreateAbsensiKeluarRequest, db: AsyncSession, user: Principal
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = absensi_repo.get_by_id(db, id)
-        if data is None:
-            return common_response(NotFound())
+        id = await absensi_repo.get_id_by_event(db=db, user=user, event_id=event_id)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+    if id is None:
+        if checkin_buffer.is_pending(user.id):
+            return common_response(Conflict(custom_response={"message": MSG_CHECKIN_BUFFER_PENDING}))
+        return common_response(NotFound())
+    return await _absen_keluar(id=id, req=req, db=db, user=user)
+
+async def _absen_keluar(id: int, req: CreateAbsensiKeluarRequest, db: AsyncSession, user: Principal):
+    try:
         # shift, _, can_check_out = check_shift(db=db, user=user)
 
         # if can_check_out:
         #     return common_response(BadRequest(custom_response={"message": "Anda belum bisa Absen Keluar sekarang"}))
 
-        data = absensi_repo.update_exit(
+        outcome, data = await absensi_repo.absen_keluar(
             db=db,
             id=id,
+            user=user,
             # shift=shift,
             lokasi_keluar=req.lokasi_keluar
         )
+        if outcome == absensi_repo.CHECK_OUT_NOT_FOUND:
+            return common_response(NotFound())
+        if outcome == absensi_repo.CHECK_OUT_CLOSED:
+            return common_response(Conflict(custom_response={"message": "Anda sudah Absen Keluar"}))
         return common_response(
             Ok(
                 data={
@@ -525,13 +660,13 @@ async def absen_keluar(
                     "lokasi_masuk": data.lokasi_masuk,
                     "lokasi_keluar": data.lokasi_keluar,
                     "user": {
-                        "id": data.absen_user.id,
-                        "nama_user": data.absen_user.nama,
-                        "email": data.absen_user.email,
+                        "id": user.id,
+                        "nama_user": user.nama,
+                        "email": user.email,
                         "jabatan": {
-                            "id": data.absen_user.userRole.id,
-                            "nama_jabatan": data.absen_user.userRole.jabatan
-                        },
+                            "id": data.role_id,
+                            "nama_jabatan": data.nama_role
+                        } if data.role_id is not None else None,
                         # "shift": [
                         #     {
                         #         "id": val.id,
@@ -552,6 +687,50 @@ async def absen_keluar(
         traceback.print_exc()
         return common_response(InternalServerError(error=str(e)))
 
+@router.post(
+    "/sync",
+    responses={
+        "200": {"model": SyncAbsensiResponse},
+        "400": {"model": BadRequestResponse},
+        "401": {"model": UnauthorizedResponse},
+        "403": {"model": ForbiddenResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def absen_sync(
+    req: SyncAbsensiRequest,
+    db: AsyncSession = Depends(get_db_async),
+    user: User = Depends(get_current_user)
+):
+    """
+    Absen masuk/keluar yang direkam aplikasi saat offline, dikirim sekaligus sesuai urutan.
+    Setiap event mendapat status sendiri, event_id yang sudah pernah dikirim tidak ditulis lagi.
+    """
+    try:
+        if len(req.events) > SYNC_MAX_EVENTS:
+            return common_response(BadRequest(message=f"Maksimal {SYNC_MAX_EVENTS} event per request"))
+
+        results = await absensi_repo.absen_sync(db=db, user=user, events=req.events)
+        return common_response(
+            Ok(
+                data={
+                    "results": [
+                        {
+                            "event_id": val.event_id,
+                            "status": val.status,
+                            "absensi_id": val.absensi_id,
+                        }
+                        for val in results
+                    ]
+                }
+            )
+        )
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
 # @router.get(
 #     "/download-excel/admin",
 # )
@@ -1,33 +1,51 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from common.responses import (
     common_response,
     BadRequest,
     InternalServerError,
     Ok,
+    ServiceUnavailable,
+    TooManyRequests,
     Unauthorized,
 )
+from common.hash_pool import HashPoolOverloaded
+from common.rate_limit import client_ip, login_rate_limiter
 from common.security import (
     generate_jwt_token_from_user,
-    get_user_from_jwt_token,
-    oauth2_scheme,
+    get_current_user,
 )
-from models import get_db_sync
+from models import get_db_async
+from models.User import User
 from schemas.common import (
     UnauthorizedResponse,
     BadRequestResponse,
     InternalServerErrorResponse,
+    ServiceUnavailableResponse,
+    TooManyRequestsResponse,
 )
 from schemas.auth import (
     LoginRequest,
     LoginSuccessResponse,
     MeSuccessResponse,
+    RefreshTokenRequest,
+    RefreshTokenSuccessResponse,
 )
-from repository import auth as auth_repo
+from repository.aio import auth as auth_repo
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 MSG_NotValidUser = "Invalid Credentials"
+MSG_Overloaded = "Too many login attempts in progress, please retry"
+MSG_InvalidRefreshToken = "Invalid/Expired Refresh Token"
+MSG_TooManyAttempts = "Too many login attempts, please retry later"
+
+
+def _client_ip(request: Request):
+    return client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+    )
 
 
 @router.post(
@@ -35,18 +53,28 @@ MSG_NotValidUser = "Invalid Credentials"
     responses={
         "200": {"model": LoginSuccessResponse},
         "400": {"model": BadRequestResponse},
+        "429": {"model": TooManyRequestsResponse},
         "500": {"model": InternalServerErrorResponse},
+        "503": {"model": ServiceUnavailableResponse},
     },
 )
-async def login(req: LoginRequest, db: Session = Depends(get_db_sync)):
+async def login(
+    req: LoginRequest, request: Request, db: AsyncSession = Depends(get_db_async)
+):
     try:
-        is_valid = auth_repo.check_user_password(
+        retry_after = login_rate_limiter.check(ip=_client_ip(request), email=req.email)
+        if retry_after is not None:
+            return common_response(
+                TooManyRequests(message=MSG_TooManyAttempts, retry_after=retry_after)
+            )
+        is_valid = await auth_repo.check_user_password(
             db=db, email=req.email, password=req.password
         )
         if not is_valid:
             return common_response(BadRequest(message=MSG_NotValidUser))
-        user = auth_repo.get_user_by_email(db=db, email=req.email)
+        user = await auth_repo.get_user_by_email(db=db, email=req.email)
         token = await generate_jwt_token_from_user(user=user)
+        refresh_token = await auth_repo.create_refresh_token(db=db, user_id=user.id)
         return common_response(
             Ok(
                 data={
@@ -54,10 +82,13 @@ async def login(req: LoginRequest, db: Session = Depends(get_db_sync)):
                     "email": user.email,
                     "nama": user.nama,
                     "token": token,
+                    "refresh_token": refresh_token,
                 }
             )
         )
 
+    except HashPoolOverloaded:
+        return common_response(ServiceUnavailable(message=MSG_Overloaded))
     except Exception as e:
         import traceback
 
@@ -67,17 +98,66 @@ async def login(req: LoginRequest, db: Session = Depends(get_db_sync)):
 
 @router.post("/token/")
 async def generate_token(
-    db: Session = Depends(get_db_sync), form_data: OAuth2PasswordRequestForm = Depends()
+    request: Request,
+    db: AsyncSession = Depends(get_db_async),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     try:
-        is_valid = auth_repo.check_user_password(
+        retry_after = login_rate_limiter.check(
+            ip=_client_ip(request), email=form_data.username
+        )
+        if retry_after is not None:
+            return common_response(
+                TooManyRequests(message=MSG_TooManyAttempts, retry_after=retry_after)
+            )
+        is_valid = await auth_repo.check_user_password(
             db=db, email=form_data.username, password=form_data.password
         )
         if not is_valid:
             return common_response(BadRequest(message=MSG_NotValidUser))
-        user = auth_repo.get_user_by_email(db=db, email=form_data.username)
+        user = await auth_repo.get_user_by_email(db=db, email=form_data.username)
         token = await generate_jwt_token_from_user(user=user)
-        return {"access_token": token, "token_type": "Bearer"}
+        refresh_token = await auth_repo.create_refresh_token(db=db, user_id=user.id)
+        return {
+            "access_token": token,
+            "token_type": "Bearer",
+            "refresh_token": refresh_token,
+        }
+
+    except HashPoolOverloaded:
+        return common_response(ServiceUnavailable(message=MSG_Overloaded))
+    except Exception as e:
+        import traceback
+
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
+
+@router.post(
+    "/refresh",
+    responses={
+        "200": {"model": RefreshTokenSuccessResponse},
+        "401": {"model": UnauthorizedResponse},
+        "500": {"model": InternalServerErrorResponse},
+    },
+)
+async def refresh(req: RefreshTokenRequest, db: AsyncSession = Depends(get_db_async)):
+    try:
+        rotated = await auth_repo.rotate_refresh_token(db=db, refresh_token=req.refresh_token)
+        if rotated is None:
+            return common_response(Unauthorized(message=MSG_InvalidRefreshToken))
+        user, refresh_token = rotated
+        token = await generate_jwt_token_from_user(user=user)
+        return common_response(
+            Ok(
+                data={
+                    "id": user.id,
+                    "email": user.email,
+                    "token": token,
+                    "refresh_token": refresh_token,
+                }
+            )
+        )
 
     except Exception as e:
         import traceback
@@ -95,11 +175,8 @@ async def generate_token(
         "500": {"model": InternalServerErrorResponse},
     },
 )
-async def me(db: Session = Depends(get_db_sync), token: str = Depends(oauth2_scheme)):
+async def me(db: AsyncSession = Depends(get_db_async), user: User = Depends(get_current_user)):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized())
         return common_response(
             Ok(
                 data={
@@ -1,17 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from models import get_db_sync
-from repository import dashboard as dashboard_repo
+from common.security import Principal, get_current_principal
+from models import get_db_async
+from repository.aio import dashboard as dashboard_repo
 from common.responses import (
     common_response,
     Ok,
     InternalServerError,
-    Unauthorized
 )
 from schemas.dashboard import (
     CountTotalAbsen,
-    VolumeAbsenDate
+    VolumeAbsenDate,
+    AdminDashboardSummary,
+    UserDashboardSummary,
 )
 from schemas.common import (
     BadRequestResponse,
@@ -21,7 +22,6 @@ from schemas.common import (
 )
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
-MSG_UNAUTHORIZED="Invalid/Expire Credentials"
 
 @router.get(
     "/admin/count-day",
@@ -36,14 +36,11 @@ MSG_UNAUTHORIZED="Invalid/Expire Credentials"
 async def count_admin_day(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = dashboard_repo.count_day_admin(
+        data = await dashboard_repo.count_day_admin(
             db=db,
             start_date=start_date,
             end_date=end_date
@@ -73,14 +70,11 @@ async def count_admin_day(
 async def count_user_day(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = dashboard_repo.count_day_user(
+        data = await dashboard_repo.count_day_user(
             db=db,
             user=user,
             start_date=start_date,
@@ -111,14 +105,11 @@ async def count_user_day(
 async def volume_month_admin(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = dashboard_repo.volume_by_month_admin(
+        data = await dashboard_repo.volume_by_month_admin(
             db=db,
             start_date=start_date,
             end_date=end_date
@@ -129,7 +120,7 @@ async def volume_month_admin(
                     "data": [
                         {
                             "tanggal_absen": str(val.tanggal_absen),
-                            "count": val.count
+                            "count": val.total
                         }
                         for val in data
                     ]
@@ -155,14 +146,11 @@ async def volume_month_admin(
 async def volume_month_user(
     start_date: str,
     end_date: str,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = dashboard_repo.volume_by_month_user(
+        data = await dashboard_repo.volume_by_month_user(
             user=user,
             db=db,
             start_date=start_date,
@@ -176,7 +164,7 @@ async def volume_month_user(
                     "data": [
                         {
                             "tanggal_absen": str(val.tanggal_absen),
-                            "count": val.count
+                            "count": val.total
                         }
                         for val in data
                     ]
@@ -186,4 +174,69 @@ async def volume_month_user(
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return common_response(InternalServerError(error=str(e)))
\ No newline at end of file
+        return common_response(InternalServerError(error=str(e)))
+
+@router.get(
+    "/admin/summary",
+    responses={
+        "200": {"model": AdminDashboardSummary},
+        "400": {"model": BadRequestResponse},
+        "401": {"model": UnauthorizedResponse},
+        "403": {"model": ForbiddenResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def summary_admin(
+    start_date: str,
+    end_date: str,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
+):
+    """
+    every widget of the admin dashboard in one query: total, per day series
+    (zero filled), per role and per shift
+    """
+    try:
+        data = await dashboard_repo.summary_admin(
+            db=db,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return common_response(Ok(data=data))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
+@router.get(
+    "/user/summary",
+    responses={
+        "200": {"model": UserDashboardSummary},
+        "400": {"model": BadRequestResponse},
+        "401": {"model": UnauthorizedResponse},
+        "403": {"model": ForbiddenResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def summary_user(
+    start_date: str,
+    end_date: str,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
+):
+    """
+    every widget of the user dashboard in one query: total and per day series
+    (zero filled)
+    """
+    try:
+        data = await dashboard_repo.summary_user(
+            db=db,
+            user=user,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return common_response(Ok(data=data))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
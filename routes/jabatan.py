@@ -1,9 +1,10 @@
 from fastapi import Depends, APIRouter
 from typing import Optional
-from sqlalchemy.orm import Session
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from models import get_db_sync
-from repository import jabatan as jabatan_repo
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.pagination import CountMode
+from common.security import Principal, get_current_principal
+from models import get_db_async
+from repository.aio import jabatan as jabatan_repo
 from common.responses import (
     common_response,
     BadRequest,
@@ -13,7 +14,6 @@ from common.responses import (
     InternalServerError,
     Created,
     NotFound,
-    Unauthorized,
 )
 from schemas.common import (
     BadRequestResponse,
@@ -33,7 +33,6 @@ from schemas.jabatan import (
 )
 
 router = APIRouter(prefix="/jabatan", tags=["Jabatan"])
-MSG_UNAUTHORIZED="Invalid/Expire Credentials"
 
 @router.get(
     "/",
@@ -46,21 +45,20 @@ MSG_UNAUTHORIZED="Invalid/Expire Credentials"
     }
 )
 async def paginate_list(
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
     page: int = 1,
     page_size: int = 10,
+    count: CountMode = CountMode.exact,
     nama_jabatan: Optional[str] = None,
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = jabatan_repo.paginate_jabatan(
+        (data, num_data, num_page) = await jabatan_repo.paginate_jabatan(
             db=db,
             page=page,
             page_size=page_size,
-            jabatan=nama_jabatan
+            jabatan=nama_jabatan,
+            count=count
         )
         return common_response(
             Ok(
@@ -97,14 +95,11 @@ async def paginate_list(
 )
 async def get_detail(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = jabatan_repo.get_jabatan_by_id(db=db, id=id)
+        data = await jabatan_repo.get_jabatan_by_id(db=db, id=id)
         if data is None:
             return common_response(NotFound())
         return common_response(
@@ -132,14 +127,11 @@ async def get_detail(
 )
 async def create_jabatan(
     req: CreateJabatanRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = jabatan_repo.create(
+        data = await jabatan_repo.create(
             db=db,
             nama_jabatan=req.nama_jabatan
         )
@@ -170,17 +162,14 @@ async def create_jabatan(
 async def update_jabatan(
     id: int,
     req: UpdateJabatanRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = jabatan_repo.get_jabatan_by_id(db, id)
+        data = await jabatan_repo.get_jabatan_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        result = jabatan_repo.update(
+        result = await jabatan_repo.update(
             db=db,
             id=id,
             nama_jabatan=req.nama_jabatan
@@ -211,17 +200,14 @@ async def update_jabatan(
 )
 async def delete_jabatan(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = jabatan_repo.get_jabatan_by_id(db, id)
+        data = await jabatan_repo.get_jabatan_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        jabatan_repo.delete(db, id)
+        await jabatan_repo.delete(db, id)
         return common_response(
             NoContent()
         )
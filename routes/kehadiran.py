@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
 from typing import Optional
-from models import get_db_sync
-from sqlalchemy.orm import Session
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from repository import kehadiran as kehadiran_repo
+from models import get_db_async
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.pagination import CountMode
+from common.security import Principal, get_current_principal
+from repository.aio import kehadiran as kehadiran_repo
 from common.responses import (
     common_response,
     Ok,
@@ -12,7 +13,6 @@ from common.responses import (
     NoContent,
     NotFound,
     BadRequest,
-    Unauthorized,
     Forbidden
 )
 from schemas.common import (
@@ -33,7 +33,6 @@ from schemas.kehadiran import (
 )
 
 router = APIRouter(prefix="/kehadiran", tags=["Kehadiran"])
-MSG_UNAUTHORIZED = "Invalid/Expire credentials"
 
 @router.get(
     "/",
@@ -49,18 +48,17 @@ async def get_paginate_list_kehadiran(
     nama_kehadiran: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    count: CountMode = CountMode.exact,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = kehadiran_repo.paginate_list(
+        (data, num_data, num_page) = await kehadiran_repo.paginate_list(
             db=db,
             page=page,
             page_size=page_size,
-            nama_kehadiran=nama_kehadiran
+            nama_kehadiran=nama_kehadiran,
+            count=count
         )
         return common_response(
             Ok(
@@ -98,14 +96,11 @@ async def get_paginate_list_kehadiran(
 )
 async def get_detail_kehadiran(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = kehadiran_repo.get_by_id(db, id)
+        data = await kehadiran_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
         return common_response(
@@ -134,14 +129,11 @@ async def get_detail_kehadiran(
 )
 async def create_kehadiran(
     req: CreateKehadiranRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = kehadiran_repo.create(
+        data = await kehadiran_repo.create(
             db=db,
             nama_kehadiran=req.nama_kehadiran,
             keterangan=req.keterangan
@@ -174,17 +166,14 @@ async def create_kehadiran(
 async def update_kehadiran(
     id: int,
     req: UpdateKehadiranRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = kehadiran_repo.get_by_id(db, id)
+        data = await kehadiran_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        data = kehadiran_repo.update(
+        data = await kehadiran_repo.update(
             db=db,
             id=id,
             nama_kehadiran=req.nama_kehadiran,
@@ -217,17 +206,14 @@ async def update_kehadiran(
 )
 async def delete_kehadiran(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = kehadiran_repo.get_by_id(db, id)
+        data = await kehadiran_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        kehadiran_repo.delete(db, id)
+        await kehadiran_repo.delete(db, id)
         return common_response(
             NoContent()
         )
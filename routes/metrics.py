@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends
+from common.security import Principal, get_current_principal, hash_pool
+from common.db_pool import pool_metrics
+from common.checkin_buffer import checkin_buffer
+from models import engine, async_engine
+from common.responses import (
+    common_response,
+    Ok,
+    InternalServerError,
+)
+from schemas.metrics import (
+    PasswordHashMetricsResponse,
+    DbPoolMetricsResponse,
+    CheckInBufferMetricsResponse,
+)
+from schemas.common import (
+    UnauthorizedResponse,
+    InternalServerErrorResponse
+)
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get(
+    "/password-hash",
+    responses={
+        "200": {"model": PasswordHashMetricsResponse},
+        "401": {"model": UnauthorizedResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def password_hash_metrics(
+    user: Principal = Depends(get_current_principal)
+):
+    try:
+        return common_response(Ok(data=hash_pool.metrics()))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
+
+@router.get(
+    "/db-pool",
+    responses={
+        "200": {"model": DbPoolMetricsResponse},
+        "401": {"model": UnauthorizedResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def db_pool_metrics(
+    user: Principal = Depends(get_current_principal)
+):
+    try:
+        return common_response(
+            Ok(
+                data={
+                    "async_engine": pool_metrics(async_engine.pool),
+                    "sync_engine": pool_metrics(engine.pool),
+                }
+            )
+        )
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
+
+@router.get(
+    "/checkin-buffer",
+    responses={
+        "200": {"model": CheckInBufferMetricsResponse},
+        "401": {"model": UnauthorizedResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def checkin_buffer_metrics(
+    user: Principal = Depends(get_current_principal)
+):
+    try:
+        return common_response(Ok(data=checkin_buffer.metrics()))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
@@ -0,0 +1,66 @@
+import time
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.security import Principal, get_current_principal
+from models import get_db_async
+from repository.aio import search as search_repo
+from common.responses import (
+    common_response,
+    Ok,
+    InternalServerError,
+)
+from schemas.search import SearchResponse
+from schemas.common import (
+    UnauthorizedResponse,
+    InternalServerErrorResponse
+)
+from settings import SEARCH_MIN_LENGTH, SEARCH_MAX_LIMIT
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get(
+    "/",
+    responses={
+        "200": {"model": SearchResponse},
+        "401": {"model": UnauthorizedResponse},
+        "500": {"model": InternalServerErrorResponse},
+    }
+)
+async def search(
+    q: str,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
+):
+    """
+    typeahead for the admin UI, ranked matches across user (nama, email), jabatan,
+    shift and kehadiran. q shorter than SEARCH_MIN_LENGTH return no result
+    """
+    try:
+        q = q.strip()
+        started_at = time.perf_counter()
+        data = []
+        if len(q) >= SEARCH_MIN_LENGTH:
+            data = await search_repo.search(
+                db=db, q=q, limit=max(1, min(limit, SEARCH_MAX_LIMIT))
+            )
+        return common_response(
+            Ok(
+                data={
+                    "took_ms": round((time.perf_counter() - started_at) * 1000, 2),
+                    "results": [
+                        {
+                            "type": val.type,
+                            "id": val.id,
+                            "label": val.label,
+                            "score": round(val.score, 4),
+                        }
+                        for val in data
+                    ]
+                }
+            )
+        )
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
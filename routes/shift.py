@@ -1,9 +1,10 @@
 from fastapi import Depends, APIRouter
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from models import get_db_sync
-from sqlalchemy.orm import Session
+from common.pagination import CountMode
+from common.security import Principal, get_current_principal
+from models import get_db_async
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from repository import shift as shift_repo
+from repository.aio import shift as shift_repo
 from common.responses import (
     common_response,
     Ok,
@@ -11,7 +12,6 @@ from common.responses import (
     NotFound,
     BadRequest,
     InternalServerError,
-    Unauthorized,
     Forbidden,
     Created
 )
@@ -35,7 +35,6 @@ from schemas.shift import (
 )
 
 router = APIRouter(prefix="/shift", tags=["Shift"])
-MSG_UNAUTHORIZED="Invalid/Expired Credentials"
 
 @router.get(
     "/",
@@ -50,23 +49,22 @@ MSG_UNAUTHORIZED="Invalid/Expired Credentials"
 async def get_paginate_shift(
     page: int = 1,
     page_size: int = 10,
+    count: CountMode = CountMode.exact,
     nama_shift: Optional[str] = None,
     jam_mulai: Optional[str] = None,
     jam_akhir: Optional[str] = None,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = shift_repo.list_paginate(
+        (data, num_data, num_page) = await shift_repo.list_paginate(
             db=db,
             page=page,
             page_size=page_size,
             nama_shift=nama_shift,
             jam_mulai=jam_mulai,
-            jam_akhir=jam_akhir
+            jam_akhir=jam_akhir,
+            count=count
         )
         return common_response(
             Ok(
@@ -105,14 +103,11 @@ async def get_paginate_shift(
 )
 async def get_detail_shift(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = shift_repo.get_by_id(db, id)
+        data = await shift_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
         return common_response(
@@ -155,14 +150,11 @@ async def get_detail_shift(
 )
 async def create_shift(
     req: CreateShiftRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = shift_repo.create(
+        data = await shift_repo.create(
             db=db,
             nama_shift=req.nama_shift,
             jam_mulai=req.jam_mulai,
@@ -195,19 +187,16 @@ async def create_shift(
     }
 )
 async def update_shift(
-    id: str,
+    id: int,
     req: UpdateShiftRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = shift_repo.get_by_id(db, id)
+        data = await shift_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        data = shift_repo.update(
+        data = await shift_repo.update(
             db=db,
             id=id,
             nama_shift=req.nama_shift,
@@ -242,17 +231,14 @@ async def update_shift(
 )
 async def delete_shift(
     id: int,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = shift_repo.get_by_id(db, id)
+        data = await shift_repo.get_by_id(db, id)
         if data is None:
             return common_response(NotFound())
-        shift_repo.delete(
+        await shift_repo.delete(
             db=db,
             id=id
         )
@@ -276,14 +262,11 @@ async def delete_shift(
 async def assign_shift_user(
     id: int,
     params: AssignShiftUserRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = shift_repo.assign_shift_user(
+        data = await shift_repo.assign_shift_user(
             db=db,
             id=id,
             users=params.user_id
@@ -1,4 +1,7 @@
+import asyncio
+from datetime import datetime, timedelta
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import PropertyMock, patch
 from freezegun import freeze_time
 from models.Absensi import Absensi
 from sqlalchemy.orm import Session
@@ -9,6 +12,14 @@ import alembic.config
 from models import factory_session, clear_all_data_on_database
 from migrations.factories.UserFactory import UserFactory
 from migrations.factories.RoleFactory import RoleFactory
+from models import async_engine, Async_Session
+from models.AbsensiDailySummary import AbsensiDailySummary
+from sqlalchemy import func
+from common.query_counter import count_queries
+from common.idempotency import idempotency_cache
+from common.checkin_buffer import CheckInBuffer, write_check_ins
+import pytz
+from settings import LAT_OF_CENTER, LONG_OF_CENTER, TZ
 from seeders.shift import list_shift
 from seeders.kehadiran import list_kehadiran
 from repository import (
@@ -16,6 +27,7 @@ from repository import (
     shift as shift_repo,
     kehadiran as kehadiran_repo
 )
+from repository.aio import absensi as absensi_aio_repo
 
 
 class TestAbsensi(IsolatedAsyncioTestCase):
@@ -106,6 +118,7 @@ class TestAbsensi(IsolatedAsyncioTestCase):
             "page_count": 1,
             "page_size": 10,
             "page": 1,
+            "next_cursor": None,
             "results": [
                 {
                     "id": val.id,
@@ -140,6 +153,150 @@ class TestAbsensi(IsolatedAsyncioTestCase):
         self.maxDiff = None
         self.assertEqual(response.json(), output)
 
+    async def test_paginate_absensi_admin_cursor(self):
+        # Given
+        role = RoleFactory.create(jabatan="Admin")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        # one open session per user and day
+        list_users = [user] + [
+            UserFactory.create(
+                email=f"user{n}@example.com",
+                nama=f"User {n}",
+                password="12qwaszx",
+                userRole=role,
+            )
+            for n in range(2)
+        ]
+        list_absen = [
+            absensi_repo.create_masuk(
+                db=self.db,
+                lokasi_masuk="41.40338, 2.17403",
+                userId=val,
+                is_commit=False
+            )
+            for val in list_users
+        ]
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        first_page = client.get(
+            "/absensi/laporan",
+            params={"cursor": "", "page_size": 2},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        next_cursor = first_page.json()["next_cursor"]
+        second_page = client.get(
+            "/absensi/laporan",
+            params={"cursor": next_cursor, "page_size": 2},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(first_page.status_code, 200)
+        self.assertIsNone(first_page.json()["count"])
+        self.assertEqual(
+            [val["id"] for val in first_page.json()["results"]],
+            [list_absen[0].id, list_absen[1].id]
+        )
+        self.assertIsNotNone(next_cursor)
+        self.assertEqual(second_page.status_code, 200)
+        self.assertEqual(
+            [val["id"] for val in second_page.json()["results"]],
+            [list_absen[2].id]
+        )
+        self.assertIsNone(second_page.json()["next_cursor"])
+
+    async def test_paginate_absensi_admin_query_count(self):
+        # Given
+        list_role = [
+            RoleFactory.create(jabatan="Admin"),
+            RoleFactory.create(jabatan="Operator"),
+            RoleFactory.create(jabatan="Guru"),
+        ]
+        shift_db = [
+            shift_repo.create(
+                db=self.db,
+                nama_shift=shift["nama_shift"],
+                jam_mulai=shift["jam_mulai"],
+                jam_akhir=shift["jam_akhir"],
+                is_commit=False,
+            )
+            for shift in list_shift
+        ]
+        list_users = [
+            UserFactory.create(
+                email=f"user{n}@example.com",
+                nama=f"User {n}",
+                password="12qwaszx",
+                userRole=list_role[n % len(list_role)],
+            )
+            for n in range(30)
+        ]
+        for n, user in enumerate(list_users):
+            user.userShift.append(shift_db[n % len(shift_db)])
+            absensi_repo.create_masuk(
+                db=self.db,
+                lokasi_masuk="41.40338, 2.17403",
+                userId=user,
+                is_commit=False
+            )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(list_users[0])
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+        # warm up, the principal is cached after the first request
+        client.get("/absensi/laporan", params={"page_size": 1}, headers=headers)
+
+        # When
+        counts = {}
+        for params in [
+            {"page_size": 5},
+            {"page_size": 30},
+            {"page_size": 30, "cursor": ""},
+        ]:
+            with count_queries(async_engine) as counter:
+                response = client.get("/absensi/laporan", params=params, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), params["page_size"])
+            counts[str(params)] = counter.count
+
+        # Expect
+        # page with absen_user and userRole joined + one selectin for userShift
+        self.assertEqual(set(counts.values()), {2}, counts)
+        results = response.json()["results"]
+        self.assertTrue(all(val["user"]["jabatan"] is not None for val in results))
+        self.assertTrue(all(len(val["user"]["shift"]) == 1 for val in results))
+
+    async def test_paginate_absensi_invalid_cursor(self):
+        # Given
+        role = RoleFactory.create(jabatan="Admin")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.get(
+            "/absensi/",
+            params={"cursor": "not-a-cursor"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 400)
+
     async def test_paginate_absensi_user(self):
         # Given
         list_role = [
@@ -185,35 +342,40 @@ class TestAbsensi(IsolatedAsyncioTestCase):
                 is_commit=False
             ))
 
-        absensi_repo.create_masuk(
+        # create_masuk does not take shift/kehadiran, set them on the returned rows
+        other_absen = absensi_repo.create_masuk(
             db=self.db,
             lokasi_masuk="41.40338, 2.17403",
             userId=list_users[1],
-            shift_id=shift_db[0].id,
-            kehadiran_id=kehadiran_db[1].id,
             keterangan=None,
             is_commit=False
         )
-        list_absen = [
-            absensi_repo.create_masuk(
-                db=self.db,
-                lokasi_masuk="41.40338, 2.17403",
-                userId=list_users[2],
-                shift_id=shift_db[0].id,
-                kehadiran_id=kehadiran_db[0].id,
-                keterangan=None,
-                is_commit=False
-            ),
-            absensi_repo.create_masuk(
-                db=self.db,
-                lokasi_masuk="41.40338, 2.17403",
-                userId=list_users[2],
-                shift_id=shift_db[1].id,
-                kehadiran_id=kehadiran_db[0].id,
-                keterangan=None,
-                is_commit=False
-            ),
-        ]
+        other_absen.shift_id = shift_db[0].id
+        other_absen.kehadiran_id = kehadiran_db[1].id
+        first_absen = absensi_repo.create_masuk(
+            db=self.db,
+            lokasi_masuk="41.40338, 2.17403",
+            userId=list_users[2],
+            keterangan=None,
+            is_commit=False
+        )
+        first_absen.shift_id = shift_db[0].id
+        first_absen.kehadiran_id = kehadiran_db[0].id
+        # id is read by update_exit, one open session per user and day
+        self.db.flush()
+        absensi_repo.update_exit(
+            db=self.db, id=first_absen.id, lokasi_keluar="41.40338, 2.17403", is_commit=False
+        )
+        second_absen = absensi_repo.create_masuk(
+            db=self.db,
+            lokasi_masuk="41.40338, 2.17403",
+            userId=list_users[2],
+            keterangan=None,
+            is_commit=False
+        )
+        second_absen.shift_id = shift_db[1].id
+        second_absen.kehadiran_id = kehadiran_db[0].id
+        list_absen = [first_absen, second_absen]
         self.db.commit()
         token = await generate_jwt_token_from_user(list_users[2])
         client = TestClient(app)
@@ -230,6 +392,7 @@ class TestAbsensi(IsolatedAsyncioTestCase):
             "page_count": 1,
             "page_size": 10,
             "page": 1,
+            "next_cursor": None,
             "results": [
                 {
                     "id": val.id,
@@ -237,17 +400,8 @@ class TestAbsensi(IsolatedAsyncioTestCase):
                     "jam_masuk": str(val.jam_masuk),
                     "jam_keluar": str(val.jam_keluar ) if val.jam_keluar else None,
                     "keterangan": val.keterangan,
-                    "shift": {
-                        "id": val.absen_shift.id,
-                        "nama_shift": val.absen_shift.nama_shift,
-                        "jam_mulai": str(val.absen_shift.jam_mulai),
-                        "jam_akhir": str(val.absen_shift.jam_akhir)
-                    } if val.absen_shift else None,
-                    "kehadiran": {
-                        "id": val.absen_kehadiran.id,
-                        "nama_kehadiran": val.absen_kehadiran.nama_kehadiran,
-                        "keterangan": val.absen_kehadiran.keterangan,
-                    } if val.absen_kehadiran else None,
+                    "lokasi_masuk": val.lokasi_masuk,
+                    "lokasi_keluar": val.lokasi_keluar,
                 }
                 for val in list_absen
             ],
@@ -673,7 +827,263 @@ class TestAbsensi(IsolatedAsyncioTestCase):
         self.assertIsNotNone(check_db)
 
 
+    async def test_update_absensi_keluar_other_user(self):
+        # Given
+        data_role = RoleFactory.create(jabatan="Guru")
+        owner = UserFactory.create(email="owner@example.com", nama="Owner", userRole=data_role)
+        other = UserFactory.create(email="other@example.com", nama="Other", userRole=data_role)
+        self.db.commit()
+        data_absen = absensi_repo.create_masuk(
+            db=self.db, lokasi_masuk="41.40338, 2.17403", userId=owner
+        )
+        token = await generate_jwt_token_from_user(other)
+        client = TestClient(app)
+
+        # When
+        response = client.put(
+            f"/absensi/keluar/{data_absen.id}",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"lokasi_keluar": "41.40338, 2.17403"},
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 404)
+        self.db.expire_all()
+        self.assertIsNone(self.db.query(Absensi).filter(Absensi.id == data_absen.id).one().jam_keluar)
+
+    async def test_update_absensi_keluar_twice(self):
+        # Given
+        data_user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        data_absen = absensi_repo.create_masuk(
+            db=self.db, lokasi_masuk="41.40338, 2.17403", userId=data_user
+        )
+        token = await generate_jwt_token_from_user(data_user)
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+        req = {"lokasi_keluar": "41.40338, 2.17403"}
+
+        # When
+        first = client.put(f"/absensi/keluar/{data_absen.id}", headers=headers, json=req)
+        second = client.put(f"/absensi/keluar/{data_absen.id}", headers=headers, json=req)
+        missing = client.put(f"/absensi/keluar/{data_absen.id + 1000}", headers=headers, json=req)
+
+        # Expect
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["user"]["jabatan"]["nama_jabatan"], "Guru")
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(missing.status_code, 404)
+        check_outs = self.db.query(func.sum(AbsensiDailySummary.check_outs)).scalar()
+        self.assertEqual(check_outs, 1)
+
+    async def test_create_absensi_masuk_idempotency_key(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        req = {"lokasi_masuk": "41.40338, 2.17403"}
+
+        # When
+        first = client.post(
+            "/absensi/masuk",
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": "masuk-1"},
+            json=req,
+        )
+        retry = client.post(
+            "/absensi/masuk",
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": "masuk-1"},
+            json=req,
+        )
+        without_key = client.post(
+            "/absensi/masuk", headers={"Authorization": f"Bearer {token}"}, json=req
+        )
+
+        # Expect
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(without_key.status_code, 400)
+        num_absen = self.db.query(Absensi).filter(Absensi.user_id == user.id).count()
+        self.assertEqual(num_absen, 1)
+
+    async def test_create_absensi_masuk_keterangan_too_long(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.post(
+            "/absensi/masuk",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"lokasi_masuk": "41.40338, 2.17403", "keterangan": "x" * 101},
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 422)
+        num_absen = self.db.query(Absensi).filter(Absensi.user_id == user.id).count()
+        self.assertEqual(num_absen, 0)
+
+    def buffered(self, buffer: CheckInBuffer):
+        """
+        route check-ins through buffer, it is not started: the test flush it
+        """
+        return (
+            patch.multiple("routes.absensi", CHECKIN_BUFFER_ENABLED=True, checkin_buffer=buffer),
+            patch.object(CheckInBuffer, "running", new_callable=PropertyMock, return_value=True),
+        )
+
+    async def test_create_absensi_masuk_buffered_session_open(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        absensi_repo.create_masuk(db=self.db, lokasi_masuk="41.40338, 2.17403", userId=user)
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        buffer = CheckInBuffer(flush=write_check_ins, max_size=10, batch_size=10, flush_ms=10000)
+        enabled, running = self.buffered(buffer)
+
+        # When
+        with enabled, running:
+            response = client.post(
+                "/absensi/masuk",
+                headers={"Authorization": f"Bearer {token}"},
+                json={"lokasi_masuk": "41.40338, 2.17403"},
+            )
+
+        # Expect
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "Anda belum melakukan Check-Out!"})
+        self.assertEqual(buffer.metrics()["accepted"], 0)
+        self.assertFalse(buffer.is_pending(user.id))
+
+    async def test_update_absensi_keluar_buffered_event(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+        req = {"lokasi_keluar": "41.40338, 2.17403"}
+        buffer = CheckInBuffer(flush=write_check_ins, max_size=10, batch_size=10, flush_ms=10000)
+        enabled, running = self.buffered(buffer)
+
+        # When
+        with enabled, running:
+            masuk = client.post(
+                "/absensi/masuk", headers=headers, json={"lokasi_masuk": "41.40338, 2.17403"}
+            )
+            event_id = masuk.json()["event_id"]
+            pending = client.put(f"/absensi/keluar/event/{event_id}/", headers=headers, json=req)
+            await buffer._flush_batch()
+            keluar = client.put(f"/absensi/keluar/event/{event_id}/", headers=headers, json=req)
+            unknown = client.put("/absensi/keluar/event/unknown/", headers=headers, json=req)
+
+        # Expect
+        self.assertEqual(masuk.status_code, 202)
+        self.assertIsNone(masuk.json()["id"])
+        self.assertEqual(pending.status_code, 409)
+        self.assertEqual(keluar.status_code, 200)
+        self.assertEqual(unknown.status_code, 404)
+        data = self.db.query(Absensi).filter(Absensi.user_id == user.id).one()
+        self.assertEqual(keluar.json()["id"], data.id)
+        self.assertIsNotNone(data.jam_keluar)
+
+    async def test_sync_absensi(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com", nama="Guru", userRole=RoleFactory.create(jabatan="Guru")
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        now = datetime.now(pytz.timezone(TZ)).replace(microsecond=0)
+        yesterday = now - timedelta(days=1)
+        lokasi = {"latitude": LAT_OF_CENTER, "longitude": LONG_OF_CENTER}
+        req = {
+            "events": [
+                {"event_id": "a", "jenis": "masuk", "waktu": yesterday.replace(hour=7, minute=0).isoformat(), **lokasi},
+                {"event_id": "b", "jenis": "keluar", "waktu": yesterday.replace(hour=15, minute=0).isoformat(), **lokasi},
+                {"event_id": "c", "jenis": "masuk", "waktu": (now - timedelta(minutes=1)).isoformat(), **lokasi},
+                {"event_id": "d", "jenis": "keluar", "waktu": yesterday.replace(hour=16, minute=0).isoformat(), **lokasi},
+            ]
+        }
+
+        # When
+        response = client.post(
+            "/absensi/sync", headers={"Authorization": f"Bearer {token}"}, json=req
+        )
+        retry = client.post(
+            "/absensi/sync", headers={"Authorization": f"Bearer {token}"}, json=req
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(
+            [val["status"] for val in results], ["created", "closed", "created", "invalid_time"]
+        )
+        self.assertEqual(results[0]["absensi_id"], results[1]["absensi_id"])
+        self.assertEqual(
+            [val["status"] for val in retry.json()["results"]],
+            ["duplicate", "duplicate", "duplicate", "invalid_time"],
+        )
+        rows = (
+            self.db.query(Absensi)
+            .filter(Absensi.user_id == user.id)
+            .order_by(Absensi.tanggal_absen)
+            .all()
+        )
+        self.assertEqual([str(val.jam_keluar) for val in rows], ["15:00:00", "None"])
+        self.assertEqual(rows[0].lokasi_masuk, f"{LAT_OF_CENTER}, {LONG_OF_CENTER}")
+        summary = self.db.query(
+            func.sum(AbsensiDailySummary.check_ins), func.sum(AbsensiDailySummary.check_outs)
+        ).one()
+        self.assertEqual(tuple(summary), (2, 1))
+
+    async def test_create_absensi_masuk_concurrent(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com",
+            nama="Guru",
+            password=generate_hash_password("12qwaszx"),
+            userRole=RoleFactory.create(jabatan="Guru"),
+        )
+        self.db.commit()
+
+        async def check_in():
+            async with Async_Session() as db:
+                return await absensi_aio_repo.absen_masuk(
+                    db=db, user=user, lokasi_masuk="41.40338, 2.17403"
+                )
+
+        # When
+        results = await asyncio.gather(*(check_in() for _ in range(50)))
+
+        # Expect
+        outcomes = [outcome for outcome, _ in results]
+        self.assertEqual(outcomes.count(absensi_repo.CHECK_IN_CREATED), 1)
+        self.assertEqual(outcomes.count(absensi_repo.CHECK_IN_OPEN), 49)
+        num_absen = self.db.query(Absensi).filter(Absensi.user_id == user.id).count()
+        self.assertEqual(num_absen, 1)
+        check_ins = self.db.query(func.sum(AbsensiDailySummary.check_ins)).scalar()
+        self.assertEqual(check_ins, 1)
+
     def tearDown(self) -> None:
+        idempotency_cache.clear()
         self.db.rollback()
         factory_session.remove()
         return super().tearDown()
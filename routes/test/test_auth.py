@@ -1,4 +1,5 @@
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
 import alembic.config
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -6,10 +7,17 @@ from common.security import (
     generate_jwt_token_from_user,
     generate_hash_password,
 )
-from models import factory_session, clear_all_data_on_database
+from models import async_engine, factory_session, clear_all_data_on_database
+from models.Shift import Shift
+from common.query_counter import count_queries
+from common.rate_limit import LoginRateLimiter, MemoryRateLimitBackend
 from migrations.factories.UserFactory import UserFactory
 from migrations.factories.RoleFactory import RoleFactory
+from repository.aio import auth as auth_repo
 from main import app
+from settings import SECRET_KEY, ALGORITHM
+from datetime import datetime, timedelta
+import jwt
 
 
 class TestAuth(IsolatedAsyncioTestCase):
@@ -39,6 +47,136 @@ class TestAuth(IsolatedAsyncioTestCase):
         # Expect
         self.assertEqual(response.status_code, 200)
 
+    def limited(self):
+        """
+        fresh limiter allowing 2 attempts per email, so the test does not depend
+        on buckets left by other tests
+        """
+        limiter = LoginRateLimiter(
+            backend=MemoryRateLimitBackend(),
+            ip_capacity=100,
+            ip_per_minute=1,
+            email_capacity=2,
+            email_per_minute=1,
+        )
+        check = patch.object(
+            auth_repo, "check_user_password", wraps=auth_repo.check_user_password
+        )
+        return patch("routes.auth.login_rate_limiter", limiter), check
+
+    async def test_login_rate_limited(self) -> None:
+        # Given
+        _ = UserFactory.create(
+            email="test@example.com",
+            nama="test",
+            password=generate_hash_password("12qwaszx"),
+        )
+        self.db.commit()
+        client = TestClient(app)
+        body = {"email": "test@example.com", "password": "wrong"}
+        limiter, check = self.limited()
+
+        # When
+        with limiter, check as check_user_password:
+            attempts = [client.post("/auth/login", json=body) for _ in range(2)]
+            with count_queries(async_engine) as counter:
+                response = client.post("/auth/login", json=body)
+
+        # Expect
+        self.assertEqual([val.status_code for val in attempts], [400, 400])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "60")
+        # password is neither hashed nor looked up once limited
+        self.assertEqual(check_user_password.call_count, 2)
+        self.assertEqual(counter.count, 0)
+
+    async def test_login_rate_limited_per_forwarded_ip(self) -> None:
+        # Given
+        client = TestClient(app)
+        limiter = LoginRateLimiter(
+            backend=MemoryRateLimitBackend(),
+            ip_capacity=1,
+            ip_per_minute=1,
+            email_capacity=100,
+            email_per_minute=1,
+        )
+
+        def login(email: str, forwarded_for: str):
+            return client.post(
+                "/auth/login",
+                json={"email": email, "password": "wrong"},
+                headers={"X-Forwarded-For": forwarded_for},
+            )
+
+        # When
+        with patch("routes.auth.login_rate_limiter", limiter), patch(
+            "common.rate_limit.LOGIN_RATE_LIMIT_TRUSTED_HOPS", 1
+        ):
+            first = login("a@example.com", "10.0.0.1")
+            other_client = login("b@example.com", "10.0.0.2")
+            same_client = login("c@example.com", "10.0.0.1")
+
+        # Expect
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(other_client.status_code, 400)
+        self.assertEqual(same_client.status_code, 429)
+
+    async def test_token_rate_limited(self) -> None:
+        # Given
+        _ = UserFactory.create(
+            email="test@example.com",
+            nama="test",
+            password=generate_hash_password("12qwaszx"),
+        )
+        self.db.commit()
+        client = TestClient(app)
+        form = {"username": "test@example.com", "password": "wrong"}
+        limiter, check = self.limited()
+
+        # When
+        with limiter, check as check_user_password:
+            attempts = [client.post("/auth/token/", data=form) for _ in range(2)]
+            with count_queries(async_engine) as counter:
+                response = client.post("/auth/token/", data=form)
+
+        # Expect
+        self.assertEqual([val.status_code for val in attempts], [400, 400])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "60")
+        self.assertEqual(check_user_password.call_count, 2)
+        self.assertEqual(counter.count, 0)
+
+    async def test_refresh_token(self) -> None:
+        # Given
+        _ = UserFactory.create(
+            email="test@example.com",
+            nama="test",
+            password=generate_hash_password("12qwaszx"),
+        )
+        self.db.commit()
+        client = TestClient(app)
+        login = client.post(
+            "/auth/login",
+            json={"email": "test@example.com", "password": "12qwaszx"},
+        ).json()
+
+        # When
+        response = client.post(
+            "/auth/refresh", json={"refresh_token": login["refresh_token"]}
+        )
+        reused = client.post(
+            "/auth/refresh", json={"refresh_token": login["refresh_token"]}
+        )
+        after_reuse = client.post(
+            "/auth/refresh", json={"refresh_token": response.json()["refresh_token"]}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()["refresh_token"], login["refresh_token"])
+        self.assertEqual(reused.status_code, 401)
+        self.assertEqual(after_reuse.status_code, 401)
+
     async def test_me(self) -> None:
         # Given
         role = RoleFactory.create(jabatan="Admin")
@@ -66,6 +204,57 @@ class TestAuth(IsolatedAsyncioTestCase):
         self.maxDiff = None
         self.assertEqual(response.json(), output)
 
+    async def test_me_single_query(self) -> None:
+        # Given
+        role = RoleFactory.create(jabatan="Admin")
+        user = UserFactory.create(
+            email="test@example.com",
+            nama="test",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        user.userShift = [Shift(nama_shift="Pagi"), Shift(nama_shift="Siang")]
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        with count_queries(async_engine) as counter:
+            response = client.get(
+                "/auth/me", headers={"Authorization": f"Bearer {token}"}
+            )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(counter.count, 1)
+
+    async def test_me_invalid_token(self) -> None:
+        # Given
+        client = TestClient(app)
+
+        # When
+        response = client.get("/auth/me", headers={"Authorization": "Bearer invalid"})
+
+        # Expect
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"message": "Invalid/Expired Credentials"})
+
+    async def test_me_token_without_id(self) -> None:
+        # Given
+        client = TestClient(app)
+        token = jwt.encode(
+            {"email": "test@test.com", "exp": datetime.now() + timedelta(minutes=5)},
+            SECRET_KEY,
+            algorithm=ALGORITHM,
+        )
+
+        # When
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        # Expect
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"message": "Invalid/Expired Credentials"})
+
     def tearDown(self) -> None:
         self.db.rollback()
         factory_session.remove()
@@ -0,0 +1,283 @@
+from datetime import date, time
+from unittest import IsolatedAsyncioTestCase
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from fastapi.testclient import TestClient
+from main import app
+from common.security import generate_jwt_token_from_user, generate_hash_password
+import alembic.config
+from models import factory_session, clear_all_data_on_database
+from common.dashboard_cache import dashboard_cache
+from models.AbsensiDailySummary import AbsensiDailySummary
+from models.Shift import Shift
+from migrations.factories.UserFactory import UserFactory
+from migrations.factories.RoleFactory import RoleFactory
+from repository import absensi as absensi_repo
+from repository.daily_summary import rebuild_daily_summary
+
+
+class TestDashboard(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        alembic_args = ["-c", "alembic.ini", "upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        self.db: Session = factory_session()
+        clear_all_data_on_database(self.db)
+        dashboard_cache.clear()
+        return super().setUp()
+
+    def summary(self) -> list:
+        stmt = select(
+            AbsensiDailySummary.tanggal_absen,
+            AbsensiDailySummary.role_id,
+            AbsensiDailySummary.shift_id,
+            AbsensiDailySummary.check_ins,
+            AbsensiDailySummary.check_outs,
+            AbsensiDailySummary.late_count,
+        ).order_by(
+            AbsensiDailySummary.tanggal_absen,
+            AbsensiDailySummary.role_id,
+            AbsensiDailySummary.shift_id,
+        )
+        return [tuple(val) for val in self.db.execute(stmt).all()]
+
+    async def test_summary_maintained_by_check_in_and_out(self):
+        # Given
+        role = RoleFactory.create(jabatan="Guru")
+        # first shift already started at midnight, every check-in is late
+        early = UserFactory.create(email="pagi@example.com", nama="Pagi", userRole=role)
+        early.userShift = [Shift(nama_shift="Pagi", jam_mulai=time(0, 0), jam_akhir=time(12))]
+        no_shift = UserFactory.create(email="bebas@example.com", nama="Bebas", userRole=role)
+        self.db.commit()
+
+        # When
+        absen = absensi_repo.create_masuk(db=self.db, lokasi_masuk="sekolah", userId=early)
+        absensi_repo.create_masuk(db=self.db, lokasi_masuk="sekolah", userId=no_shift)
+        absensi_repo.update_exit(db=self.db, id=absen.id, lokasi_keluar="sekolah")
+
+        # Expect
+        self.assertEqual(
+            self.summary(),
+            [
+                (date.today(), role.id, early.userShift[0].id, 1, 1, 1),
+                (date.today(), role.id, None, 1, 0, 0),
+            ],
+        )
+
+    async def test_rebuild_summary(self):
+        # Given
+        role = RoleFactory.create(jabatan="Guru")
+        user = UserFactory.create(email="guru@example.com", nama="Guru", userRole=role)
+        self.db.commit()
+        # rows written behind the repository, the summary does not know them
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, user_id)
+                VALUES (DATE '2024-01-01', TIME '07:00', TIME '15:00', :user_id),
+                       (DATE '2024-01-01', TIME '07:00', NULL, :user_id),
+                       (DATE '2024-01-02', TIME '07:00', NULL, :user_id)
+                """
+            ),
+            {"user_id": user.id},
+        )
+        self.db.commit()
+
+        # When
+        rows = rebuild_daily_summary(db=self.db)
+
+        # Expect
+        self.assertEqual(rows, 2)
+        self.assertEqual(
+            self.summary(),
+            [
+                (date(2024, 1, 1), role.id, None, 2, 1, 0),
+                (date(2024, 1, 2), role.id, None, 1, 0, 0),
+            ],
+        )
+        # a partial rebuild only replace its own days
+        rebuild_daily_summary(db=self.db, start_date=date(2024, 1, 2), end_date=date(2024, 1, 2))
+        self.assertEqual(len(self.summary()), 2)
+
+    async def test_admin_dashboard_read_summary(self):
+        # Given
+        role = RoleFactory.create(jabatan="Administrasi")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        self.db.add_all(
+            [
+                AbsensiDailySummary(tanggal_absen=date(2024, 1, 1), role_id=role.id, check_ins=3),
+                AbsensiDailySummary(tanggal_absen=date(2024, 1, 1), role_id=None, check_ins=2),
+                AbsensiDailySummary(tanggal_absen=date(2024, 1, 2), role_id=role.id, check_ins=4),
+            ]
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+        # When
+        count = client.get(
+            "/dashboard/admin/count-day",
+            params=params,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        volume = client.get(
+            "/dashboard/admin/volume-month",
+            params=params,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(count.status_code, 200)
+        self.assertEqual(count.json()["count"], 9)
+        self.assertEqual(volume.status_code, 200)
+        self.assertEqual(
+            volume.json()["data"],
+            [
+                {"tanggal_absen": "2024-01-01", "count": 5},
+                {"tanggal_absen": "2024-01-02", "count": 4},
+            ],
+        )
+
+    async def test_admin_dashboard_cache_invalidated_by_check_in(self):
+        # Given
+        role = RoleFactory.create(jabatan="Administrasi")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+        today = str(date.today())
+        params = {"start_date": today, "end_date": today}
+        headers = {"Authorization": f"Bearer {token}"}
+        before = client.get("/dashboard/admin/count-day", params=params, headers=headers)
+        # written behind the repository, the cached result is served
+        self.db.add(AbsensiDailySummary(tanggal_absen=date.today(), role_id=None, check_ins=5))
+        self.db.commit()
+        cached = client.get("/dashboard/admin/count-day", params=params, headers=headers)
+
+        # When
+        absensi_repo.create_masuk(db=self.db, lokasi_masuk="sekolah", userId=user)
+        after = client.get("/dashboard/admin/count-day", params=params, headers=headers)
+
+        # Expect
+        self.assertEqual(before.json()["count"], 0)
+        self.assertEqual(cached.json()["count"], 0)
+        self.assertEqual(after.json()["count"], 6)
+
+    async def test_admin_summary(self):
+        # Given
+        role = RoleFactory.create(jabatan="Administrasi")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        shift = Shift(nama_shift="Pagi", jam_mulai=time(7), jam_akhir=time(12))
+        self.db.add(shift)
+        self.db.commit()
+        self.db.add_all(
+            [
+                AbsensiDailySummary(
+                    tanggal_absen=date(2024, 1, 1), role_id=role.id, shift_id=shift.id,
+                    check_ins=3, check_outs=2, late_count=1,
+                ),
+                AbsensiDailySummary(
+                    tanggal_absen=date(2024, 1, 1), role_id=None, shift_id=None,
+                    check_ins=2, check_outs=2, late_count=0,
+                ),
+                AbsensiDailySummary(
+                    tanggal_absen=date(2024, 1, 3), role_id=role.id, shift_id=shift.id,
+                    check_ins=4, check_outs=4, late_count=2,
+                ),
+            ]
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.get(
+            "/dashboard/admin/summary",
+            params={"start_date": "2024-01-01", "end_date": "2024-01-04"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], {"check_ins": 9, "check_outs": 8, "late_count": 3})
+        self.assertEqual(
+            [(val["tanggal_absen"], val["check_ins"]) for val in data["series"]],
+            [("2024-01-01", 5), ("2024-01-02", 0), ("2024-01-03", 4), ("2024-01-04", 0)],
+        )
+        self.assertEqual(
+            [(val["role_id"], val["nama_role"], val["check_ins"]) for val in data["by_role"]],
+            [(role.id, "Administrasi", 7), (None, None, 2)],
+        )
+        self.assertEqual(
+            [(val["shift_id"], val["nama_shift"], val["late_count"]) for val in data["by_shift"]],
+            [(shift.id, "Pagi", 3), (None, None, 0)],
+        )
+
+    async def test_user_summary(self):
+        # Given
+        user = UserFactory.create(
+            email="guru@example.com",
+            nama="Guru",
+            password=generate_hash_password("12qwaszx"),
+            userRole=RoleFactory.create(jabatan="Guru"),
+        )
+        user.userShift = [Shift(nama_shift="Pagi", jam_mulai=time(7), jam_akhir=time(12))]
+        self.db.commit()
+        self.db.execute(
+            text(
+                """
+                INSERT INTO absensi (tanggal_absen, jam_masuk, jam_keluar, user_id)
+                VALUES (DATE '2024-01-01', TIME '06:55', TIME '12:00', :user_id),
+                       (DATE '2024-01-03', TIME '07:10', NULL, :user_id)
+                """
+            ),
+            {"user_id": user.id},
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.get(
+            "/dashboard/user/summary",
+            params={"start_date": "2024-01-01", "end_date": "2024-01-03"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], {"check_ins": 2, "check_outs": 1, "late_count": 1})
+        self.assertEqual(
+            data["series"],
+            [
+                {"tanggal_absen": "2024-01-01", "check_ins": 1, "check_outs": 1, "late_count": 0},
+                {"tanggal_absen": "2024-01-02", "check_ins": 0, "check_outs": 0, "late_count": 0},
+                {"tanggal_absen": "2024-01-03", "check_ins": 1, "check_outs": 0, "late_count": 1},
+            ],
+        )
+        self.assertNotIn("by_role", data)
+
+    def tearDown(self) -> None:
+        self.db.rollback()
+        clear_all_data_on_database(self.db)
+        factory_session.remove()
+        dashboard_cache.clear()
+        return super().tearDown()
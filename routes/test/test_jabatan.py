@@ -59,6 +59,53 @@ class TestJabatan(IsolatedAsyncioTestCase):
         self.maxDiff = None
         self.assertEqual(response.json(), output)
 
+    async def test_paginate_jabatan_count_modes(self):
+        # Given
+        list_role = [RoleFactory.create(jabatan=f"Jabatan {n}") for n in range(5)]
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=list_role[0],
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response_none = client.get(
+            "/jabatan",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"page_size": 2, "count": "none"},
+        )
+        response_estimate = client.get(
+            "/jabatan",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"page_size": 2, "count": "estimate"},
+        )
+        response_last_page = client.get(
+            "/jabatan",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"page": 3, "page_size": 2, "count": "estimate"},
+        )
+        response_out_of_range = client.get(
+            "/jabatan",
+            headers={"Authorization": f"Bearer {token}"},
+            params={"page": 9, "page_size": 2},
+        )
+
+        # Expect
+        self.assertEqual(response_none.status_code, 200)
+        self.assertIsNone(response_none.json()["count"])
+        self.assertIsNone(response_none.json()["page_count"])
+        self.assertEqual(len(response_none.json()["results"]), 2)
+        self.assertEqual(response_estimate.status_code, 200)
+        self.assertGreaterEqual(response_estimate.json()["count"], 2)
+        self.assertEqual(response_last_page.json()["count"], 5)
+        self.assertEqual(response_last_page.json()["page_count"], 3)
+        self.assertEqual(response_out_of_range.json()["count"], 5)
+        self.assertEqual(response_out_of_range.json()["results"], [])
+
     async def test_paginate_nama_params(self):
         list_role = [
             RoleFactory.create(jabatan="Admin"),
@@ -309,6 +356,27 @@ class TestJabatan(IsolatedAsyncioTestCase):
         # Expect
         self.assertEqual(response.status_code, 404)
 
+    async def test_paginate_jabatan_deleted_user(self):
+        # Given
+        data_user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=RoleFactory.create(jabatan="Admin"),
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(data_user)
+        self.db.delete(data_user)
+        self.db.commit()
+        client = TestClient(app)
+
+        # When
+        response = client.get("/jabatan", headers={"Authorization": f"Bearer {token}"})
+
+        # Expect
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"message": "Invalid/Expired Credentials"})
+
     def tearDown(self) -> None:
         self.db.rollback()
         factory_session.remove()
@@ -0,0 +1,97 @@
+from unittest import IsolatedAsyncioTestCase
+from sqlalchemy.orm import Session
+from fastapi.testclient import TestClient
+from main import app
+from common.security import generate_jwt_token_from_user, generate_hash_password
+import alembic.config
+from models import factory_session, clear_all_data_on_database
+from migrations.factories.UserFactory import UserFactory
+from migrations.factories.RoleFactory import RoleFactory
+from repository import kehadiran as kehadiran_repo
+
+
+class TestSearch(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        alembic_args = ["-c", "alembic.ini", "upgrade", "head"]
+        alembic.config.main(argv=alembic_args)
+        self.db: Session = factory_session()
+        clear_all_data_on_database(self.db)
+        return super().setUp()
+
+    async def test_search(self):
+        # Given
+        role = RoleFactory.create(jabatan="Administrasi")
+        RoleFactory.create(jabatan="Guru")
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        other = UserFactory.create(
+            email="budi@example.com",
+            nama="Budi Administrator",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        kehadiran_repo.create(
+            db=self.db, nama_kehadiran="Hadir", keterangan="hadir", is_commit=False
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.get(
+            "/search",
+            params={"q": "admin"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(
+            {(val["type"], val["id"]) for val in results},
+            {("user", user.id), ("user", other.id), ("jabatan", role.id)},
+        )
+        # exact word match rank first
+        self.assertEqual((results[0]["type"], results[0]["id"]), ("user", user.id))
+        self.assertEqual(results, sorted(results, key=lambda val: -val["score"]))
+
+    async def test_search_short_query(self):
+        # Given
+        user = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(user)
+        client = TestClient(app)
+
+        # When
+        response = client.get(
+            "/search",
+            params={"q": "ad"},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [])
+
+    async def test_search_unauthorized(self):
+        # Given
+        client = TestClient(app)
+
+        # When
+        response = client.get("/search", params={"q": "admin"})
+
+        # Expect
+        self.assertEqual(response.status_code, 401)
+
+    def tearDown(self) -> None:
+        self.db.rollback()
+        factory_session.remove()
+        return super().tearDown()
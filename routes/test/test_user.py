@@ -1,4 +1,5 @@
 from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
 from sqlalchemy.orm import Session
 from models.User import User
 from fastapi.testclient import TestClient
@@ -386,6 +387,37 @@ class TestUser(IsolatedAsyncioTestCase):
         )
         self.assertIsNotNone(check_db)
 
+    async def test_create_user_email_exist(self):
+        # Given
+        role = RoleFactory.create(jabatan="Admin")
+        admin = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(admin)
+        client = TestClient(app)
+        user_request = {
+            "email": "admin@example.com",
+            "nama_user": "User Test",
+            "password": "12qwaszx",
+            "jabatan": role.id,
+        }
+
+        # When
+        response = client.post(
+            "/user-management",
+            headers={"Authorization": f"Bearer {token}"},
+            json=user_request,
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "This email already exist!"})
+        self.assertEqual(self.db.query(User).count(), 1)
+
     async def test_update_user(self):
         list_role = [
             RoleFactory.create(jabatan="Admin"),
@@ -432,6 +464,45 @@ class TestUser(IsolatedAsyncioTestCase):
         )
         self.assertIsNotNone(check_db)
 
+    async def test_update_user_email_exist(self):
+        # Given
+        role = RoleFactory.create(jabatan="Admin")
+        list_users = [
+            UserFactory.create(
+                email="admin@example.com",
+                nama="Admin",
+                password=generate_hash_password("12qwaszx"),
+                userRole=role,
+            ),
+            UserFactory.create(
+                email="guru@example.com",
+                nama="Guru",
+                password=generate_hash_password("12qwaszx"),
+                userRole=role,
+            ),
+        ]
+        self.db.commit()
+        token = await generate_jwt_token_from_user(list_users[0])
+        client = TestClient(app)
+        user_request = {
+            "email": "admin@example.com",
+            "nama_user": "Guru",
+            "jabatan": role.id,
+        }
+
+        # When
+        response = client.put(
+            f"/user-management/{list_users[1].id}",
+            headers={"Authorization": f"Bearer {token}"},
+            json=user_request,
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "This email already exist!"})
+        self.db.expire_all()
+        self.assertEqual(self.db.get(User, list_users[1].id).email, "guru@example.com")
+
     async def test_update_user_not_found(self):
         list_role = [
             RoleFactory.create(jabatan="Admin"),
@@ -515,6 +586,75 @@ class TestUser(IsolatedAsyncioTestCase):
         # Expect
         self.assertEqual(response.status_code, 404)
 
+    async def test_import_user(self):
+        # Given
+        role = RoleFactory.create(jabatan="Guru")
+        admin = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(admin)
+        client = TestClient(app)
+        content = (
+            "nama_user,email,password,jabatan\n"
+            f"Guru 1,guru1@example.com,12qwaszx,{role.id}\n"
+            f"Guru 2,guru2@example.com,12qwaszx,{role.id}\n"
+            f"Admin,admin@example.com,12qwaszx,{role.id}\n"
+        )
+
+        # When
+        response = client.post(
+            "/user-management/import",
+            headers={"Authorization": f"Bearer {token}"},
+            files={"file": ("users.csv", content, "text/csv")},
+        )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(response.json()["errors"][0]["row"], 3)
+        self.assertEqual(self.db.query(User).count(), 3)
+
+    async def test_import_user_email_taken_meanwhile(self):
+        # Given
+        role = RoleFactory.create(jabatan="Guru")
+        admin = UserFactory.create(
+            email="admin@example.com",
+            nama="Admin",
+            password=generate_hash_password("12qwaszx"),
+            userRole=role,
+        )
+        self.db.commit()
+        token = await generate_jwt_token_from_user(admin)
+        client = TestClient(app)
+        content = (
+            "nama_user,email,password,jabatan\n"
+            f"Guru 1,guru1@example.com,12qwaszx,{role.id}\n"
+            f"Admin,admin@example.com,12qwaszx,{role.id}\n"
+        )
+
+        # When
+        # the email check miss admin@example.com, as if it was created by other
+        # request after the check, the INSERT ... ON CONFLICT skip the row
+        with patch("common.user_import.user_aio_repo.get_existing_emails", return_value=set()):
+            response = client.post(
+                "/user-management/import",
+                headers={"Authorization": f"Bearer {token}"},
+                files={"file": ("users.csv", content, "text/csv")},
+            )
+
+        # Expect
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(
+            response.json()["errors"],
+            [{"row": 2, "email": "admin@example.com", "message": "This email already exist!"}],
+        )
+        self.assertEqual(self.db.query(User).count(), 2)
+
     def tearDown(self) -> None:
         self.db.rollback()
         factory_session.remove()
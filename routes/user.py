@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, UploadFile
 from typing import Optional
-from sqlalchemy.orm import Session
-from common.security import oauth2_scheme, get_user_from_jwt_token
-from models import get_db_sync
+from sqlalchemy.ext.asyncio import AsyncSession
+from common.pagination import CountMode
+from common.security import (
+    Principal,
+    get_current_principal,
+    generate_hash_password_async,
+)
+from common.hash_pool import HashPoolOverloaded
+from common.user_import import parse_user_rows, import_users_async
+from models import get_db_async
 from schemas.user import (
     PaginateUserResponse,
     CreateUserRequest,
@@ -10,6 +17,7 @@ from schemas.user import (
     UpdateUserRequest,
     UpdateUserResponse,
     DetailUserResponse,
+    ImportUserResponse,
 )
 from schemas.common import (
     BadRequestResponse,
@@ -18,20 +26,22 @@ from schemas.common import (
     ForbiddenResponse,
     NoContentResponse,
     InternalServerErrorResponse,
+    ServiceUnavailableResponse,
 )
 from common.responses import (
     common_response,
     InternalServerError,
-    Unauthorized,
     NotFound,
     NoContent,
     Created,
     Ok,
+    BadRequest,
+    ServiceUnavailable,
 )
-from repository import user as user_repo
+from repository.aio import user as user_repo
 
 router = APIRouter(prefix="/user-management", tags=["User Management"])
-MSG_UNAUTHORIZED = "Invalid/Expired Credentials"
+MSG_EMAIL_EXIST = "This email already exist!"
 
 
 @router.get(
@@ -45,25 +55,24 @@ MSG_UNAUTHORIZED = "Invalid/Expired Credentials"
     },
 )
 async def get_paginate_user(
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
     page: int = 1,
     page_size: int = 10,
+    count: CountMode = CountMode.exact,
     nama_user: Optional[str] = None,
     email: Optional[str] = None,
     jabatan: Optional[int] = None,
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        (data, num_data, num_page) = user_repo.list_users(
+        (data, num_data, num_page) = await user_repo.list_users(
             db=db,
             page=page,
             page_size=page_size,
             nama=nama_user,
             email=email,
             jabatan=jabatan,
+            count=count,
         )
         return common_response(
             Ok(
@@ -108,13 +117,10 @@ async def get_paginate_user(
     },
 )
 async def get_detail_user(
-    id: int, db: Session = Depends(get_db_sync), token: str = Depends(oauth2_scheme)
+    id: int, db: AsyncSession = Depends(get_db_async), user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = user_repo.get_user_by_id(db, id)
+        data = await user_repo.get_user_by_id(db, id)
         if data is None:
             return common_response(NotFound())
         return common_response(
@@ -145,23 +151,23 @@ async def get_detail_user(
         "401": {"model": UnauthorizedResponse},
         "403": {"model": ForbiddenResponse},
         "500": {"model": InternalServerErrorResponse},
+        "503": {"model": ServiceUnavailableResponse},
     },
 )
 async def create_user(
     req: CreateUserRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        data = user_repo.create_user(
+        hashed_password = await generate_hash_password_async(req.password)
+        data = await user_repo.create_user(
             db=db,
             nama=req.nama_user,
             email=req.email,
-            password=req.password,
+            password=hashed_password,
             jabatan=req.jabatan,
+            is_hashed=True,
         )
         return common_response(
             Created(
@@ -176,6 +182,49 @@ async def create_user(
                 }
             )
         )
+    except HashPoolOverloaded:
+        return common_response(ServiceUnavailable())
+    except user_repo.EmailAlreadyExists:
+        return common_response(BadRequest(message=MSG_EMAIL_EXIST))
+    except Exception as e:
+        import traceback
+
+        traceback.print_exc()
+        return common_response(InternalServerError(error=str(e)))
+
+
+@router.post(
+    "/import",
+    responses={
+        "200": {"model": ImportUserResponse},
+        "400": {"model": BadRequestResponse},
+        "401": {"model": UnauthorizedResponse},
+        "403": {"model": ForbiddenResponse},
+        "500": {"model": InternalServerErrorResponse},
+        "503": {"model": ServiceUnavailableResponse},
+    },
+)
+async def import_user(
+    file: UploadFile,
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
+):
+    """
+    bulk create user from CSV (header nama_user,email,password,jabatan) or JSON list
+    """
+    try:
+        format = (file.filename or "").rsplit(".", 1)[-1].lower()
+        if format not in ("csv", "json"):
+            return common_response(BadRequest(message="File must be .csv or .json"))
+        content = await file.read()
+        try:
+            rows = parse_user_rows(content, format)
+        except ValueError as e:
+            return common_response(BadRequest(message=str(e)))
+        report = await import_users_async(db=db, rows=rows)
+        return common_response(Ok(data=report))
+    except HashPoolOverloaded:
+        return common_response(ServiceUnavailable())
     except Exception as e:
         import traceback
 
@@ -197,17 +246,14 @@ async def create_user(
 async def update_user(
     id: int,
     req: UpdateUserRequest,
-    db: Session = Depends(get_db_sync),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db_async),
+    user: Principal = Depends(get_current_principal),
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        check_data = user_repo.get_user_by_id(db, id)
+        check_data = await user_repo.get_user_by_id(db, id)
         if check_data is None:
             return common_response(NotFound())
-        data = user_repo.update_user(
+        data = await user_repo.update_user(
             db=db,
             id=id,
             nama=req.nama_user,
@@ -227,6 +273,8 @@ async def update_user(
                 }
             )
         )
+    except user_repo.EmailAlreadyExists:
+        return common_response(BadRequest(message=MSG_EMAIL_EXIST))
     except Exception as e:
         import traceback
 
@@ -246,16 +294,13 @@ async def update_user(
     },
 )
 async def delete_user(
-    id: int, db: Session = Depends(get_db_sync), token: str = Depends(oauth2_scheme)
+    id: int, db: AsyncSession = Depends(get_db_async), user: Principal = Depends(get_current_principal)
 ):
     try:
-        user = get_user_from_jwt_token(db, token)
-        if user is None:
-            return common_response(Unauthorized(custom_response=MSG_UNAUTHORIZED))
-        check_data = user_repo.get_user_by_id(db, id)
+        check_data = await user_repo.get_user_by_id(db, id)
         if check_data is None:
             return common_response(NotFound())
-        user_repo.delete_user(db, id)
+        await user_repo.delete_user(db, id)
         return common_response(NoContent())
 
     except Exception as e:
@@ -1,12 +1,13 @@
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import date
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
 
 class PaginateAbsensiUserResponse(BaseModel):
-    count: int
-    page_count: int
+    count: Optional[int]
+    page_count: Optional[int]
     page_size: int
-    page: int
+    page: Optional[int]
+    next_cursor: Optional[str]
     class DetailAbsensiResponse(BaseModel):
         id: int
         tanggal_absen: date
@@ -18,10 +19,11 @@ class PaginateAbsensiUserResponse(BaseModel):
     results: List[DetailAbsensiResponse]
 
 class PaginateAbsensiAdminResponse(BaseModel):
-    count: int
-    page_count: int
+    count: Optional[int]
+    page_count: Optional[int]
     page_size: int
-    page: int
+    page: Optional[int]
+    next_cursor: Optional[str]
 
     class DetailAbsensiResponse(BaseModel):
         id: int
@@ -87,7 +89,7 @@ class DetailAbsensiResponse(BaseModel):
 
 class CreateAbsensiMasukRequest(BaseModel):
     lokasi_masuk: str
-    keterangan: Optional[str] = None
+    keterangan: Optional[str] = Field(default=None, max_length=100)
 
 class CheckKoordinatRequest(BaseModel):
     longitude: float
@@ -130,6 +132,12 @@ class CreateAbsensiMasukResponse(BaseModel):
 
     user: List[GetUserDetail]
 
+class BufferedAbsensiMasukResponse(CreateAbsensiMasukResponse):
+    # id is known once the buffer wrote the check-in to absensi,
+    # check-out with PUT /absensi/keluar/event/{event_id}/
+    id: Optional[int] = None
+    event_id: str
+
 class CreateAbsensiKeluarRequest(BaseModel):
     lokasi_keluar: str
 
@@ -161,3 +169,26 @@ class CreateAbsensiKeluarResponse(BaseModel):
         shift: List[GetShiftDetail]
 
     user: List[GetUserDetail]
+
+class SyncAbsensiEvent(BaseModel):
+    # generated by the app, the same event sent again is not written twice
+    event_id: str = Field(min_length=1, max_length=64)
+    jenis: Literal["masuk", "keluar"]
+    # client clock, without timezone it is read in TIMEZONE
+    waktu: datetime
+    latitude: float
+    longitude: float
+    keterangan: Optional[str] = Field(default=None, max_length=100)
+
+class SyncAbsensiRequest(BaseModel):
+    # in the order they happened
+    events: List[SyncAbsensiEvent]
+
+class SyncAbsensiResponse(BaseModel):
+    class SyncEventResult(BaseModel):
+        event_id: str
+        status: str
+        absensi_id: Optional[int]
+
+    results: List[SyncEventResult]
+
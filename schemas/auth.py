@@ -10,6 +10,7 @@ class LoginSuccessResponse(BaseModel):
     id: str
     email: str
     token: str
+    refresh_token: str
 
 
 class MeSuccessResponse(BaseModel):
@@ -29,8 +30,15 @@ class LogoutSuccessResponse(BaseModel):
     token: str
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
 class RefreshTokenSuccessResponse(BaseModel):
-    refreshed_token: str
+    id: str
+    email: str
+    token: str
+    refresh_token: str
 
 
 class RevokeTokenRequest(BaseModel):
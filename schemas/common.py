@@ -4,7 +4,8 @@ NoContentResponse = None
 
 
 class UnauthorizedResponse(BaseModel):
-    message: str = "Unauthorized"
+    # body of every 401 of an invalid/expired token or a deleted user (main.py)
+    message: str = "Invalid/Expired Credentials"
 
 
 class BadRequestResponse(BaseModel):
@@ -19,5 +20,17 @@ class NotFoundResponse(BaseModel):
     message: str = "Not found"
 
 
+class ConflictResponse(BaseModel):
+    message: str = "Conflict"
+
+
 class InternalServerErrorResponse(BaseModel):
     detail: str
+
+
+class TooManyRequestsResponse(BaseModel):
+    message: str = "Too Many Requests"
+
+
+class ServiceUnavailableResponse(BaseModel):
+    message: str = "Service Unavailable"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class CountTotalAbsen(BaseModel):
     count: int
@@ -8,4 +8,24 @@ class VolumeAbsenDate(BaseModel):
     class DetailVolume(BaseModel):
         tanggal_absen: str
         count: int
-    data: List[DetailVolume]
\ No newline at end of file
+    data: List[DetailVolume]
+class SummaryCounts(BaseModel):
+    check_ins: int
+    check_outs: int
+    late_count: int
+
+class UserDashboardSummary(BaseModel):
+    class DetailSeries(SummaryCounts):
+        tanggal_absen: str
+    total: SummaryCounts
+    series: List[DetailSeries]
+
+class AdminDashboardSummary(UserDashboardSummary):
+    class DetailRole(SummaryCounts):
+        role_id: Optional[int] = None
+        nama_role: Optional[str] = None
+    class DetailShift(SummaryCounts):
+        shift_id: Optional[int] = None
+        nama_shift: Optional[str] = None
+    by_role: List[DetailRole]
+    by_shift: List[DetailShift]
@@ -1,7 +1,5 @@
 from typing import List, Annotated
-from pydantic import BaseModel, StringConstraints, field_validator
-from models import factory_session
-from models.User import User
+from pydantic import BaseModel, StringConstraints
 
 
 class PaginateKaryawanResponse(BaseModel):
@@ -29,14 +27,6 @@ class CreateKaryawanRequest(BaseModel):
     email: Annotated[str, StringConstraints(min_length=1, max_length=30)]
     password: Annotated[str, StringConstraints(min_length=1, max_length=50)]
 
-    @field_validator("email")
-    def validate_email_unique(cls, email):
-        with factory_session() as session:
-            existing_name = session.query(User).filter_by(email=email).first()
-            if existing_name:
-                raise ValueError("This email already exist!")
-        return email
-
 
 class CreateKaryawanResponse(BaseModel):
     id: str
@@ -54,20 +44,6 @@ class UpdateKaryawanValidation(BaseModel):
     email: Annotated[str, StringConstraints(min_length=1, max_length=30)]
     nama_karyawan: Annotated[str, StringConstraints(min_length=1, max_length=50)]
 
-    @field_validator("email")
-    def validate_email_unique(cls, email, value):
-        current_id = value.data.get("id")
-        if email is not None:
-            with factory_session() as session:
-                existing_user = (
-                    session.query(User)
-                    .filter(User.email == email, User.id is not current_id)
-                    .first()
-                )
-                if existing_user:
-                    raise ValueError("This email already exists!")
-        return email
-
 
 class UpdateKaryawanResponse(BaseModel):
     id: int
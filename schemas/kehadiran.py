@@ -1,10 +1,10 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
 class PaginateKehadiranResponse(BaseModel):
-    count: int
-    page_count: int
+    count: Optional[int]
+    page_count: Optional[int]
     page_size: int
     page: int
 
@@ -0,0 +1,60 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class PasswordHashMetricsResponse(BaseModel):
+    class WaitTime(BaseModel):
+        avg: float
+        p95: float
+        max: float
+
+    max_workers: int
+    max_queue: int
+    running: int
+    queue_depth: int
+    completed: int
+    rejected: int
+    wait_ms: WaitTime
+
+
+class DbPoolMetrics(BaseModel):
+    class WaitTime(BaseModel):
+        avg: float
+        p95: float
+        max: float
+
+    pid: int
+    pool_size: int
+    max_overflow: int
+    timeout: float
+    max_connections: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    connects: int
+    wait_ms: WaitTime
+
+
+class DbPoolMetricsResponse(BaseModel):
+    async_engine: Optional[DbPoolMetrics]
+    sync_engine: Optional[DbPoolMetrics]
+
+
+class CheckInBufferMetricsResponse(BaseModel):
+    running: bool
+    journal: bool
+    max_size: int
+    batch_size: int
+    queue_depth: int
+    in_flight: int
+    accepted: int
+    rejected: int
+    recovered: int
+    written: int
+    dropped: int
+    quarantined: int
+    batches: int
+    failures: int
+    last_flush_ms: float
@@ -0,0 +1,13 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class SearchResponse(BaseModel):
+    class SearchResult(BaseModel):
+        type: str
+        id: int
+        label: str
+        score: float
+
+    took_ms: float
+    results: List[SearchResult]
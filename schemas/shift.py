@@ -3,8 +3,8 @@ from pydantic import BaseModel
 
 
 class PaginateShiftResponse(BaseModel):
-    counts: int
-    page_count: int
+    counts: Optional[int]
+    page_count: Optional[int]
     page_size: int
     page: int
 
@@ -1,12 +1,10 @@
 from typing import List, Annotated, Optional
-from pydantic import BaseModel, StringConstraints, field_validator
-from models import factory_session
-from models.User import User
+from pydantic import BaseModel, StringConstraints
 
 
 class PaginateUserResponse(BaseModel):
-    count: int
-    page_count: int
+    count: Optional[int]
+    page_count: Optional[int]
     page_size: int
     page: int
 
@@ -42,14 +40,6 @@ class CreateUserRequest(BaseModel):
     password: Annotated[str, StringConstraints(min_length=1, max_length=50)]
     jabatan: int
 
-    @field_validator("email")
-    def validate_email_unique(cls, email):
-        with factory_session() as session:
-            existing_name = session.query(User).filter_by(email=email).first()
-            if existing_name:
-                raise ValueError("This email already exist!")
-        return email
-
 
 class CreateUserResponse(BaseModel):
     id: str
@@ -63,6 +53,20 @@ class CreateUserResponse(BaseModel):
     jabatan: Optional[DetailJabatan]
 
 
+class ImportUserResponse(BaseModel):
+    class ImportError(BaseModel):
+        row: int
+        email: Optional[str]
+        message: str
+
+    total: int
+    created: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ImportError]
+
+
 class UpdateUserRequest(BaseModel):
     nama_user: str
     email: str
@@ -74,20 +78,6 @@ class UpdateUserValidation(BaseModel):
     email: Annotated[str, StringConstraints(min_length=1, max_length=30)]
     nama_user: Annotated[str, StringConstraints(min_length=1, max_length=50)]
 
-    @field_validator("email")
-    def validate_email_unique(cls, email, value):
-        current_id = value.data.get("id")
-        if email is not None:
-            with factory_session() as session:
-                existing_user = (
-                    session.query(User)
-                    .filter(User.email == email, User.id is not current_id)
-                    .first()
-                )
-                if existing_user:
-                    raise ValueError("This email already exists!")
-        return email
-
 
 class UpdateUserResponse(BaseModel):
     id: int
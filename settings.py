@@ -16,11 +16,22 @@ DB_HOST = os.environ.get("DB_HOST")
 DB_PORT = os.environ.get("DB_PORT")
 DB_NAME = os.environ.get("DB_NAME")
 
+# Connection pool per process, every uvicorn worker open up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections to PostgreSQL
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+# disable pooling of the asyncpg engine (set by conftest.py for TestClient tests)
+DB_ASYNC_NULL_POOL = os.environ.get("DB_ASYNC_NULL_POOL", "false").lower() == "true"
+
 # JWT Config
 JWT_PREFIX = os.environ.get("JWT_PREFIX", "Bearer")
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = os.environ.get("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", 30))
 
 TZ = os.environ.get("TIMEZONE", "Asia/Jakarta")
 
@@ -34,3 +45,75 @@ CHECK_KILOMETER_RADIUS= float(os.environ.get("CHECK_KILOMETER_RADIUS", 5.00))
 
 MIN_MINUTE_ABSEN_IN = int(os.environ.get("MIN_MINUTE_ABSEN_IN", 60))
 MAX_MINUTE_ABSEN_IN = int(os.environ.get("MAX_MINUTE_ABSEN_IN", 120))
+
+# bcrypt cost factor, tune it per host with `python cli.py calibrate-hash`
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+# Password hashing worker pool
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 4))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 64))
+
+# Principal cache for get_principal_from_jwt_token
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 4096))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+
+# Login throttling (token bucket), checked before bcrypt and the user query.
+# IP limit is generous because the whole school may share one NAT address
+LOGIN_RATE_LIMIT_IP_CAPACITY = int(os.environ.get("LOGIN_RATE_LIMIT_IP_CAPACITY", 300))
+LOGIN_RATE_LIMIT_IP_PER_MINUTE = int(os.environ.get("LOGIN_RATE_LIMIT_IP_PER_MINUTE", 300))
+LOGIN_RATE_LIMIT_EMAIL_CAPACITY = int(os.environ.get("LOGIN_RATE_LIMIT_EMAIL_CAPACITY", 5))
+LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE = int(os.environ.get("LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE", 5))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.environ.get("LOGIN_RATE_LIMIT_MAX_KEYS", 10000))
+# number of reverse proxies in front of the app that append to X-Forwarded-For.
+# 0 keys the IP bucket on the peer address, behind a proxy that is the proxy
+# itself and every login share one bucket
+LOGIN_RATE_LIMIT_TRUSTED_HOPS = int(os.environ.get("LOGIN_RATE_LIMIT_TRUSTED_HOPS", 0))
+
+# /search typeahead. Trigram indexes need at least 3 characters to narrow the scan
+SEARCH_MIN_LENGTH = int(os.environ.get("SEARCH_MIN_LENGTH", 3))
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", 50))
+SEARCH_LATENCY_TARGET_MS = int(os.environ.get("SEARCH_LATENCY_TARGET_MS", 100))
+
+# absensi monthly partitions created ahead by `python cli.py partitions ensure`
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", 3))
+
+# `python cli.py archive`, gzip CSV per month of the archived absensi rows
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 5000))
+
+# /dashboard/* result cache, ranges ending in the last SYNC_MAX_AGE_DAYS days or later
+# expire after the TTL, older ranges after the history TTL (they still change through
+# `rebuild-summary`, `archive` and forced check-outs, which other processes don't see)
+DASHBOARD_CACHE_SIZE = int(os.environ.get("DASHBOARD_CACHE_SIZE", 1024))
+DASHBOARD_CACHE_TTL_SECONDS = int(os.environ.get("DASHBOARD_CACHE_TTL_SECONDS", 30))
+DASHBOARD_CACHE_HISTORY_TTL_SECONDS = int(
+    os.environ.get("DASHBOARD_CACHE_HISTORY_TTL_SECONDS", 3600)
+)
+
+# Idempotency-Key replay for /absensi/masuk and /absensi/keluar/{id}/. "memory" keep
+# the responses in this worker only, "db" also store them in idempotency_key so a
+# retry landing on another worker is replayed too
+IDEMPOTENCY_STORE = os.environ.get("IDEMPOTENCY_STORE", "memory")
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+# "db": a key is reserved by a pending row while its first request runs, the row of a
+# worker that crashed meanwhile is taken over after this delay
+IDEMPOTENCY_PENDING_SECONDS = int(os.environ.get("IDEMPOTENCY_PENDING_SECONDS", 60))
+
+# /absensi/sync offline events. Events older than SYNC_MAX_AGE_DAYS, or later than
+# now + SYNC_CLOCK_SKEW_SECONDS (phone clock ahead), are rejected
+SYNC_MAX_EVENTS = int(os.environ.get("SYNC_MAX_EVENTS", 500))
+SYNC_MAX_AGE_DAYS = int(os.environ.get("SYNC_MAX_AGE_DAYS", 7))
+SYNC_CLOCK_SKEW_SECONDS = int(os.environ.get("SYNC_CLOCK_SKEW_SECONDS", 300))
+
+# write-behind check-in for the morning peak. /absensi/masuk answer 202 after the
+# check-in is queued, a background task write the queue to absensi in batches of
+# CHECKIN_BUFFER_BATCH_SIZE or every CHECKIN_BUFFER_FLUSH_MS. Queued check-ins are
+# appended to a journal in CHECKIN_BUFFER_JOURNAL_DIR (empty = memory only) and
+# replayed on startup, CHECKIN_BUFFER_FSYNC also survive a crash of the machine
+CHECKIN_BUFFER_ENABLED = os.environ.get("CHECKIN_BUFFER_ENABLED", "false").lower() == "true"
+CHECKIN_BUFFER_MAX_SIZE = int(os.environ.get("CHECKIN_BUFFER_MAX_SIZE", 2000))
+CHECKIN_BUFFER_BATCH_SIZE = int(os.environ.get("CHECKIN_BUFFER_BATCH_SIZE", 200))
+CHECKIN_BUFFER_FLUSH_MS = int(os.environ.get("CHECKIN_BUFFER_FLUSH_MS", 200))
+CHECKIN_BUFFER_JOURNAL_DIR = os.environ.get("CHECKIN_BUFFER_JOURNAL_DIR", "checkin_journal")
+CHECKIN_BUFFER_FSYNC = os.environ.get("CHECKIN_BUFFER_FSYNC", "false").lower() == "true"
@@ -5,6 +5,7 @@ from typer.testing import CliRunner
 from cli import app
 from models.Role import Role
 from models.User import User
+from models.AbsensiDailySummary import AbsensiDailySummary
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -45,6 +46,71 @@ class TestUserRoleUserSeeder(IsolatedAsyncioTestCase):
         self.assertGreater(num_user, 0)
         self.db.rollback()
 
+    async def test_calibrate_hash(self) -> None:
+        # Given
+        args = ["calibrate-hash", "--target-ms", "1000", "--min-rounds", "4", "--max-rounds", "6"]
+
+        # When
+        result = runner.invoke(app=app, args=args)
+
+        # Expect
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("recommended BCRYPT_ROUNDS=", result.stdout)
+
+    def test_benchmark_checkin(self) -> None:
+        # sync test, run_checkin_benchmark start its own event loops
+        # Given
+        args = ["benchmark-checkin", "--users", "5", "--concurrency", "2"]
+
+        # When
+        result = runner.invoke(app=app, args=args)
+
+        # Expect
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("sync   5 check-in", result.stdout)
+        self.assertIn("async  5 check-in", result.stdout)
+        num_user = self.db.query(func.count(User.id)).scalar()
+        self.assertEqual(num_user, 0)
+        num_summary = self.db.query(func.count(AbsensiDailySummary.id)).scalar()
+        self.assertEqual(num_summary, 0)
+
+    def test_partitions(self) -> None:
+        # Given
+        alembic.config.main(argv=["-c", "alembic.ini", "upgrade", "head"])
+
+        # When
+        ensure = runner.invoke(app=app, args=["partitions", "ensure", "--months-ahead", "1"])
+        drop = runner.invoke(app=app, args=["partitions", "drop", "--before", "2999-01"])
+
+        # Expect
+        self.assertEqual(ensure.exit_code, 0)
+        self.assertIn("partition created", ensure.stdout)
+        self.assertNotEqual(drop.exit_code, 0)
+
+    def test_rebuild_summary(self) -> None:
+        # Given
+        alembic.config.main(argv=["-c", "alembic.ini", "upgrade", "head"])
+
+        # When
+        result = runner.invoke(
+            app=app, args=["rebuild-summary", "--start", "2024-01-01", "--end", "2024-01-31"]
+        )
+
+        # Expect
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("0 summary rows rebuilt", result.stdout)
+
+    def test_purge_idempotency(self) -> None:
+        # Given
+        alembic.config.main(argv=["-c", "alembic.ini", "upgrade", "head"])
+
+        # When
+        result = runner.invoke(app=app, args=["purge-idempotency"])
+
+        # Expect
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("0 expired idempotency keys deleted", result.stdout)
+
     def tearDown(self) -> None:
         clear_all_data_on_database(self.db)
         self.db.rollback()